@@ -0,0 +1,101 @@
+"""Compare the throughput of the PubTator file parsers.
+
+Usage:
+    python benchmarks/parser_throughput.py [PUBTATOR_FILE] [--size_mb 100] [--repeat 3] [--workers 4]
+
+Without a file, a synthetic file of `--size_mb` MB is generated by replicating
+the articles of `tests/test_data` under new PMIDs.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from netmedex.pubtator_data import PubTatorCollection
+from netmedex.pubtator_parser import PubTatorIO
+
+TEST_DATA_DIR = Path(__file__).resolve().parents[1] / "tests" / "test_data"
+
+
+def generate_pubtator_file(filepath: Path, size_mb: float):
+    """Replicate the articles of the test data with new PMIDs up to `size_mb` MB."""
+    articles = [
+        article
+        for path in sorted(TEST_DATA_DIR.glob("*.pubtator"))
+        for article in PubTatorIO.parse(path).articles
+    ]
+
+    size = 0
+    pmid = 10**8
+    with open(filepath, "w") as f:
+        while size < size_mb * 2**20:
+            for article in articles:
+                pmid += 1
+                article_str = (
+                    article.to_pubtator_str(annotation_use_identifier_name=False).replace(
+                        f"{article.pmid}", str(pmid)
+                    )
+                    + "\n"
+                )
+                size += f.write(article_str)
+
+
+def benchmark(
+    filepath: Path,
+    engine: str,
+    workers: int,
+    repeat: int,
+) -> tuple[float, PubTatorCollection]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        collection = PubTatorIO.parse(filepath, engine=engine, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best, collection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the throughput of the PubTator parsers")
+    parser.add_argument("filepath", nargs="?", default=None, help="PubTator file to parse")
+    parser.add_argument(
+        "--size_mb", type=float, default=100, help="Size of the synthetic file (default: 100)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine (default: 3)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes of the parallel parser (default: number of CPUs)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        if args.filepath is None:
+            filepath = Path(tempdir) / "synthetic.pubtator"
+            generate_pubtator_file(filepath, args.size_mb)
+        else:
+            filepath = Path(args.filepath)
+        size_mb = filepath.stat().st_size / 2**20
+
+        runs = {"python": ("python", 1), "bytes": ("bytes", 1)}
+        if args.workers > 1:
+            runs[f"bytes x{args.workers}"] = ("bytes", args.workers)
+        results = {
+            name: benchmark(filepath, engine, workers, args.repeat)
+            for name, (engine, workers) in runs.items()
+        }
+
+    reference = results["python"][1]
+    print(f"{filepath.name}: {size_mb:.1f} MB, {reference.num_articles} articles")
+    for engine, (seconds, collection) in results.items():
+        print(
+            f"{engine:>10}: {seconds:6.2f} s {size_mb / seconds:8.1f} MB/s "
+            f"{results['python'][0] / seconds:5.2f}x "
+            f"{'same' if collection == reference else 'DIFFERENT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -243,3 +243,69 @@ def create_pubtator_relation(pmid: str, relation_list: list[dict[str, Any]]):
         )
         for relation in relation_list
     ]
+
+
+def pubtator_to_biocjson(article: PubTatorArticle) -> dict[str, Any]:
+    """Convert an article into the BioC-JSON structure of the PubTator3 API.
+
+    Reverse of `biocjson_to_pubtator` for the fields kept in `PubTatorArticle`.
+    """
+
+    def to_biocjson_annotation(annotation: PubTatorAnnotation) -> dict[str, Any]:
+        infons = {"identifier": annotation.mesh, "type": annotation.type}
+        if annotation.identifier_name is not None:
+            infons["name"] = annotation.identifier_name
+        return {
+            "infons": infons,
+            "text": annotation.name,
+            "locations": [
+                {"offset": annotation.start, "length": annotation.end - annotation.start}
+            ],
+        }
+
+    title_infons = {"type": "title"}
+    if article.doi is not None:
+        title_infons["article-id_doi"] = article.doi
+
+    title_length = len(article.title) + 1
+    return {
+        "pmid": article.pmid,
+        "date": (
+            datetime.strptime(article.date, "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
+            if article.date is not None
+            else None
+        ),
+        "journal": article.journal,
+        "passages": [
+            {
+                "infons": title_infons,
+                "offset": 0,
+                "text": article.title,
+                "annotations": [
+                    to_biocjson_annotation(annotation)
+                    for annotation in article.annotations
+                    if annotation.start < title_length
+                ],
+            },
+            {
+                "infons": {"type": "abstract"},
+                "offset": title_length,
+                "text": article.abstract or "",
+                "annotations": [
+                    to_biocjson_annotation(annotation)
+                    for annotation in article.annotations
+                    if annotation.start >= title_length
+                ],
+            },
+        ],
+        "relations": [
+            {
+                "infons": {
+                    "type": relation.relation_type,
+                    "role1": {"identifier": relation.mesh1, "name": relation.name1},
+                    "role2": {"identifier": relation.mesh2, "name": relation.name2},
+                }
+            }
+            for relation in article.relations
+        ],
+    }
@@ -0,0 +1,195 @@
+"""Decode BioC-JSON export responses incrementally.
+
+A full-text export response of 100 articles can take hundreds of MB, most of
+which is the text of the body passages. `BioCJSONStreamDecoder` is fed the
+response body chunk by chunk, decodes one document at a time as soon as it is
+complete, and keeps only the fields read by `biocjson_to_pubtator`. Neither
+the whole body nor the whole object tree of the response is held in memory.
+"""
+
+import codecs
+import json
+import re
+from typing import Any
+
+# A structural character or a (possibly unterminated) string
+TOKEN_PATTERN = re.compile(r'[{}\[\]]|"[^"\\]*(?:\\.[^"\\]*)*(")?', re.DOTALL)
+
+# Whitespace and commas between documents
+SEPARATOR_PATTERN = re.compile(r"[\s,]*")
+
+# The key of the documents in the response
+DOCUMENTS_KEY = "PubTator3"
+
+# Fields read by `biocjson_to_pubtator`
+DOCUMENT_KEYS = ("pmid", "date", "journal")
+PASSAGE_INFON_KEYS = ("journal", "article-id_doi")
+ANNOTATION_INFON_KEYS = ("identifier", "type", "subtype", "name", "database")
+RELATION_INFON_KEYS = ("type", "role1", "role2")
+
+
+class BioCJSONStreamDecoder:
+    """Decode a BioC-JSON export response fed in chunks of bytes.
+
+    ```python
+    decoder = BioCJSONStreamDecoder()
+    async for chunk in response.content.iter_chunked(65536):
+        decoder.feed(chunk)
+    res_json = decoder.close()  # {"PubTator3": [...]}
+    ```
+
+    Documents are pruned by `prune_biocjson_document`, so parsing the result
+    with `biocjson_to_pubtator` returns the same articles as parsing the whole
+    response.
+    """
+
+    def __init__(self) -> None:
+        self.documents: list[dict[str, Any]] = []
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        # Text received but not appended to the buffer yet
+        self._chunks: list[str] = []
+        self._n_pending = 0
+        # Position in the buffer to scan from
+        self._pos = 0
+        # Number of open objects and arrays
+        self._depth = 0
+        # Last string at the top level of the response, i.e., the current key
+        self._key: str | None = None
+        self._in_documents = False
+        # Number of characters of the next document to receive before decoding it again
+        self._next_attempt = 0
+        self._done = False
+
+    def feed(self, chunk: bytes):
+        text = self._decoder.decode(chunk)
+        self._chunks.append(text)
+        self._n_pending += len(text)
+        # Wait for enough of the next document to be received
+        if len(self._buffer) - self._pos + self._n_pending >= self._next_attempt:
+            self._fill()
+            self._scan()
+
+    def close(self) -> dict[str, Any]:
+        """Return the response with the decoded documents."""
+        self._chunks.append(self._decoder.decode(b"", final=True))
+        self._next_attempt = 0
+        self._fill()
+        self._scan()
+        if not self._done or self._buffer[self._pos :].strip():
+            raise ValueError("Incomplete or invalid BioC-JSON response")
+        return {DOCUMENTS_KEY: self.documents}
+
+    def _fill(self):
+        """Append the pending text to the buffer and drop the scanned part of the buffer"""
+        self._buffer = self._buffer[self._pos :] + "".join(self._chunks)
+        self._pos = 0
+        self._chunks = []
+        self._n_pending = 0
+
+    def _scan(self):
+        while self._decode_documents() and (token := self._next_token()) is not None:
+            if token[0] == '"':
+                if self._depth == 1:
+                    self._key = token
+            elif token in "{[":
+                self._depth += 1
+                if self._depth == 2 and token == "[" and self._key == f'"{DOCUMENTS_KEY}"':
+                    self._in_documents = True
+            else:
+                self._depth -= 1
+                self._done = self._depth == 0
+
+    def _next_token(self) -> str | None:
+        """Return the next structural character or string outside of the documents"""
+        match = TOKEN_PATTERN.search(self._buffer, self._pos)
+        # Wait for the rest of a string
+        if match is None or (match.group()[0] == '"' and match.group(1) is None):
+            return None
+
+        token = match.group()
+        if self._depth == 0 and (
+            self._done or token != "{" or self._buffer[self._pos : match.start()].strip()
+        ):
+            raise ValueError("Not a BioC-JSON response")
+        self._pos = match.end()
+
+        return token
+
+    def _decode_documents(self) -> bool:
+        """Decode the complete documents and return whether the document array is closed"""
+        while self._in_documents:
+            pos = SEPARATOR_PATTERN.match(self._buffer, self._pos).end()
+            if pos == len(self._buffer):
+                return False
+
+            if self._buffer[pos] == "]":
+                self._depth -= 1
+                self._in_documents = False
+                self._pos = pos + 1
+                return True
+            elif self._buffer[pos] != "{":
+                raise ValueError("Not a BioC-JSON response")
+
+            self._pos = pos
+            # A failed attempt decodes the received part of the document again, so wait
+            # until it doubles to decode each document in linear time
+            if len(self._buffer) - pos < self._next_attempt:
+                return False
+            try:
+                document, self._pos = self._json_decoder.raw_decode(self._buffer, pos)
+            except json.JSONDecodeError:
+                self._next_attempt = 2 * (len(self._buffer) - pos)
+                return False
+            self._next_attempt = 0
+            self.documents.append(prune_biocjson_document(document))
+
+        return True
+
+
+def prune_biocjson_document(document: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the fields of a BioC-JSON document read by `biocjson_to_pubtator`.
+
+    The text of the passages other than the title and the abstract is dropped,
+    and only the infons and the first location of each annotation are kept.
+    """
+    passages = document.get("passages", [])
+    # Passage types are upper case in full-text documents (see `extract_passage`)
+    if passages and "section_type" in passages[0].get("infons", {}):
+        section_key, text_sections = "section_type", ("TITLE", "ABSTRACT")
+    else:
+        section_key, text_sections = "type", ("title", "abstract")
+
+    pruned_passages = []
+    for idx, passage in enumerate(passages):
+        infons = passage.get("infons", {})
+        # The journal and the DOI are read from the first passage
+        infon_keys = (section_key, *PASSAGE_INFON_KEYS) if idx == 0 else (section_key,)
+        pruned_passages.append(
+            {
+                "infons": _select(infons, infon_keys),
+                "text": passage.get("text") if infons.get(section_key) in text_sections else "",
+                "annotations": [
+                    {
+                        "infons": _select(annotation.get("infons", {}), ANNOTATION_INFON_KEYS),
+                        "text": annotation.get("text"),
+                        "locations": annotation.get("locations", [])[:1],
+                    }
+                    for annotation in passage.get("annotations", [])
+                ],
+            }
+        )
+
+    pruned = _select(document, DOCUMENT_KEYS)
+    pruned["passages"] = pruned_passages
+    pruned["relations"] = [
+        {"infons": _select(relation.get("infons", {}), RELATION_INFON_KEYS)}
+        for relation in document.get("relations", [])
+    ]
+
+    return pruned
+
+
+def _select(mapping: dict[str, Any], keys: tuple[str, ...]) -> dict[str, Any]:
+    return {key: mapping[key] for key in keys if key in mapping}
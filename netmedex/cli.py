@@ -2,9 +2,11 @@
 
 import argparse
 import logging
+import os
 import sys
 from pathlib import Path
 
+from netmedex.config import DEFAULT_CHECKPOINT_DIR, STORE_ENV
 from netmedex.utils import config_logger
 
 logger = logging.getLogger(__name__)
@@ -17,8 +19,13 @@ def main():
 
 def pubtator_entry(args):
     from netmedex.cli_utils import load_pmids
+    from netmedex.compressed_io import open_compressed
     from netmedex.exceptions import EmptyInput, NoArticles, UnsuccessfulRequest
+    from netmedex.headers import USE_MESH_VOCABULARY
+    from netmedex.progress import TqdmProgress
     from netmedex.pubtator import PubTatorAPI
+    from netmedex.pubtator_parser import PubTatorIO
+    from netmedex.pubtator_store import PubTatorStore
 
     # Logging
     debug = args.debug
@@ -49,9 +56,27 @@ def pubtator_entry(args):
         suffix = f"{pmid_list[0]}_total_{len(pmid_list)}" if pmid_list else ""
         savepath = args.output if args.output is not None else f"./pmids_{suffix}.pubtator"
 
+    # Only retrieve the articles newer than the previous output
+    known_pmids = None
+    use_mesh = args.use_mesh
+    write_mode = "w"
+    if args.refresh:
+        if query is None:
+            logger.info("--refresh only applies to --query")
+            sys.exit()
+        if os.path.exists(savepath):
+            known_pmids = PubTatorIO.read_pmids(savepath)
+            logger.info(f"Found {len(known_pmids)} articles in {savepath}")
+            # Keep the vocabulary of the previous output
+            use_mesh = USE_MESH_VOCABULARY in PubTatorIO.read_headers(savepath)
+            write_mode = "a"
+
     # Always use "biocjson" format
     request_format = "biocjson"
 
+    # Resolve stored articles locally
+    store = PubTatorStore(args.store) if args.store is not None else None
+
     # Request articles
     api = PubTatorAPI(
         query=query,
@@ -61,18 +86,43 @@ def pubtator_entry(args):
         max_articles=args.max_articles,
         full_text=args.full_text,
         queue=None,
+        checkpoint_dir=args.checkpoint_dir,
+        cache=store,
+        progress=TqdmProgress(),
+        archive=args.archive,
+        shard_by_date=args.shard_by_date,
+        refresh=args.refresh,
+        known_pmids=known_pmids,
     )
 
     try:
         collection = api.run()
-        with open(savepath, "w") as f:
-            f.write(collection.to_pubtator_str(annotation_use_identifier_name=args.use_mesh))
-        logger.info(f"Save PubTator file to {savepath}")
+        with open_compressed(savepath, write_mode) as f:
+            if write_mode == "a":
+                # Separate from the last article of the previous output
+                f.write("\n")
+            collection.write_pubtator(
+                f,
+                annotation_use_identifier_name=use_mesh,
+                include_headers=write_mode == "w",
+            )
+        if write_mode == "a":
+            logger.info(f"Append {collection.num_articles} new articles to {savepath}")
+        else:
+            logger.info(f"Save PubTator file to {savepath}")
     except (NoArticles, EmptyInput, UnsuccessfulRequest) as e:
         logger.error(str(e))
+    finally:
+        if store is not None:
+            store.close()
+        if args.metrics is not None:
+            api.metrics.save(args.metrics)
+            logger.info(f"Save request metrics to {args.metrics}")
 
 
 def network_entry(args):
+    from netmedex.cli_utils import load_pmids
+    from netmedex.compressed_io import get_compression
     from netmedex.graph import PubTatorGraphBuilder, save_graph
     from netmedex.pubtator_parser import PubTatorIO
 
@@ -89,17 +139,29 @@ def network_entry(args):
 
     # Output
     if args.output is None:
-        savepath = pubtator_filepath.with_suffix(f".{args.format}")
+        savepath = pubtator_filepath
+        if get_compression(savepath) is not None:
+            savepath = savepath.with_suffix("")
+        savepath = savepath.with_suffix(f".{args.format}")
     else:
         savepath = Path(args.output)
         savepath.parent.mkdir(parents=True, exist_ok=True)
 
-    # Parse input PubTator file
-    collection = PubTatorIO.parse(pubtator_filepath)
+    # Only build the network of these articles
+    pmid_list = None
+    if args.pmids is not None:
+        pmid_list = load_pmids(args.pmids, load_from="string")
+    elif args.pmid_file is not None:
+        pmid_list = load_pmids(args.pmid_file, load_from="file")
+    if pmid_list is not None:
+        logger.info(f"Read {len(pmid_list)} PMIDs from {pubtator_filepath}")
 
     # Graph
     graph_builder = PubTatorGraphBuilder(node_type=args.node_type)
-    graph_builder.add_collection(collection)
+    # Stream the articles of the input PubTator file into the graph
+    graph_builder.add_collection(
+        PubTatorIO.iter_articles(pubtator_filepath, workers=args.workers, pmids=pmid_list)
+    )
     G = graph_builder.build(
         pmid_weights=args.pmid_weight,
         weighting_method=args.weighting_method,
@@ -190,11 +252,43 @@ def get_pubtator_parser():
         action="store_true",
         help="Collect full-text annotations if available",
     )
+    parser.add_argument(
+        "--shard_by_date",
+        action="store_true",
+        help="Split queries with too many articles for one search into publication year ranges searched concurrently",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Only retrieve the articles of the query newer than those in the output file or the store, and append them to the output file",
+    )
     parser.add_argument(
         "--use_mesh",
         action="store_true",
         help="Use MeSH vocabulary instead of the most commonly used original text in articles",
     )
+    parser.add_argument(
+        "--checkpoint_dir",
+        nargs="?",
+        const=str(DEFAULT_CHECKPOINT_DIR),
+        default=None,
+        help=f"Journal the retrieved batches in this directory (or {DEFAULT_CHECKPOINT_DIR} if no directory is given), so that rerunning the same command resumes an interrupted search. The journal of a search is deleted once it succeeds (default: no journal)",
+    )
+    parser.add_argument(
+        "--store",
+        default=os.getenv(STORE_ENV),
+        help=f"SQLite annotation store to look up articles before requesting them and to save retrieved articles (default: ${STORE_ENV})",
+    )
+    parser.add_argument(
+        "--archive",
+        default=None,
+        help="Save the raw retrieved articles to this gzipped JSON Lines file to parse them again without requesting them",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        help="Save the latency, retries, and bytes received of the requests to each endpoint to this JSON file",
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -265,6 +359,22 @@ def get_network_parser():
         default=0,
         help="Maximum number of edges to display (default: 0, no limit)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to parse the input file in (default: 1)",
+    )
+    parser.add_argument(
+        "--pmids",
+        default=None,
+        help="Only use the articles of these PMIDs (comma-separated), read through an index of the input file saved next to it",
+    )
+    parser.add_argument(
+        "--pmid_file",
+        default=None,
+        help="Only use the articles of the PMIDs in this file (one per line), read through an index of the input file saved next to it",
+    )
 
     return parser
 
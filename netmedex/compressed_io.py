@@ -0,0 +1,105 @@
+"""Open files compressed with gzip or Zstandard based on their extension.
+
+Files ending with `.gz` are (de)compressed with `gzip`, and files ending with
+`.zst` with the optional `zstandard` package (`pip install zstandard`). Other
+files are opened as is. Data is (de)compressed as a stream, so compressed
+files are never decompressed to disk or held in memory. Data already in memory
+without a file name, e.g., an upload, is recognized by its magic number.
+"""
+
+import gzip
+import io
+from pathlib import Path
+from typing import IO, Literal
+
+Compression = Literal["gzip", "zstd"]
+
+COMPRESSION_SUFFIXES: dict[str, Compression] = {".gz": "gzip", ".zst": "zstd"}
+COMPRESSION_MAGIC: dict[bytes, Compression] = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+# Trade compression ratio for speed, multi-GB outputs are compressed while written
+GZIP_COMPRESS_LEVEL = 6
+ZSTD_COMPRESS_LEVEL = 3
+
+
+def get_compression(filepath: str | Path) -> Compression | None:
+    """Return the compression of a file from its extension, or None if it is not compressed."""
+    return COMPRESSION_SUFFIXES.get(Path(filepath).suffix.lower())
+
+
+def detect_compression(data: bytes) -> Compression | None:
+    """Return the compression of data from its magic number, or None if it is not compressed."""
+    for magic, compression in COMPRESSION_MAGIC.items():
+        if data.startswith(magic):
+            return compression
+    return None
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress data compressed with gzip or Zstandard, or return other data as is.
+
+    Raises:
+        ImportError: If the data is compressed with Zstandard and `zstandard` is not installed.
+    """
+    compression = detect_compression(data)
+    if compression == "gzip":
+        return gzip.decompress(data)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Install `zstandard` to decompress Zstandard data")
+        reader = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+        return reader.readall()
+
+    return data
+
+
+def open_compressed(
+    filepath: str | Path,
+    mode: Literal["r", "rt", "rb", "w", "wt", "wb", "a", "at", "ab"] = "rt",
+) -> IO:
+    """Open a file and (de)compress it on the fly if it ends with `.gz` or `.zst`.
+
+    Text is read and written as UTF-8. Appending to a compressed file adds a
+    new gzip member or Zstandard frame, which are read back as one stream.
+
+    Raises:
+        ImportError: If the file ends with `.zst` and `zstandard` is not installed.
+    """
+    if "b" not in mode and "t" not in mode:
+        # gzip opens files in binary mode by default
+        mode += "t"
+    encoding = None if "b" in mode else "utf-8"
+    compression = get_compression(filepath)
+    if compression == "gzip":
+        if "r" in mode:
+            return gzip.open(filepath, mode, encoding=encoding)
+        return gzip.open(filepath, mode, compresslevel=GZIP_COMPRESS_LEVEL, encoding=encoding)
+    elif compression == "zstd":
+        return _open_zstd(filepath, mode, encoding)
+
+    return open(filepath, mode, encoding=encoding)
+
+
+def _open_zstd(filepath: str | Path, mode: str, encoding: str | None) -> IO:
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"Install `zstandard` to read or write {filepath}")
+
+    raw_mode = mode.replace("t", "").replace("b", "") + "b"
+    raw = open(filepath, raw_mode)
+    if "r" in mode:
+        # Files appended to have several frames
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True, closefd=True
+        )
+        stream = io.BufferedReader(reader)
+    else:
+        stream = zstandard.ZstdCompressor(level=ZSTD_COMPRESS_LEVEL).stream_writer(
+            raw, closefd=True
+        )
+
+    if encoding is None:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding)
@@ -0,0 +1,12 @@
+"""Settings shared by the library, the CLI and the web app.
+
+Only the standard library is imported here, so the CLI can build its argument
+parser without loading the rest of the library.
+"""
+
+from pathlib import Path
+
+# Path to a store shared by the CLI and the web app
+STORE_ENV = "NETMEDEX_PUBTATOR_STORE"
+# Journals of interrupted searches
+DEFAULT_CHECKPOINT_DIR = Path.home() / ".cache" / "netmedex" / "checkpoints"
@@ -22,5 +22,12 @@ class UnsuccessfulRequest(Exception):
 class RetryableError(Exception):
     """A retryable error occured when requesting PubTator3 API."""
 
-    def __init__(self, msg="A retryable error occured when requesting PubTator3 API."):
+    def __init__(
+        self,
+        msg="A retryable error occured when requesting PubTator3 API.",
+        retry_after: float | None = None,
+        status: int | None = None,
+    ):
         super().__init__(msg)
+        self.retry_after = retry_after
+        self.status = status
@@ -7,7 +7,7 @@ from collections.abc import Mapping, Sequence
 from dataclasses import asdict
 from operator import itemgetter
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 import networkx as nx
 
@@ -33,6 +33,9 @@ from netmedex.pubtator_graph_data import (
 )
 from netmedex.utils import generate_uuid
 
+if TYPE_CHECKING:
+    from netmedex.pubtator_parser import PubTatorArticleStream
+
 MIN_EDGE_WIDTH = 0
 MAX_EDGE_WIDTH = 20
 
@@ -108,10 +111,18 @@ class PubTatorGraphBuilder:
 
     def add_collection(
         self,
-        collection: PubTatorCollection,
+        collection: "PubTatorCollection | PubTatorArticleStream",
     ):
+        """Add every article of a collection, or of a file streamed by `PubTatorIO.iter_articles`.
+
+        Articles of a stream are parsed and added one at a time, so the file is
+        never held in memory.
+        """
         use_mesh_vocabulary = HEADERS["use_mesh_vocabulary"] in collection.headers
-        for article in collection.articles:
+        articles = (
+            collection.articles if isinstance(collection, PubTatorCollection) else collection
+        )
+        for article in articles:
             self.add_article(article, use_mesh_vocabulary=use_mesh_vocabulary)
 
     def add_article(
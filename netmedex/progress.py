@@ -0,0 +1,174 @@
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from tqdm.auto import tqdm
+
+ProgressStage = Literal["search", "get"]
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Progress of a stage of a `PubTatorAPI` request.
+
+    An event is emitted whenever a batch of articles completes, a request is
+    retried, and once the stage is done.
+    """
+
+    stage: ProgressStage
+    """"search" for finding the PMIDs of a query and "get" for retrieving annotations"""
+    completed: int
+    """Number of articles completed"""
+    total: int
+    """Number of articles to complete"""
+    elapsed: float
+    """Seconds since the stage started"""
+    bytes_received: int
+    """Size of the (decompressed) response bodies received"""
+    retries: int
+    """Number of requests retried"""
+    done: bool = False
+    """Whether the stage is done"""
+
+    @property
+    def throughput(self) -> float:
+        """Articles completed per second"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Estimated seconds until the stage is done"""
+        if self.done:
+            return 0.0
+        if self.throughput == 0:
+            return None
+        return (self.total - self.completed) / self.throughput
+
+
+ProgressCallback = Callable[[ProgressEvent], Any]
+
+
+class ProgressTracker:
+    """Track the progress of a stage and emit `ProgressEvent`s to `callback`."""
+
+    def __init__(
+        self,
+        stage: ProgressStage,
+        total: int,
+        callback: ProgressCallback | None = None,
+    ) -> None:
+        self.stage: ProgressStage = stage
+        self.total = total
+        self.callback = callback
+        self.completed = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.done = False
+        self._start = time.monotonic()
+
+    def update(self, n: int):
+        self.completed = min(self.total, self.completed + n)
+        self._emit()
+
+    def add_bytes(self, n: int):
+        self.bytes_received += n
+
+    def add_retry(self):
+        self.retries += 1
+        self._emit()
+
+    def finish(self):
+        self.completed = self.total
+        self.done = True
+        self._emit()
+
+    def _emit(self):
+        if self.callback is None:
+            return
+        self.callback(
+            ProgressEvent(
+                stage=self.stage,
+                completed=self.completed,
+                total=self.total,
+                elapsed=time.monotonic() - self._start,
+                bytes_received=self.bytes_received,
+                retries=self.retries,
+                done=self.done,
+            )
+        )
+
+
+# Tracker of the stage sending requests in the current task
+current_progress: ContextVar[ProgressTracker | None] = ContextVar("current_progress", default=None)
+
+
+@contextmanager
+def track_requests(tracker: ProgressTracker) -> Iterator[ProgressTracker]:
+    """Count the bytes and retries of the requests sent in this block toward `tracker`."""
+    token = current_progress.set(tracker)
+    try:
+        yield tracker
+    finally:
+        current_progress.reset(token)
+
+
+class TqdmProgress:
+    """Display progress events as tqdm progress bars, one per stage."""
+
+    def __init__(self, **tqdm_kwargs) -> None:
+        self.tqdm_kwargs = {"file": sys.stdout, **tqdm_kwargs}
+        self._pbars: dict[ProgressStage, tqdm] = {}
+
+    def __call__(self, event: ProgressEvent):
+        if (pbar := self._pbars.get(event.stage)) is None:
+            pbar = tqdm(total=event.total, **self.tqdm_kwargs)
+            self._pbars[event.stage] = pbar
+
+        pbar.set_postfix(
+            {"MB": f"{event.bytes_received / 1e6:.1f}", "retries": event.retries},
+            refresh=False,
+        )
+        pbar.update(event.completed - pbar.n)
+        if event.done:
+            pbar.close()
+            del self._pbars[event.stage]
+
+
+class ProgressStream:
+    """Iterate progress events asynchronously.
+
+    Pass the stream as `progress` to `PubTatorAPI` and follow the task running
+    the request in the same event loop:
+
+    ```python
+    stream = ProgressStream()
+    task = asyncio.create_task(PubTatorAPI(query=query, progress=stream).arun())
+    async for event in stream.follow(task):
+        print(event.stage, event.completed, event.total, event.eta)
+    collection = await task
+    ```
+    """
+
+    def __init__(self) -> None:
+        self._events: asyncio.Queue[ProgressEvent] = asyncio.Queue()
+
+    def __call__(self, event: ProgressEvent):
+        self._events.put_nowait(event)
+
+    async def follow(self, task: asyncio.Future) -> AsyncIterator[ProgressEvent]:
+        """Yield events until `task` is done."""
+        while not task.done():
+            get_event = asyncio.ensure_future(self._events.get())
+            await asyncio.wait([get_event, task], return_when=asyncio.FIRST_COMPLETED)
+            if get_event.done():
+                yield get_event.result()
+            else:
+                get_event.cancel()
+
+        while not self._events.empty():
+            yield self._events.get_nowait()
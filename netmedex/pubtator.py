@@ -1,37 +1,113 @@
 # https://www.ncbi.nlm.nih.gov/research/pubtator3/api
 import asyncio
 import logging
-import sys
-from collections.abc import Awaitable, Callable, Sequence
+import os
+import time
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from datetime import date
 from functools import partial
+from pathlib import Path
 from queue import Queue
 from typing import Any, Literal
 
 import aiohttp
 import aiometer
 from aiohttp import ClientResponse, ClientSession
-from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
-from tqdm.auto import tqdm
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.biocjson_stream import BioCJSONStreamDecoder
 from netmedex.exceptions import EmptyInput, NoArticles, RetryableError, UnsuccessfulRequest
+from netmedex.progress import (
+    ProgressCallback,
+    ProgressEvent,
+    ProgressStage,
+    ProgressTracker,
+    current_progress,
+    track_requests,
+)
+from netmedex.pubtator_archive import PubTatorArchive
+from netmedex.pubtator_cache import (
+    PubTatorCache,
+    concat_responses,
+    merge_articles,
+    split_response,
+)
+from netmedex.pubtator_coalescer import get_shared_coalescer
 from netmedex.pubtator_data import PubTatorArticle, PubTatorCollection
+from netmedex.pubtator_journal import PubTatorJournal
 from netmedex.pubtator_parser import PubTatorIterator
+from netmedex.pubtator_store import PubTatorStore
+from netmedex.rate_limiter import (
+    RATE_LIMITED_STATUS,
+    RateLimiter,
+    current_job,
+    get_shared_rate_limiter,
+    is_rate_limited,
+    parse_retry_after,
+)
+from netmedex.request_metrics import (
+    Endpoint,
+    RequestMetrics,
+    current_metrics,
+    record_metrics,
+    timing_trace_config,
+)
 from netmedex.types import T
-from netmedex.utils import config_logger
+from netmedex.utils import config_logger, generate_uuid
 
 # API GET limit: 100
 PMID_REQUEST_SIZE = 100
 # Fall back to "search" if "cite" failed
 FALLBACK_SEARCH = True
 
-PUBTATOR_SEARCH_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/search/"
-PUBTATOR_CITE_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/cite/tsv"
+PUBTATOR_API_URL = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/"
+# Relative to the base URL of the session
+PUBTATOR_SEARCH_URL = "search/"
+PUBTATOR_CITE_URL = "cite/tsv"
+PUBTATOR_EXPORT_URL = "publications/export/{format}"
 
 # Users post no more than three requests per second
 # https://www.ncbi.nlm.nih.gov/research/pubtator3/api
 MAX_CONCURRENT_REQUESTS = 3
 REQUEST_INTERVAL = 0.8
+# Connection pool of a session
+MAX_CONNECTIONS = 10
+DNS_CACHE_TTL = 300
+# Bytes of a response body decoded at a time (see `BioCJSONStreamDecoder`)
+STREAM_CHUNK_SIZE = 2**16
+
+# Maximal articles of a date-range sub-query when sharding a search by publication date
+# (`search` becomes unreliable for large result sets, see `PubTatorAPI.__init__`)
+MAX_SHARD_ARTICLES = 5000
+# Earliest publication year to shard from
+SHARD_START_YEAR = 1800
+
+# Upper bound of the waiting time requested by `Retry-After`
+MAX_RETRY_AFTER = 60
+# Share the request rate with other processes through this file (e.g., the web app)
+RATE_LIMIT_FILE_ENV = "NETMEDEX_RATE_LIMIT_FILE"
 
 PUBTATOR_RETRY_ERRORS = {
     # Error code: custom error message
@@ -48,6 +124,10 @@ PUBTATOR_RETRY_ERRORS = {
 logger = logging.getLogger(__name__)
 config_logger(is_debug=False)
 
+# Sessions opened by `PubTatorAPI` runs in the current context by job, so that the
+# steps of a run share one session while concurrent runs of an instance do not
+open_sessions: ContextVar[Mapping[Hashable, ClientSession]] = ContextVar("open_sessions")
+
 
 class PubTatorAPI:
     """Retrieve PubMed articles with entity annotations via PubTator3 API.
@@ -75,7 +155,66 @@ class PubTatorAPI:
         return_pmid_only (bool):
             Whether to return only the list of PMIDs without fetching full annotations. Defaults to False.
         queue (Queue | None):
-            Optional queue for progress messaging (e.g., for UI or frontend logging).
+            Deprecated, use `progress` instead. Optional queue receiving progress messages
+            formatted as "status/n/total", followed by None when all articles are retrieved.
+        cache (PubTatorCache | PubTatorStore | None):
+            Optional on-disk cache of exported articles, or a persistent `PubTatorStore`.
+            Cached PMIDs are not requested again.
+        pipeline (bool):
+            Whether to request annotations for each page of search results as soon as the page
+            is retrieved instead of waiting for all pages. Only applies to `query`. Defaults to False.
+        rate_limiter (RateLimiter | None):
+            Limiter applied to every request. Defaults to the process-wide limiter shared by
+            all `PubTatorAPI` instances (see `get_default_rate_limiter`).
+        checkpoint_dir (str | Path | None):
+            Directory to keep a checkpoint journal of the request. If the request fails,
+            running the same request again resumes from the unfinished batches. Defaults to None.
+        split_failed_batches (bool):
+            Whether to split an export batch into halves (down to single PMIDs) when it keeps
+            failing instead of failing the whole request. PMIDs that still fail are reported
+            in `failed_pmids` and `metadata["failed_pmids"]` of the result. Defaults to True.
+        session (ClientSession | None):
+            Session to send requests with, e.g., to reuse connections across queries in the
+            same event loop. Create it by `create_session`. Requests of other sessions are sent
+            through a rate limited session sharing their connections.
+            The session is not closed by `PubTatorAPI`. Defaults to a new session for each run.
+        parse_executor (Executor | None):
+            Executor to parse the responses in, e.g., a `ProcessPoolExecutor` for large full-text
+            requests. Each batch is parsed as soon as it is retrieved while the other batches are
+            still being requested. Articles are returned in the order of the PMIDs.
+            The executor is not shut down by `PubTatorAPI`. Defaults to parsing in the event loop.
+        progress (ProgressCallback | None):
+            Callable receiving a `ProgressEvent` whenever a batch of articles completes or a
+            request is retried, e.g., `TqdmProgress()` to display progress bars or a
+            `ProgressStream` to iterate the events asynchronously. Defaults to None (no progress).
+        coalesce_requests (bool):
+            Whether to wait for the articles already being requested by other `PubTatorAPI`
+            instances in this process instead of requesting them again (see
+            `PubTatorCoalescer`). Defaults to True.
+        archive (str | Path | None):
+            Path to save the retrieved articles in a gzipped JSON Lines archive, one raw
+            article per line, so they can be parsed again with `read_pubtator_archive`
+            without requesting them. Full-text articles are archived whole, so they are
+            requested instead of being read from `cache`, which may hold pruned copies.
+            Defaults to None.
+        shard_by_date (bool):
+            Whether to split a `query` requesting more than `MAX_SHARD_ARTICLES` articles into
+            sub-queries of publication year ranges small enough for the server, search them
+            concurrently, and merge their PMIDs in the order of `sort`. Only applies to `query`
+            and takes precedence over `pipeline`. Defaults to False.
+        refresh (bool):
+            Whether to retrieve only the articles newer than a previous run of the same `query`.
+            Search results are paged through from the newest (`sort` is "date") until a page
+            contains a PMID in `known_pmids` or in the `PubTatorStore` passed as `cache`; the
+            articles before it are retrieved. Takes precedence over `pipeline` and
+            `shard_by_date`. Defaults to False.
+        known_pmids (Collection[str | int] | None):
+            PMIDs retrieved by a previous run, e.g., read from its output by
+            `PubTatorIO.read_pmids`. Only applies to `refresh`. Defaults to None.
+        base_url (str):
+            Base URL of the PubTator3 API, e.g., a local stand-in server for benchmarking
+            (see `netmedex.pubtator_server`). Ignored if `session` is created by
+            `create_session`, which has its own base URL. Defaults to `PUBTATOR_API_URL`.
     """
 
     def __init__(
@@ -88,6 +227,20 @@ class PubTatorAPI:
         full_text: bool = False,
         return_pmid_only: bool = False,
         queue: Queue | None = None,
+        cache: PubTatorCache | PubTatorStore | None = None,
+        pipeline: bool = False,
+        rate_limiter: RateLimiter | None = None,
+        checkpoint_dir: str | Path | None = None,
+        split_failed_batches: bool = True,
+        session: ClientSession | None = None,
+        parse_executor: Executor | None = None,
+        base_url: str = PUBTATOR_API_URL,
+        progress: ProgressCallback | None = None,
+        coalesce_requests: bool = True,
+        archive: str | Path | None = None,
+        shard_by_date: bool = False,
+        refresh: bool = False,
+        known_pmids: Collection[str | int] | None = None,
     ):
         self.query = query
         self.pmid_list = [pmid for pmid in pmid_list if pmid] if pmid_list is not None else None
@@ -95,8 +248,48 @@ class PubTatorAPI:
         self.full_text = full_text
         self.return_pmid_only = return_pmid_only
         self.queue = queue if isinstance(queue, Queue) else None
+        self.progress = progress
+        self.coalescer = get_shared_coalescer() if coalesce_requests else None
+        self.archive = PubTatorArchive(archive) if archive is not None else None
+        self.cache = cache
+        self.pipeline = pipeline
+        self.shard_by_date = shard_by_date
+        self.refresh = refresh
+        self.known_pmids = (
+            {str(pmid) for pmid in known_pmids} if known_pmids is not None else set()
+        )
+        if refresh:
+            # New articles come first only when sorted by date
+            sort = "date"
+        self.rate_limiter = (
+            rate_limiter if rate_limiter is not None else get_default_rate_limiter()
+        )
+        self.split_failed_batches = split_failed_batches
+        self.failed_pmids: dict[str, str] = {}
+        """{pmid: error message} of the articles that cannot be retrieved"""
+        self.metrics = RequestMetrics()
+        """Telemetry of the requests sent by the last run"""
+        # Identify this instance in the shared rate limiter
+        self._job_id = generate_uuid()
+        self.session = session
+        self.parse_executor = parse_executor
+        self.base_url = base_url
         self.sort: Literal["score", "date"] = sort
         self.response_format: Literal["biocjson", "pubtator"] = request_format
+        self.journal = None
+        if checkpoint_dir is not None:
+            self.journal = PubTatorJournal.from_request(
+                checkpoint_dir,
+                query=query.strip() if query is not None else None,
+                pmid_list=[str(pmid) for pmid in self.pmid_list] if self.pmid_list else None,
+                sort=sort,
+                max_articles=max_articles,
+                format=request_format,
+                full_text=full_text,
+                refresh=refresh,
+                # Batches journaled without an archive may be pruned
+                full_documents=self._keeps_full_documents,
+            )
         # self.api_method: Literal["search", "cite"] = "cite" if sort == "date" else "search"
 
         # TODO: `cite` often fails when the number of articles exceeds ~7000
@@ -109,121 +302,365 @@ class PubTatorAPI:
     async def arun(self):
         return await asyncio.create_task(self._run())
 
+    def stream(self) -> Iterator[PubTatorArticle]:
+        """Synchronous version of `astream`."""
+        loop = asyncio.new_event_loop()
+        article_stream = self.astream()
+        # Run every step of the stream in one context, as a single task would
+        context = copy_context()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(
+                        loop.create_task(anext(article_stream), context=context)
+                    )
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(loop.create_task(article_stream.aclose(), context=context))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def astream(self) -> AsyncIterator[PubTatorArticle]:
+        """Yield articles as soon as each batch of annotations is retrieved.
+
+        Articles are yielded in the order the batches complete rather than collected
+        into a `PubTatorCollection`, so only the batches in flight are kept in memory.
+        Iterate the stream in one task, and close it with `aclose` (e.g., by
+        `contextlib.aclosing`) to stop early.
+        """
+        if self.return_pmid_only:
+            raise ValueError("`return_pmid_only` is not supported when streaming articles.")
+
+        self.failed_pmids = {}
+        self.metrics = RequestMetrics()
+        # Identify the requests of this stream in a session shared with other runs
+        job_token = current_job.set(self._job_id)
+        try:
+            async with self._open_session():
+                with record_metrics(self.metrics):
+                    pmid_list = await self._get_pmid_list()
+
+                with self._open_archive():
+                    async for res_txt_or_json in self.stream_publication_search(pmid_list):
+                        self._archive_response(res_txt_or_json)
+                        if self.parse_executor is None:
+                            articles = self._parse_response(res_txt_or_json)
+                        else:
+                            articles = await asyncio.get_running_loop().run_in_executor(
+                                self.parse_executor, self._get_parser(), res_txt_or_json
+                            )
+                        for article in articles:
+                            yield article
+        finally:
+            current_job.reset(job_token)
+
+        self._finish_request()
+
     async def _run(self):
+        self.metrics = RequestMetrics()
+        # Identify the requests of this run in a session shared with other runs
+        current_job.set(self._job_id)
+        # Share one session for searching and retrieving articles
+        with record_metrics(self.metrics), self._open_archive():
+            async with self._open_session():
+                return await self._run_in_session()
+
+    async def _run_in_session(self):
+        self.failed_pmids = {}
+        responses: Iterable[Any] | AsyncIterable[Any]
+        if (
+            self.pipeline
+            and not self.shard_by_date
+            and not self.refresh
+            and self.query is not None
+            and not self.return_pmid_only
+        ):
+            self._check_input()
+            pmid_list, responses = await self.pipelined_search(self.query)
+        else:
+            pmid_list = await self._get_pmid_list()
+
+            if self.return_pmid_only:
+                if self.journal is not None:
+                    self.journal.remove()
+                return PubTatorCollection(
+                    headers=[],
+                    articles=[],
+                    metadata={"pmid_list": pmid_list, "metrics": self.metrics},
+                )
+
+            if self.parse_executor is None:
+                responses = await self.batch_publication_search(pmid_list)
+            else:
+                # Parse each batch while the remaining batches are being requested
+                responses = self.stream_publication_search(pmid_list)
+
+        articles: list[PubTatorArticle] = []
+        if self.parse_executor is None:
+            assert isinstance(responses, Iterable)
+            for res_txt_or_json in responses:
+                self._archive_response(res_txt_or_json)
+                articles.extend(self._parse_response(res_txt_or_json))
+        else:
+            articles = await self._parse_in_executor(responses)
+
+        if self.pipeline or self.journal is not None or self.parse_executor is not None:
+            # Batches complete out of order in pipelined or streaming mode or when resumed
+            pmid_order = {pmid: idx for idx, pmid in enumerate(pmid_list)}
+            articles.sort(key=lambda article: pmid_order.get(str(article.pmid), len(pmid_order)))
+
+        self._finish_request()
+
+        metadata: dict[str, Any] = {"pmid_list": pmid_list, "metrics": self.metrics}
+        if self.failed_pmids:
+            metadata["failed_pmids"] = self.failed_pmids
+
+        return PubTatorCollection(headers=[], articles=articles, metadata=metadata)
+
+    def _finish_request(self):
+        if self.failed_pmids:
+            logger.warning(f"Failed to retrieve {len(self.failed_pmids)} articles.")
+        # Keep the journal to retry the failed PMIDs
+        elif self.journal is not None:
+            self.journal.remove()
+
+    def _check_input(self):
         if self.query is not None and self.pmid_list is not None:
             raise ValueError("Only one of `query` and `pmid_list` may be provided.")
 
-        pmid_list = None
-        # Searchy by free-text
         if self.query is not None:
             self.query = self.query.strip()
             if not self.query:
                 raise EmptyInput
-            pmid_list = await self.get_query_results(self.query)
-        # Search by PMID list
         elif self.pmid_list is not None:
             if not self.pmid_list:
                 raise EmptyInput
+
+    async def _get_pmid_list(self) -> list[str]:
+        self._check_input()
+
+        if self.journal is not None and self.journal.pmid_list is not None:
+            return self.journal.pmid_list
+
+        pmid_list = None
+        # Searchy by free-text
+        if self.query is not None:
+            pmid_list = await self.get_query_results(self.query)
+        # Search by PMID list
+        elif self.pmid_list is not None:
             pmid_list = [str(pmid) for pmid in self.pmid_list]
 
         if not pmid_list:
+            if self.refresh:
+                raise NoArticles("No new articles found by PubTator3 API.")
             raise NoArticles
 
-        if self.return_pmid_only:
-            return PubTatorCollection(headers=[], articles=[], metadata={"pmid_list": pmid_list})
+        if self.journal is not None:
+            self.journal.write_pmid_list(pmid_list)
 
-        responses = await self.batch_publication_search(pmid_list)
+        return pmid_list
 
-        articles: list[PubTatorArticle] = []
-        if self.response_format == "biocjson":
-            for res_json in responses:
-                articles.extend(
-                    biocjson_to_pubtator(
-                        res_json=res_json,
-                        full_text=self.full_text,
-                    )
-                )
-        elif self.response_format == "pubtator":
-            for result in responses:
-                articles.extend(
-                    [article for article in PubTatorIterator(result) if article is not None]
-                )
+    def _parse_response(self, res_txt_or_json: Any) -> list[PubTatorArticle]:
+        return self._get_parser()(res_txt_or_json)
+
+    def _get_parser(self) -> Callable[[Any], list[PubTatorArticle]]:
+        # A picklable callable to be sent to a process pool
+        return partial(parse_response, format=self.response_format, full_text=self.full_text)
+
+    async def _parse_in_executor(
+        self,
+        responses: Iterable[Any] | AsyncIterable[Any],
+    ) -> list[PubTatorArticle]:
+        """Parse each response in `parse_executor` as soon as it is available"""
+        loop = asyncio.get_running_loop()
+        parser = self._get_parser()
+        parse_tasks: list[asyncio.Future[list[PubTatorArticle]]] = []
 
-        return PubTatorCollection(headers=[], articles=articles, metadata={"pmid_list": pmid_list})
+        def submit(res_txt_or_json: Any):
+            self._archive_response(res_txt_or_json)
+            parse_tasks.append(loop.run_in_executor(self.parse_executor, parser, res_txt_or_json))
+
+        try:
+            if isinstance(responses, AsyncIterable):
+                async for res_txt_or_json in responses:
+                    submit(res_txt_or_json)
+            else:
+                for res_txt_or_json in responses:
+                    submit(res_txt_or_json)
+            parsed_responses = await asyncio.gather(*parse_tasks)
+        finally:
+            for task in parse_tasks:
+                task.cancel()
+
+        return [article for articles in parsed_responses for article in articles]
 
     async def get_query_results(self, query: str):
         logger.info(f"Query: {query}")
         article_list: list[str] = []
-        async with ClientSession() as session:
-            if self.api_method == "search":
+        async with self._open_session() as session:
+            if self.refresh:
+                article_list = await self._handle_query_refresh(query, session=session)
+            elif self.shard_by_date:
+                article_list = await self._handle_query_shards(query, session=session)
+            elif self.api_method == "search":
                 article_list = await self._handle_query_search(query, session=session)
             elif self.api_method == "cite":
                 article_list = await self._handle_query_cite(query, session=session)
 
         return article_list
 
-    async def _handle_query_search(self, query: str, session: ClientSession):
-        res_json = await send_search_query(query, session=session)
+    async def _handle_query_search(
+        self,
+        query: str,
+        session: ClientSession,
+        res_json: Any | None = None,
+    ):
+        if res_json is None:
+            res_json = await send_search_query(query, session=session)
 
-        collected_article_ids: list[str] = []
         total_articles = int(res_json["count"])
-        page_size = int(res_json["page_size"])
-        collected_article_ids.extend(get_article_ids(res_json))
-
         n_articles_to_request = get_n_articles(self.max_articles, total_articles)
-        if n_articles_to_request <= page_size:
-            return collected_article_ids[:n_articles_to_request]
+        if n_articles_to_request <= int(res_json["page_size"]):
+            return get_article_ids(res_json)[:n_articles_to_request]
 
-        num_page = n_articles_to_request // page_size
-        if n_articles_to_request % page_size > 0:
-            num_page += 1
-        pages = range(2, num_page + 1)
+        self._log_search_step()
+        tracker = self._start_progress("search", n_articles_to_request)
+        results = await self._request_search_pages(
+            query, res_json, n_articles_to_request, session, tracker
+        )
+        tracker.finish()
 
-        # Get search results in different pages until the max_articles is reached
-        if self.return_pmid_only:
-            logger.info("Step 1/1: Requesting article PMIDs...")
-        else:
-            logger.info("Step 1/2: Requesting article PMIDs...")
+        return [str(result.get("pmid")) for result in results]
 
-        async def each_request(page, pbar):
-            article_ids = get_article_ids(
-                await send_search_query_with_page(query, page, self.sort, session)
+    async def _handle_query_shards(self, query: str, session: ClientSession):
+        res_json = await send_search_query(query, session=session)
+        total_articles = int(res_json["count"])
+        n_articles_to_request = min(self.max_articles, total_articles)
+        # A single query is enough for the top results
+        if n_articles_to_request <= MAX_SHARD_ARTICLES:
+            return await self._handle_query_search(query, session=session, res_json=res_json)
+
+        logger.info(f"Find {total_articles} articles, sharding the query by publication date...")
+        shards = await find_date_shards(query, self.sort, session)
+        logger.info(f"Split the query into {len(shards)} shards")
+
+        if self.sort == "date":
+            # Shards are ordered from the newest, the older ones are not needed
+            n_articles = 0
+            for idx, shard in enumerate(shards):
+                n_articles += shard.count
+                if n_articles >= n_articles_to_request:
+                    shards = shards[: idx + 1]
+                    break
+
+        self._log_search_step()
+        # Every shard may contain the top articles by score
+        shard_sizes = [min(shard.count, n_articles_to_request) for shard in shards]
+        tracker = self._start_progress("search", sum(shard_sizes))
+        result_lists = await asyncio.gather(
+            *(
+                self._request_search_pages(shard.query, shard.first_page, size, session, tracker)
+                for shard, size in zip(shards, shard_sizes, strict=True)
             )
+        )
+        tracker.finish()
 
-            # Display progress
-            update = page_size
-            if pbar.n + page_size > pbar.total:
-                update = pbar.total - pbar.n
-            pbar.update(update)
+        pmid_list = merge_shard_results(result_lists, self.sort)
+        logger.info(f"Requesting {min(n_articles_to_request, len(pmid_list))} articles...")
 
-            if self.queue is not None:
-                # For frontend display
-                self.queue.put(progress_message("search-search", pbar.n, pbar.total))
+        return pmid_list[:n_articles_to_request]
 
-            return article_ids
+    async def _handle_query_refresh(self, query: str, session: ClientSession):
+        """Page through the newest search results until reaching a known article."""
+        self._log_search_step()
+        tracker = self._start_progress("search", self.max_articles)
+        new_pmids: list[str] = []
+        page = 1
+        while True:
+            # Pages are requested one by one since each may be the last one needed
+            with track_requests(tracker):
+                res_json = await send_search_query_with_page(query, page, "date", session)
+            if page == 1:
+                tracker.total = min(self.max_articles, int(res_json["count"]))
+            page_pmids = get_article_ids(res_json)
+            known_pmids = self._find_known_pmids(page_pmids)
+            # Articles published on the same date may be listed in any order, so keep
+            # the new articles of the last page too
+            page_new_pmids = [pmid for pmid in page_pmids if pmid not in known_pmids]
+            new_pmids.extend(page_new_pmids)
+            # Known articles are not retrieved, so they do not count towards the total
+            tracker.update(len(page_new_pmids))
+
+            if (
+                known_pmids
+                or len(new_pmids) >= self.max_articles
+                or page * int(res_json["page_size"]) >= int(res_json["count"])
+            ):
+                break
+            page += 1
+
+        new_pmids = list(dict.fromkeys(new_pmids))[: self.max_articles]
+        tracker.total = len(new_pmids)
+        tracker.finish()
+        logger.info(f"Find {len(new_pmids)} new articles")
+
+        return new_pmids
+
+    def _find_known_pmids(self, pmids: Sequence[str]) -> set[str]:
+        """Return the PMIDs retrieved by a previous run or saved in the store."""
+        known_pmids = {pmid for pmid in pmids if pmid in self.known_pmids}
+        if isinstance(self.cache, PubTatorStore):
+            known_pmids.update(self.cache.find_pmids(pmids, self.response_format, self.full_text))
+        return known_pmids
+
+    async def _request_search_pages(
+        self,
+        query: str,
+        res_json: Any,
+        n_articles_to_request: int,
+        session: ClientSession,
+        tracker: ProgressTracker,
+    ) -> list[dict[str, Any]]:
+        """Request the pages of search results after the first one (`res_json`)."""
+        page_size = int(res_json["page_size"])
+        collected_results: list[dict[str, Any]] = list(res_json["results"])
+        tracker.update(len(collected_results))
 
-        with tqdm(total=n_articles_to_request, file=sys.stdout) as pbar:
-            article_id_lists = await batch_request([partial(each_request, p, pbar) for p in pages])
-            if len(article_id_lists) != len(pages):
-                logger.error(
-                    f"Missing output: expected {len(article_id_lists)} batch outputs but only have {len(pages)}."
-                )
-            pbar.n = pbar.total
-            if self.queue is not None:
-                self.queue.put(progress_message("search-search", pbar.n, pbar.total))
+        num_page = n_articles_to_request // page_size
+        if n_articles_to_request % page_size > 0:
+            num_page += 1
+        pages = range(2, num_page + 1)
+
+        # Get search results in different pages until the max_articles is reached
+        async def each_request(page, tracker: ProgressTracker):
+            with track_requests(tracker):
+                results = (await send_search_query_with_page(query, page, self.sort, session))[
+                    "results"
+                ]
+            tracker.update(page_size)
+
+            return results
+
+        result_lists = await batch_request(
+            [partial(each_request, p, tracker) for p in pages], metrics=self.metrics
+        )
+        if len(result_lists) != len(pages):
+            logger.error(
+                f"Missing output: expected {len(result_lists)} batch outputs but only have {len(pages)}."
+            )
 
-        for article_ids in article_id_lists:
-            collected_article_ids.extend(article_ids)
+        for results in result_lists:
+            collected_results.extend(results)
 
-        return collected_article_ids[:n_articles_to_request]
+        return collected_results[:n_articles_to_request]
 
     async def _handle_query_cite(self, query: str, session: ClientSession):
-        if self.return_pmid_only:
-            logger.info("Step 1/1: Requesting article PMIDs...")
-        else:
-            logger.info("Step 1/2: Requesting article PMIDs...")
+        self._log_search_step()
+        tracker = self._start_progress("search", 0)
         try:
-            res_text = await send_cite_query(query, session=session)
+            with track_requests(tracker):
+                res_text = await send_cite_query(query, session=session)
         except (UnsuccessfulRequest, TypeError) as e:
             # TypeError happens if no response is returned
             if FALLBACK_SEARCH:
@@ -235,74 +672,433 @@ class PubTatorAPI:
         pmid_list = parse_cite_response(res_text)
         n_articles_to_request = get_n_articles(self.max_articles, len(pmid_list))
 
-        with tqdm(total=n_articles_to_request, file=sys.stdout) as pbar:
-            pbar.n = pbar.total
-
-        if self.queue is not None:
-            self.queue.put(
-                progress_message("search-cite", n_articles_to_request, n_articles_to_request)
-            )
+        tracker.total = n_articles_to_request
+        tracker.finish()
 
         return pmid_list[:n_articles_to_request]
 
-    async def batch_publication_search(self, pmid_list: Sequence[str]):
-        if self.query is None:
-            logger.info("Step 1/1: Requesting article annotations...")
-        else:
-            logger.info("Step 2/2: Requesting article annotations...")
+    async def pipelined_search(self, query: str) -> tuple[list[str], list[Any]]:
+        """Search articles and request their annotations at the same time.
+
+        PMIDs from each retrieved page of search results are sent in export batches
+        right away. Both kinds of requests share one rate limit. The PMIDs of the
+        search results are checkpointed once every page is retrieved, so a resumed
+        run requests the remaining articles without searching again.
+
+        Returns:
+            tuple[list[str], list[Any]]:
+                The PMIDs of the search results and the export responses.
+        """
+        if self.journal is not None and self.journal.pmid_list is not None:
+            pmid_list = self.journal.pmid_list
+            return pmid_list, await self.batch_publication_search(pmid_list)
 
-        async with ClientSession() as session:
+        logger.info(f"Query: {query}")
+        # Leave room in the rate limit for export requests
+        search_slots = asyncio.Semaphore(max(self.rate_limiter.max_at_once - 1, 1))
+
+        async with self._open_session() as session:
+            res_json = await send_search_query(query, session=session)
+
+            total_articles = int(res_json["count"])
+            page_size = int(res_json["page_size"])
+            n_articles_to_request = get_n_articles(self.max_articles, total_articles)
+            if n_articles_to_request == 0:
+                raise NoArticles
+
+            num_page = n_articles_to_request // page_size
+            if n_articles_to_request % page_size > 0:
+                num_page += 1
+
+            logger.info("Requesting article PMIDs and annotations...")
+            pages = {1: get_article_ids(res_json)[:n_articles_to_request]}
+            responses: list[Any] = []
+            # Export jobs are queued as search pages arrive, and None ends the queue
+            export_jobs: asyncio.Queue[Callable[[], Awaitable[Any]] | None] = asyncio.Queue()
+            pmids_to_request: list[str] = []
+            seen_pmids: set[str] = set()
+            resumed_responses, completed_pmids = self._load_checkpoint()
+            responses.extend(resumed_responses)
+            seen_pmids.update(completed_pmids)
+
+            search_tracker = self._start_progress("search", n_articles_to_request)
+            get_tracker = self._start_progress("get", n_articles_to_request)
+
+            async def each_export(batch: list[str]):
+                return await self._request_publication_batch(batch, session, get_tracker)
+
+            def submit(pmids: list[str], flush: bool = False):
+                new_pmids = [pmid for pmid in pmids if pmid not in seen_pmids]
+                seen_pmids.update(new_pmids)
+                if self.cache is not None:
+                    cached_articles = self._get_cached_articles(new_pmids)
+                    if cached_articles:
+                        responses.append(
+                            merge_articles(list(cached_articles.values()), self.response_format)
+                        )
+                        get_tracker.update(len(cached_articles))
+                    new_pmids = [pmid for pmid in new_pmids if pmid not in cached_articles]
+                pmids_to_request.extend(new_pmids)
+
+                while len(pmids_to_request) >= PMID_REQUEST_SIZE or (flush and pmids_to_request):
+                    batch = pmids_to_request[:PMID_REQUEST_SIZE]
+                    del pmids_to_request[:PMID_REQUEST_SIZE]
+                    export_jobs.put_nowait(self.metrics.time_job(partial(each_export, batch)))
+
+            async def iter_export_jobs():
+                while (job := await export_jobs.get()) is not None:
+                    yield job
+
+            async def fetch_exports() -> list[Any]:
+                return [res async for res in stream_request(iter_export_jobs())]
+
+            async def each_search(page: int):
+                async with search_slots:
+                    with track_requests(search_tracker):
+                        res_json = await send_search_query_with_page(
+                            query, page, self.sort, session
+                        )
+                n_remaining = n_articles_to_request - (page - 1) * page_size
+                pages[page] = get_article_ids(res_json)[: max(n_remaining, 0)]
+                submit(pages[page])
+                search_tracker.update(page_size)
+
+            async def search_pages() -> list[str]:
+                await asyncio.gather(*(each_search(page) for page in range(2, num_page + 1)))
+                search_tracker.finish()
+                pmid_list = [pmid for page in sorted(pages) for pmid in pages[page]]
+                if self.journal is not None:
+                    self.journal.write_pmid_list(pmid_list)
+                submit([], flush=True)
+                export_jobs.put_nowait(None)
+                return pmid_list
+
+            submit(pages[1])
+            search_tracker.update(len(pages[1]))
+            # Exports are sent while searching, so a failed export stops the search too
+            search_task = asyncio.ensure_future(search_pages())
+            export_task = asyncio.ensure_future(fetch_exports())
+            try:
+                pmid_list, fetched_responses = await asyncio.gather(search_task, export_task)
+            finally:
+                search_task.cancel()
+                export_task.cancel()
+            get_tracker.finish()
 
-            async def each_request(batch, pbar):
-                pmid_start = batch * PMID_REQUEST_SIZE
-                pmid_end = pmid_start + PMID_REQUEST_SIZE
-                if pmid_end >= len(pmid_list):
-                    pmid_end = None
+        # End frontend progress display
+        if self.queue is not None:
+            self.queue.put(None)
 
-                res_txt_or_json = await send_publication_request(
-                    pmid_string=",".join(pmid_list[pmid_start:pmid_end]),
-                    article_id_type="pmids",
-                    format=self.response_format,
-                    full_text=self.full_text,
-                    session=session,
+        if self.cache is not None:
+            for res_txt_or_json in fetched_responses:
+                self.cache.set_many(
+                    split_response(res_txt_or_json, self.response_format),
+                    self.response_format,
+                    self.full_text,
                 )
 
-                # Display progress
-                update = PMID_REQUEST_SIZE
-                if pbar.n + PMID_REQUEST_SIZE > pbar.total:
-                    update = pbar.total - pbar.n
-                pbar.update(update)
+        return pmid_list, responses + fetched_responses
+
+    async def batch_publication_search(self, pmid_list: Sequence[str]):
+        self._log_publication_step()
+
+        cached_articles = {}
+        if self.cache is not None:
+            cached_articles = self._get_cached_articles(pmid_list)
+            logger.info(f"Found {len(cached_articles)} cached articles")
+        resumed_responses, completed_pmids = self._load_checkpoint()
+        pmids_to_request = [
+            pmid
+            for pmid in pmid_list
+            if pmid not in cached_articles and pmid not in completed_pmids
+        ]
+
+        async with self._open_session() as session:
+            tracker = self._start_progress("get", len(pmids_to_request))
+            batches = get_batches(pmids_to_request)
+            res_list = await batch_request(
+                [
+                    partial(self._request_publication_batch, batch, session, tracker)
+                    for batch in batches
+                ],
+                metrics=self.metrics,
+            )
 
-                if self.queue is not None:
-                    # For frontend display
-                    self.queue.put(progress_message("get", pbar.n, pbar.total))
+            if len(res_list) != len(batches):
+                logger.error(
+                    f"Missing output: expected {len(res_list)} batch outputs but only have {len(batches)}."
+                )
+            tracker.finish()
+
+        # End frontend progress display
+        if self.queue is not None:
+            self.queue.put(None)
 
-                return res_txt_or_json
+        res_list = resumed_responses + res_list
 
-            num_articles = len(pmid_list)
-            with tqdm(total=num_articles, file=sys.stdout) as pbar:
-                num_batch = num_articles // PMID_REQUEST_SIZE
-                if num_articles % PMID_REQUEST_SIZE > 0:
-                    num_batch += 1
-                batches = range(0, num_batch)
+        if self.cache is not None:
+            res_list = self._merge_with_cached_articles(pmid_list, res_list, cached_articles)
 
-                res_list = await batch_request(
-                    [partial(each_request, batch, pbar) for batch in batches],
+        return res_list
+
+    async def stream_publication_search(self, pmid_list: Sequence[str]) -> AsyncIterator[Any]:
+        """Yield export responses in the order of completion (cached articles first)."""
+        self._log_publication_step()
+
+        resumed_responses, completed_pmids = self._load_checkpoint()
+        for res_txt_or_json in resumed_responses:
+            yield res_txt_or_json
+
+        pmids_to_request = []
+        for batch in get_batches([pmid for pmid in pmid_list if pmid not in completed_pmids]):
+            if self.cache is None:
+                pmids_to_request.extend(batch)
+                continue
+            cached_articles = self._get_cached_articles(batch)
+            pmids_to_request.extend(pmid for pmid in batch if pmid not in cached_articles)
+            if cached_articles:
+                yield merge_articles(
+                    [cached_articles[pmid] for pmid in batch if pmid in cached_articles],
+                    self.response_format,
                 )
 
-                if len(res_list) != len(batches):
-                    logger.error(
-                        f"Missing output: expected {len(res_list)} batch outputs but only have {len(batches)}."
+        async with self._open_session() as session:
+            tracker = self._start_progress("get", len(pmids_to_request))
+            jobs = [
+                partial(self._request_publication_batch, batch, session, tracker)
+                for batch in get_batches(pmids_to_request)
+            ]
+            async for res_txt_or_json in stream_request(jobs, metrics=self.metrics):
+                if self.cache is not None:
+                    self.cache.set_many(
+                        split_response(res_txt_or_json, self.response_format),
+                        self.response_format,
+                        self.full_text,
                     )
-                pbar.n = pbar.total
-                if self.queue is not None:
-                    self.queue.put(progress_message("get", pbar.n, pbar.total))
+                yield res_txt_or_json
+            tracker.finish()
 
         # End frontend progress display
         if self.queue is not None:
             self.queue.put(None)
 
-        return res_list
+    async def _request_publication_batch(
+        self,
+        pmids: Sequence[str],
+        session: ClientSession,
+        tracker: ProgressTracker,
+    ):
+        with (
+            track_requests(tracker),
+            record_metrics(self.metrics),
+            keep_full_documents(self._keeps_full_documents),
+        ):
+            res_txt_or_json = await self._request_coalesced(pmids, session)
+
+        if self.journal is not None:
+            # Failed PMIDs are requested again when resumed
+            self.journal.append_batch(
+                [pmid for pmid in pmids if pmid not in self.failed_pmids], res_txt_or_json
+            )
+
+        tracker.update(len(pmids))
+
+        return res_txt_or_json
+
+    async def _request_coalesced(self, pmids: Sequence[str], session: ClientSession):
+        """Request the PMIDs not in flight and wait for the others to be retrieved"""
+        if self.coalescer is None:
+            return await self._request_publications(pmids, session)
+
+        scope = (self.base_url, self.response_format, self.full_text, self._keeps_full_documents)
+        claimed, waiting = self.coalescer.claim(pmids, scope)
+        try:
+            res_txt_or_json = (
+                await self._request_publications(claimed, session)
+                if claimed
+                else merge_articles([], self.response_format)
+            )
+        except BaseException:
+            self.coalescer.release(claimed, scope)
+            raise
+        articles = split_response(res_txt_or_json, self.response_format)
+        self.coalescer.release(
+            claimed,
+            scope,
+            articles=articles,
+            errors={
+                pmid: self.failed_pmids[pmid] for pmid in claimed if pmid in self.failed_pmids
+            },
+        )
+        if not waiting:
+            return res_txt_or_json
+
+        retry_pmids = []
+        for pmid, future in waiting.items():
+            try:
+                if (article := await asyncio.wrap_future(future)) is not None:
+                    articles[pmid] = article
+            except UnsuccessfulRequest as e:
+                self.failed_pmids[pmid] = str(e)
+            except RetryableError:
+                retry_pmids.append(pmid)
+        if retry_pmids:
+            articles.update(
+                split_response(
+                    await self._request_coalesced(retry_pmids, session), self.response_format
+                )
+            )
+
+        return merge_articles(
+            [articles[pmid] for pmid in pmids if pmid in articles], self.response_format
+        )
+
+    async def _request_publications(self, pmids: Sequence[str], session: ClientSession):
+        """Request annotations and split the batch into halves if the request keeps failing.
+
+        Only failures caused by the batch itself, e.g., server errors or malformed
+        responses, are split. Rate-limited requests are raised, since smaller batches
+        would only send more requests.
+        """
+        try:
+            return await send_publication_request(
+                pmid_string=",".join(pmids),
+                article_id_type="pmids",
+                format=self.response_format,
+                full_text=self.full_text,
+                session=session,
+            )
+        except (RetryableError, UnsuccessfulRequest) as e:
+            if not self.split_failed_batches or getattr(e, "status", None) in RATE_LIMITED_STATUS:
+                raise e
+            if len(pmids) == 1:
+                logger.warning(f"Failed to retrieve PMID {pmids[0]}: {e}")
+                self.failed_pmids[pmids[0]] = str(e)
+                return merge_articles([], self.response_format)
+
+        logger.warning(f"Failed to retrieve {len(pmids)} articles. Retrying in two halves.")
+        mid = len(pmids) // 2
+        # Request the halves one after the other in the slot of the batch, so that
+        # splitting never exceeds `MAX_CONCURRENT_REQUESTS`
+        responses = [
+            await self._request_publications(pmids[:mid], session),
+            await self._request_publications(pmids[mid:], session),
+        ]
+        return concat_responses(responses, self.response_format)
+
+    def _load_checkpoint(self) -> tuple[list[Any], set[str]]:
+        """Return the responses and PMIDs of the batches completed in previous runs"""
+        if self.journal is None:
+            return [], set()
+        return self.journal.responses, self.journal.completed_pmids
+
+    @asynccontextmanager
+    async def _open_session(self) -> AsyncIterator[ClientSession]:
+        """Reuse the injected or currently open session, or open one for this request"""
+        sessions = open_sessions.get({})
+        if (session := sessions.get(self._job_id)) is not None:
+            yield session
+            return
+        if self.session is not None and is_rate_limited(self.session):
+            yield self.session
+            return
+
+        if self.session is not None:
+            # The injected session was not created by `create_session`
+            session = limit_session(
+                self.session, self.rate_limiter, job=self._job_id, base_url=self.base_url
+            )
+        else:
+            session = create_session(self.rate_limiter, job=self._job_id, base_url=self.base_url)
+        token = open_sessions.set({**sessions, self._job_id: session})
+        try:
+            yield session
+        finally:
+            open_sessions.reset(token)
+            await session.close()
+
+    @contextmanager
+    def _open_archive(self) -> Iterator[PubTatorArchive | None]:
+        if self.archive is None:
+            yield None
+            return
+        with self.archive:
+            yield self.archive
+
+    def _archive_response(self, res_txt_or_json: Any):
+        if self.archive is not None:
+            self.archive.write(
+                split_response(res_txt_or_json, self.response_format),
+                self.response_format,
+                self.full_text,
+            )
+
+    def _log_search_step(self):
+        if self.return_pmid_only:
+            logger.info("Step 1/1: Requesting article PMIDs...")
+        else:
+            logger.info("Step 1/2: Requesting article PMIDs...")
+
+    def _log_publication_step(self):
+        if self.query is None:
+            logger.info("Step 1/1: Requesting article annotations...")
+        else:
+            logger.info("Step 2/2: Requesting article annotations...")
+
+    def _start_progress(self, stage: ProgressStage, total: int) -> ProgressTracker:
+        if self.progress is None and self.queue is None:
+            return ProgressTracker(stage, total)
+        return ProgressTracker(stage, total, callback=self._emit_progress)
+
+    def _emit_progress(self, event: ProgressEvent):
+        if self.progress is not None:
+            self.progress(event)
+        if self.queue is not None:
+            # Legacy messages for the web app
+            status = f"search-{self.api_method}" if event.stage == "search" else event.stage
+            self.queue.put(progress_message(status, event.completed, event.total))
+
+    @property
+    def _keeps_full_documents(self) -> bool:
+        """Whether full-text documents are archived whole instead of pruned while decoding"""
+        return self.archive is not None and self.full_text and self.response_format == "biocjson"
+
+    def _get_cached_articles(self, pmids: Collection[str]) -> dict[str, Any]:
+        """Return the cached articles of `pmids`.
+
+        Cached full-text documents may have been pruned while decoding, so none are
+        returned when full documents are archived.
+        """
+        if self.cache is None or self._keeps_full_documents:
+            return {}
+        return self.cache.get_many(pmids, self.response_format, self.full_text)
+
+    def _merge_with_cached_articles(
+        self,
+        pmid_list: Sequence[str],
+        res_list: list[Any],
+        cached_articles: dict[str, Any],
+    ):
+        """Cache the newly fetched articles and rebuild the responses in the order of `pmid_list`"""
+        assert self.cache is not None
+
+        fetched_articles = {}
+        for res_txt_or_json in res_list:
+            fetched_articles.update(split_response(res_txt_or_json, self.response_format))
+        self.cache.set_many(fetched_articles, self.response_format, self.full_text)
+
+        all_articles = {**cached_articles, **fetched_articles}
+        merged_res_list = []
+        for start in range(0, len(pmid_list), PMID_REQUEST_SIZE):
+            articles = [
+                all_articles[pmid]
+                for pmid in pmid_list[start : start + PMID_REQUEST_SIZE]
+                if pmid in all_articles
+            ]
+            if articles:
+                merged_res_list.append(merge_articles(articles, self.response_format))
+
+        return merged_res_list
 
 
 async def send_search_query(
@@ -335,7 +1131,7 @@ async def send_search_query_with_page(
     sort: Literal["score", "date"],
     session: ClientSession,
 ):
-    url = "https://www.ncbi.nlm.nih.gov/research/pubtator3-api/search/"
+    url = PUBTATOR_SEARCH_URL
     if sort == "score":
         params = {"text": query, "sort": "score desc", "page": page}
     elif sort == "date":
@@ -343,6 +1139,91 @@ async def send_search_query_with_page(
     return await request_pubtator3(url, params, session, is_json=True)
 
 
+@dataclass
+class DateShard:
+    """A sub-query of the articles published from `start_year` to `end_year`."""
+
+    query: str
+    start_year: int
+    end_year: int
+    count: int
+    first_page: Any
+    """The first page of search results"""
+
+
+def build_date_range_query(query: str, start_year: int, end_year: int) -> str:
+    """Restrict `query` to the articles published from `start_year` to `end_year`."""
+    return f"({query}) AND {start_year}:{end_year}[dp]"
+
+
+async def find_date_shards(
+    query: str,
+    sort: Literal["score", "date"],
+    session: ClientSession,
+    max_articles: int | None = None,
+    start_year: int = SHARD_START_YEAR,
+    end_year: int | None = None,
+) -> list[DateShard]:
+    """Split `query` into sub-queries of publication year ranges.
+
+    The year range is halved until each sub-query has at most `max_articles`
+    results. Both halves are searched concurrently under the rate limit of
+    `session`. A single year with more results is kept as is.
+
+    Args:
+        query (str):
+            The query to split.
+        sort (Literal["score", "date"]):
+            Sorting method of the first page of search results of each sub-query.
+        session (ClientSession):
+            Session to send the search requests with.
+        max_articles (int | None):
+            Maximal number of results of a sub-query. Defaults to `MAX_SHARD_ARTICLES`.
+        start_year (int):
+            Earliest publication year. Defaults to `SHARD_START_YEAR`.
+        end_year (int | None):
+            Latest publication year. Defaults to the current year.
+
+    Returns:
+        list[DateShard]:
+            The sub-queries with results, from the newest to the oldest.
+    """
+    if max_articles is None:
+        max_articles = MAX_SHARD_ARTICLES
+    if end_year is None:
+        end_year = date.today().year
+
+    async def split(start: int, end: int) -> list[DateShard]:
+        sub_query = build_date_range_query(query, start, end)
+        res_json = await send_search_query_with_page(sub_query, 1, sort, session)
+        count = int(res_json["count"])
+        if count == 0:
+            return []
+        if count <= max_articles or start == end:
+            if count > max_articles:
+                logger.warning(f"{count} articles in {start} exceed the shard size {max_articles}")
+            return [DateShard(sub_query, start, end, count, res_json)]
+
+        mid = (start + end) // 2
+        newer, older = await asyncio.gather(split(mid + 1, end), split(start, mid))
+        return newer + older
+
+    return await split(start_year, end_year)
+
+
+def merge_shard_results(
+    result_lists: Sequence[Sequence[dict[str, Any]]],
+    sort: Literal["score", "date"],
+) -> list[str]:
+    """Merge the search results of date shards (newest first) into deduplicated PMIDs."""
+    results = [result for results in result_lists for result in results]
+    if sort == "score":
+        # Stable, so results without scores keep the order of the shards
+        results.sort(key=lambda result: -float(result.get("score") or 0))
+
+    return list(dict.fromkeys(str(result.get("pmid")) for result in results))
+
+
 async def send_publication_request(
     pmid_string: str,
     article_id_type: Literal["pmids", "pmcids"],
@@ -350,17 +1231,130 @@ async def send_publication_request(
     full_text: bool,
     session: ClientSession,
 ):
-    url = f"https://www.ncbi.nlm.nih.gov/research/pubtator3-api/publications/export/{format}"
+    url = PUBTATOR_EXPORT_URL.format(format=format)
     params = {article_id_type: pmid_string}
     if full_text:
         params["full"] = "true"
 
+    stream_decoder = None
     if format == "biocjson":
         is_json = True
+        # Full-text responses are large, keep only the fields to be parsed
+        if full_text and not full_documents_kept.get():
+            stream_decoder = BioCJSONStreamDecoder
     elif format == "pubtator":
         is_json = False
 
-    return await request_pubtator3(url, params, session, is_json=is_json)
+    return await request_pubtator3(
+        url, params, session, is_json=is_json, stream_decoder=stream_decoder
+    )
+
+
+# Whether to keep whole full-text documents, e.g., to archive them
+full_documents_kept: ContextVar[bool] = ContextVar("full_documents_kept", default=False)
+
+
+@contextmanager
+def keep_full_documents(keep: bool = True) -> Iterator[None]:
+    """Keep the fields of full-text documents not needed for parsing in this block."""
+    token = full_documents_kept.set(keep)
+    try:
+        yield
+    finally:
+        full_documents_kept.reset(token)
+
+
+def create_session(
+    rate_limiter: RateLimiter | None = None,
+    job: Hashable | None = None,
+    max_connections: int = MAX_CONNECTIONS,
+    dns_cache_ttl: int = DNS_CACHE_TTL,
+    base_url: str = PUBTATOR_API_URL,
+) -> ClientSession:
+    """Create a session with a keep-alive connection pool for PubTator3 requests.
+
+    Must be called in a running event loop.
+
+    Args:
+        rate_limiter (RateLimiter | None):
+            Limiter applied to every request of the session. Defaults to `get_default_rate_limiter()`.
+        job (Hashable | None):
+            Identify the requests of this session in a shared rate limiter. Defaults to None.
+        max_connections (int):
+            Maximum number of open connections. Defaults to `MAX_CONNECTIONS`.
+        dns_cache_ttl (int):
+            Seconds to cache DNS lookups. Defaults to `DNS_CACHE_TTL`.
+        base_url (str):
+            Base URL of the PubTator3 API. Defaults to `PUBTATOR_API_URL`.
+    """
+    if rate_limiter is None:
+        rate_limiter = get_default_rate_limiter()
+
+    return ClientSession(
+        # Request URLs are relative to the base URL, which must end with a slash
+        base_url=base_url.rstrip("/") + "/",
+        connector=aiohttp.TCPConnector(limit=max_connections, ttl_dns_cache=dns_cache_ttl),
+        headers={"Accept-Encoding": "gzip, deflate"},
+        trace_configs=[rate_limiter.trace_config(job=job), timing_trace_config()],
+    )
+
+
+def limit_session(
+    session: ClientSession,
+    rate_limiter: RateLimiter | None = None,
+    job: Hashable | None = None,
+    base_url: str = PUBTATOR_API_URL,
+) -> ClientSession:
+    """Create a rate limited session sending requests through the connections of `session`.
+
+    Trace configs cannot be added to an existing session, so the headers, cookies,
+    authentication and timeout of `session` are copied to a new session sharing its
+    connector. Closing the new session leaves `session` open.
+
+    Args:
+        session (ClientSession):
+            Session created without the trace config of a `RateLimiter`.
+        rate_limiter (RateLimiter | None):
+            Limiter applied to every request of the session. Defaults to `get_default_rate_limiter()`.
+        job (Hashable | None):
+            Identify the requests of this session in a shared rate limiter. Defaults to None.
+        base_url (str):
+            Base URL of the PubTator3 API. Defaults to `PUBTATOR_API_URL`.
+    """
+    if rate_limiter is None:
+        rate_limiter = get_default_rate_limiter()
+
+    return ClientSession(
+        base_url=base_url.rstrip("/") + "/",
+        connector=session.connector,
+        connector_owner=False,
+        headers=session.headers,
+        cookie_jar=session.cookie_jar,
+        auth=session.auth,
+        timeout=session.timeout,
+        trace_configs=[
+            rate_limiter.trace_config(job=job),
+            timing_trace_config(),
+            *session.trace_configs,
+        ],
+    )
+
+
+def get_default_rate_limiter():
+    """Return the rate limiter shared by all `PubTatorAPI` instances in this process.
+
+    Set the environment variable `NETMEDEX_RATE_LIMIT_FILE` to also share the request
+    rate with other processes using the same file.
+    """
+    return get_shared_rate_limiter(
+        MAX_CONCURRENT_REQUESTS,
+        1 / REQUEST_INTERVAL,
+        state_file=os.getenv(RATE_LIMIT_FILE_ENV),
+    )
+
+
+def get_batches(pmid_list: Sequence[str], batch_size: int = PMID_REQUEST_SIZE) -> list[list[str]]:
+    return [list(pmid_list[i : i + batch_size]) for i in range(0, len(pmid_list), batch_size)]
 
 
 def get_n_articles(max_articles: int, total_articles: int):
@@ -391,50 +1385,202 @@ def check_if_need_retry(res: ClientResponse):
 
     if (error_msg := PUBTATOR_RETRY_ERRORS.get(res.status, None)) is not None:
         logger.warning(f"Request error occurred in input: {res.url} Retrying.")
-        raise RetryableError(error_msg)
+        raise RetryableError(
+            error_msg,
+            retry_after=parse_retry_after(res.headers.get("Retry-After")),
+            status=res.status,
+        )
     else:
         logger.warning(f"Request error occurred in input: {res.url} Retrying.")
         raise UnsuccessfulRequest()
 
 
+def wait_retry_after(retry_state: RetryCallState) -> float:
+    """Wait exponentially or as long as `Retry-After` of the response asks for"""
+    wait = wait_exponential(multiplier=1, min=5, max=10)(retry_state)
+    if retry_state.outcome is not None:
+        retry_after = getattr(retry_state.outcome.exception(), "retry_after", None)
+        if retry_after is not None:
+            wait = max(wait, min(retry_after, MAX_RETRY_AFTER))
+    return wait
+
+
+def count_retry(retry_state: RetryCallState):
+    """Report a retry to the progress tracker and the metrics of the current request"""
+    if (tracker := current_progress.get()) is not None:
+        tracker.add_retry()
+
+    if (metrics := current_metrics.get()) is not None and retry_state.outcome is not None:
+        error = retry_state.outcome.exception()
+        status = getattr(error, "status", None)
+        reason = str(status) if status is not None else type(error).__name__
+        metrics.endpoint(get_endpoint(retry_state.args[0])).add_retry(reason)
+
+
 @retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=5, max=10),
+    wait=wait_retry_after,
     reraise=True,
     retry=retry_if_exception(
         lambda e: isinstance(e, RetryableError | aiohttp.ServerDisconnectedError)
     ),
+    before_sleep=count_retry,
 )
 async def request_pubtator3(
     url: str,
     params: Any,
     session: ClientSession,
     is_json: bool = True,
+    stream_decoder: Callable[[], BioCJSONStreamDecoder] | None = None,
 ) -> Any:
-    async with session.get(url, params=params) as res:
-        check_if_need_retry(res)
+    timing = {"start": time.perf_counter()}
+    n_bytes = 0
+    async with session.get(url, params=params, trace_request_ctx=timing) as res:
         try:
-            if is_json:
-                result = await res.json()
-            else:
-                result = await res.text()
-        except Exception:
-            msg = f"Failed to parse response: {res.url}"
-            logger.warning(f"{msg} Retrying.")
-            raise RetryableError(msg)
+            check_if_need_retry(res)
+            try:
+                if stream_decoder is not None:
+                    result, n_bytes = await decode_incrementally(res, stream_decoder(), timing)
+                else:
+                    body = await res.read()
+                    n_bytes = len(body)
+                    timing["received"] = time.perf_counter()
+                    if is_json:
+                        result = await res.json()
+                    else:
+                        result = await res.text()
+                    timing["decoded"] = time.perf_counter()
+                if (tracker := current_progress.get()) is not None:
+                    tracker.add_bytes(n_bytes)
+            except Exception:
+                msg = f"Failed to parse response: {res.url}"
+                logger.warning(f"{msg} Retrying.")
+                raise RetryableError(msg)
+        finally:
+            if (metrics := current_metrics.get()) is not None:
+                metrics.endpoint(get_endpoint(url)).record(timing, n_bytes)
 
     return result
 
 
+async def decode_incrementally(
+    res: ClientResponse,
+    decoder: BioCJSONStreamDecoder,
+    timing: dict[str, float],
+) -> tuple[Any, int]:
+    """Feed the response body to `decoder` as it is received.
+
+    Returns:
+        tuple[Any, int]:
+            The decoded response and the size of the body.
+    """
+    n_bytes = 0
+    decode_time = 0.0
+    async for chunk in res.content.iter_chunked(STREAM_CHUNK_SIZE):
+        n_bytes += len(chunk)
+        start = time.perf_counter()
+        decoder.feed(chunk)
+        decode_time += time.perf_counter() - start
+
+    timing["received"] = time.perf_counter()
+    result = decoder.close()
+    decode_time += time.perf_counter() - timing["received"]
+    # Decoding overlaps receiving, so only count the time spent in the decoder
+    timing["decoded"] = timing["received"] + decode_time
+
+    return result, n_bytes
+
+
+def get_endpoint(url: str) -> Endpoint:
+    """Name the endpoint of a request URL relative to the API base URL"""
+    if url.startswith(PUBTATOR_SEARCH_URL):
+        return "search"
+    elif url.startswith(PUBTATOR_CITE_URL):
+        return "cite"
+    return "export"
+
+
+def parse_response(
+    res_txt_or_json: Any,
+    format: Literal["biocjson", "pubtator"],
+    full_text: bool,
+) -> list[PubTatorArticle]:
+    """Parse an export response into articles."""
+    articles: list[PubTatorArticle] = []
+    if format == "biocjson":
+        articles = biocjson_to_pubtator(res_json=res_txt_or_json, full_text=full_text)
+    elif format == "pubtator":
+        articles = [
+            article for article in PubTatorIterator(res_txt_or_json) if article is not None
+        ]
+
+    return articles
+
+
 def progress_message(status, progress, total):
     return f"{status}/{progress}/{total}"
 
 
 async def batch_request(
     jobs: Sequence[Callable[[], Awaitable[T]]],
+    metrics: RequestMetrics | None = None,
 ) -> list[T]:
-    return await aiometer.run_all(
-        jobs,
-        max_at_once=MAX_CONCURRENT_REQUESTS,
-        max_per_second=1 / REQUEST_INTERVAL,
-    )
+    if metrics is not None:
+        jobs = metrics.time_jobs(jobs)
+    # Requests are paced by the rate limiter attached to the session
+    return await aiometer.run_all(jobs, max_at_once=MAX_CONCURRENT_REQUESTS)
+
+
+async def stream_request(
+    jobs: Iterable[Callable[[], Awaitable[T]]] | AsyncIterable[Callable[[], Awaitable[T]]],
+    max_buffered: int = MAX_CONCURRENT_REQUESTS,
+    metrics: RequestMetrics | None = None,
+) -> AsyncIterator[T]:
+    """Run jobs like `batch_request` but yield the results in the order of completion.
+
+    At most `max_buffered` jobs are in flight, and no new job starts while a
+    result is being consumed, which keeps memory bounded for slow consumers.
+    `jobs` may be an async iterable yielding jobs as they become available. Such
+    jobs are not timed by `metrics`, wrap them with `RequestMetrics.time_job`
+    when they are submitted instead.
+    """
+    if isinstance(jobs, AsyncIterable):
+        remaining_jobs = aiter(jobs)
+    else:
+        remaining_jobs = _aiter_sync(metrics.time_jobs(jobs) if metrics is not None else jobs)
+    pending: set[asyncio.Future[T]] = set()
+    next_job: asyncio.Future[Callable[[], Awaitable[T]] | None] | None = None
+    exhausted = False
+    try:
+        while True:
+            # Requests are paced by the rate limiter attached to the session
+            if next_job is None and not exhausted and len(pending) < max_buffered:
+                next_job = asyncio.ensure_future(anext(remaining_jobs, None))
+
+            waiting: set[asyncio.Future[Any]] = set(pending)
+            if next_job is not None:
+                waiting.add(next_job)
+            if not waiting:
+                break
+
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if next_job is not None and next_job in done:
+                job = next_job.result()
+                next_job = None
+                if job is None:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(job()))
+            for task in done & pending:
+                pending.discard(task)
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if next_job is not None:
+            next_job.cancel()
+
+
+async def _aiter_sync(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
@@ -0,0 +1,132 @@
+import gzip
+import json
+import logging
+from collections.abc import Collection, Iterator, Mapping
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any, Literal
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.pubtator_data import PubTatorArticle
+from netmedex.pubtator_parser import PubTatorIterator
+
+logger = logging.getLogger(__name__)
+
+# Trade compression ratio for speed, archives are written while requesting
+COMPRESS_LEVEL = 6
+
+
+class PubTatorArchive:
+    """Gzipped JSON Lines archive of the raw articles retrieved by `PubTatorAPI`.
+
+    Each line holds one article in the structure of the PubTator3 export
+    response, so the articles can be parsed again with different options
+    without requesting them (see `read_pubtator_archive`):
+
+    ```json
+    {"pmid": "22429397", "format": "biocjson", "full_text": true, "article": {...}}
+    ```
+
+    Args:
+        path (str | Path):
+            Path to the archive, e.g., `articles.jsonl.gz`. An existing archive is overwritten.
+    """
+
+    num_articles: int
+    """Number of archived articles"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.num_articles = 0
+        self._file: IO[str] | None = None
+
+    def __repr__(self) -> str:
+        return f"PubTatorArchive(path={str(self.path)!r}, num_articles={self.num_articles})"
+
+    def __enter__(self) -> "PubTatorArchive":
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ):
+        self.close()
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.num_articles = 0
+        self._file = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL)
+
+    def write(
+        self,
+        articles: Mapping[str, Any],
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ):
+        """Append `{pmid: article}` split from an export response (see `split_response`)."""
+        if self._file is None:
+            raise ValueError(f"{self!r} is not open.")
+
+        for pmid, article in articles.items():
+            record = {"pmid": pmid, "format": format, "full_text": full_text, "article": article}
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.num_articles += len(articles)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Archived {self.num_articles} articles in {self.path}")
+
+
+def iter_archive_records(filepath: str | Path) -> Iterator[dict[str, Any]]:
+    """Iterate the records of an archive written by `PubTatorArchive`."""
+    with gzip.open(filepath, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_pubtator_archive(
+    filepath: str | Path,
+    full_text: bool | None = None,
+    pmids: Collection[str] | None = None,
+) -> Iterator[PubTatorArticle]:
+    """Parse the articles of an archive written by `PubTatorAPI(archive=...)`.
+
+    ```python
+    articles = list(read_pubtator_archive("articles.jsonl.gz", full_text=False))
+    collection = PubTatorCollection(headers=[], articles=articles)
+    ```
+
+    Args:
+        filepath (str | Path):
+            Path to the archive.
+        full_text (bool | None):
+            Whether to keep the annotations of full-text passages. Defaults to how each
+            article was requested.
+        pmids (Collection[str] | None):
+            Only parse the articles with these PMIDs. Defaults to all articles.
+
+    Returns:
+        Iterator[PubTatorArticle]:
+            The articles in the order they were archived.
+    """
+    if pmids is not None:
+        pmids = {str(pmid) for pmid in pmids}
+
+    for record in iter_archive_records(filepath):
+        if pmids is not None and record["pmid"] not in pmids:
+            continue
+        if record["format"] == "biocjson":
+            yield from biocjson_to_pubtator(
+                {"PubTator3": [record["article"]]},
+                full_text=record["full_text"] if full_text is None else full_text,
+            )
+        else:
+            for article in PubTatorIterator(record["article"]):
+                if article is not None:
+                    yield article
@@ -0,0 +1,304 @@
+"""A fast parser of PubTator files working on large chunks of raw bytes.
+
+`PubTatorIterator` reads a file line by line through a text stream and
+splits every line a few times before building each annotation. This parser
+reads the file in chunks of `DEFAULT_CHUNK_SIZE` bytes cut at line breaks,
+decodes each chunk at once, and classifies every line with a single lookup
+of the "|t|" title marker before splitting it. The articles are the same as
+those of `PubTatorIterator`.
+
+Use it through `PubTatorIO.parse(filepath, engine="bytes")`. Large files can
+also be split into byte ranges at article boundaries and parsed in several
+processes (see `iter_parallel_articles`).
+"""
+
+import gc
+import io
+import itertools
+import os
+import pickle
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+from netmedex.pubtator_data import PubTatorAnnotation, PubTatorArticle, PubTatorRelation
+
+# Bytes read from the file at a time
+DEFAULT_CHUNK_SIZE = 2**24
+# Byte ranges parsed in parallel per worker process, so that workers finish at similar times
+PARTS_PER_WORKER = 4
+# Smallest byte range parsed in a worker process
+MIN_PART_SIZE = 2**20
+HEADER_SYMBOL = b"##"
+
+
+def iter_line_chunks(
+    stream: BinaryIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    end: int | None = None,
+) -> Iterator[bytes]:
+    """Read `stream` in chunks that end at a line break (except for the last chunk).
+
+    Args:
+        stream (BinaryIO):
+            A binary stream positioned at the start of a line.
+        chunk_size (int):
+            Number of bytes read at a time. Defaults to `DEFAULT_CHUNK_SIZE`.
+        end (int | None):
+            Stop reading at this offset of the stream. Defaults to the end of the stream.
+    """
+    remaining = None if end is None else end - stream.tell()
+    rest = b""
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        data = stream.read(size)
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+
+        data = rest + data
+        line_end = data.rfind(b"\n") + 1
+        if line_end == 0:
+            rest = data
+            continue
+        rest = data[line_end:]
+        yield data[:line_end]
+
+    if rest:
+        yield rest
+
+
+def parse_pubtator_chunks(chunks: Iterable[bytes]) -> Iterator[PubTatorArticle]:
+    """Parse articles from chunks of a PubTator file (without headers) cut at line breaks.
+
+    Lines before the first title are skipped, like `PubTatorIterator`.
+    """
+    pmid = None
+    title = ""
+    abstract = None
+    annotations: list[PubTatorAnnotation] = []
+    relations: list[PubTatorRelation] = []
+    # Sometimes an article won't have a abstract
+    has_tried_getting_abstract = False
+    # Avoid global lookups for every line
+    Annotation = PubTatorAnnotation
+    Relation = PubTatorRelation
+
+    for chunk in chunks:
+        text = chunk.decode("utf-8")
+        if "\r" in text:
+            # Same as the universal newlines of text streams
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        for line in text.split("\n"):
+            # Title looks like: 962740|t|Dermal ulceration of mullet
+            if "|t|" in line:
+                sep = line.find("|")
+                if line.startswith("t|", sep + 1):
+                    if pmid is not None:
+                        yield PubTatorArticle(
+                            pmid, None, None, None, title, abstract, annotations, relations
+                        )
+                    pmid = line[:sep]
+                    title = line[sep + 3 :]
+                    abstract = None
+                    annotations = []
+                    relations = []
+                    has_tried_getting_abstract = False
+                    continue
+
+            if pmid is None:
+                continue
+
+            # Abstract looks like: 962740|a|Phycomycotic granulomas are described
+            if not has_tried_getting_abstract:
+                sep = line.find("|")
+                if sep >= 0 and line.startswith("a|", sep + 1):
+                    abstract = line[sep + 3 :]
+                    has_tried_getting_abstract = True
+                    continue
+
+            data = line.split("\t")
+            n_fields = len(data)
+            if n_fields == 6:
+                has_tried_getting_abstract = True
+                annotations.append(
+                    Annotation(
+                        data[0], int(data[1]), int(data[2]), data[3], None, data[4], data[5]
+                    )
+                )
+            elif n_fields == 4:
+                has_tried_getting_abstract = True
+                relations.append(
+                    Relation(data[0], data[1], data[2], None, data[3].split(";", 1)[0], None)
+                )
+
+    if pmid is not None:
+        yield PubTatorArticle(pmid, None, None, None, title, abstract, annotations, relations)
+
+
+def is_title_line(line: bytes) -> bool:
+    sep = line.find(b"|")
+    return sep >= 0 and line.startswith(b"t|", sep + 1)
+
+
+def skip_headers(stream: BinaryIO) -> int:
+    """Move `stream` to the first line that is not a header and return its offset."""
+    while True:
+        offset = stream.tell()
+        if not stream.readline().startswith(HEADER_SYMBOL):
+            stream.seek(offset)
+            return offset
+
+
+def find_article_boundaries(stream: BinaryIO, start: int, end: int, n_parts: int) -> list[int]:
+    """Split the bytes from `start` to `end` into about `n_parts` ranges.
+
+    Every range but the first starts at a title line, so that no article is
+    split across ranges.
+
+    Returns:
+        list[int]:
+            The offsets from `start` to `end` bounding the ranges.
+    """
+    boundaries = [start]
+    for part in range(1, n_parts):
+        target = start + (end - start) * part // n_parts
+        if target <= boundaries[-1]:
+            continue
+
+        # Skip the line that `target` may fall into
+        stream.seek(target - 1)
+        stream.readline()
+        while (offset := stream.tell()) < end:
+            if is_title_line(stream.readline()):
+                break
+        if boundaries[-1] < offset < end:
+            boundaries.append(offset)
+
+    boundaries.append(end)
+
+    return boundaries
+
+
+def parse_pubtator_range(
+    filepath: str | Path,
+    start: int,
+    end: int,
+) -> list[PubTatorArticle]:
+    """Parse the articles in the bytes from `start` to `end` of a PubTator file."""
+    with open(filepath, "rb") as stream:
+        stream.seek(start)
+        with paused_gc():
+            return list(parse_pubtator_chunks(iter_line_chunks(stream, end=end)))
+
+
+def iter_parallel_articles(
+    filepath: str | Path,
+    workers: int | None = None,
+    executor: Executor | None = None,
+) -> Iterator[PubTatorArticle]:
+    """Parse a PubTator file in worker processes and yield the articles in order.
+
+    The file is split into byte ranges aligned to title lines (see
+    `find_article_boundaries`), and each range is parsed in a worker. Articles
+    are yielded as soon as the ranges before them are parsed, so they can be
+    streamed straight to a graph builder. At most two ranges per worker are
+    parsed ahead of the consumer.
+
+    Args:
+        filepath (str | Path):
+            Path to the PubTator file. Headers are skipped.
+        workers (int | None):
+            Number of worker processes. Defaults to the number of CPUs.
+        executor (Executor | None):
+            Executor to parse the ranges in. Not shut down when done. Defaults to a
+            new `ProcessPoolExecutor` with `workers` processes.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with open(filepath, "rb") as stream:
+        start = skip_headers(stream)
+        end = stream.seek(0, io.SEEK_END)
+        n_parts = max(1, min(workers * PARTS_PER_WORKER, (end - start) // MIN_PART_SIZE))
+        boundaries = find_article_boundaries(stream, start, end, n_parts)
+
+    own_executor = executor is None
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    ranges = itertools.pairwise(boundaries)
+    pending: deque[Future[bytes]] = deque()
+    try:
+        while True:
+            while len(pending) < 2 * workers and (part := next(ranges, None)) is not None:
+                pending.append(executor.submit(_parse_range_to_rows, filepath, *part))
+            if not pending:
+                break
+            yield from _rows_to_articles(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def _parse_range_to_rows(filepath: str | Path, start: int, end: int) -> bytes:
+    """Parse a byte range into pickled tuples, which are much faster to send than dataclasses"""
+    rows = [
+        (
+            article.pmid,
+            article.title,
+            article.abstract,
+            [(a.pmid, a.start, a.end, a.name, a.type, a.mesh) for a in article.annotations],
+            [(r.pmid, r.relation_type, r.mesh1, r.mesh2) for r in article.relations],
+        )
+        for article in parse_pubtator_range(filepath, start, end)
+    ]
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    # The rows have no shared or recursive objects, so skip the memo
+    pickler.fast = True
+    pickler.dump(rows)
+
+    return buffer.getvalue()
+
+
+def _rows_to_articles(data: bytes) -> list[PubTatorArticle]:
+    Annotation = PubTatorAnnotation
+    Relation = PubTatorRelation
+    with paused_gc():
+        return [
+            PubTatorArticle(
+                pmid,
+                None,
+                None,
+                None,
+                title,
+                abstract,
+                [Annotation(a[0], a[1], a[2], a[3], None, a[4], a[5]) for a in annotations],
+                [Relation(r[0], r[1], r[2], None, r[3], None) for r in relations],
+            )
+            for pmid, title, abstract, annotations, relations in pickle.loads(data)
+        ]
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Pause the cyclic garbage collector while collecting many acyclic objects.
+
+    Each allocation of an annotation counts towards a collection, which makes
+    collections frequent and increasingly slow as the articles pile up.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,151 @@
+import logging
+import re
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+from typing import Any, Literal
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "netmedex" / "pubtator3"
+# 1 GB
+DEFAULT_CACHE_SIZE_LIMIT = 2**30
+
+PUBTATOR_LINE_PMID_PATTERN = re.compile(r"[|\t]")
+
+
+class PubTatorCache:
+    """Persistent per-PMID cache for PubTator3 export responses.
+
+    Each article in an export response is stored separately under a key made of
+    its PMID, the response format, and the `full_text` flag, so overlapping
+    requests only need to fetch the PMIDs that are not cached yet. The cache is
+    bounded by `size_limit` (in bytes) and evicts the least recently used
+    articles first.
+
+    Args:
+        directory (str | Path):
+            Directory to store the cache. Defaults to `~/.cache/netmedex/pubtator3`.
+        size_limit (int):
+            Maximum size of the cache in bytes. Defaults to 1 GB.
+    """
+
+    hits: int
+    """Number of PMIDs found in the cache"""
+    misses: int
+    """Number of PMIDs not found in the cache"""
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_CACHE_DIR,
+        size_limit: int = DEFAULT_CACHE_SIZE_LIMIT,
+    ) -> None:
+        self.directory = Path(directory)
+        self._cache = diskcache.Cache(
+            str(self.directory),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"PubTatorCache(directory={str(self.directory)!r}, hits={self.hits}, misses={self.misses})"
+
+    @staticmethod
+    def make_key(
+        pmid: str,
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ) -> str:
+        text_type = "full" if full_text else "abstract"
+        return f"{format}:{text_type}:{pmid}"
+
+    def get_many(
+        self,
+        pmids: Iterable[str],
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ) -> dict[str, Any]:
+        """Return `{pmid: article}` for the PMIDs found in the cache."""
+        found = {}
+        for pmid in pmids:
+            article = self._cache.get(self.make_key(pmid, format, full_text))
+            if article is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[pmid] = article
+
+        return found
+
+    def set_many(
+        self,
+        articles: Mapping[str, Any],
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ):
+        with self._cache.transact():
+            for pmid, article in articles.items():
+                self._cache.set(self.make_key(pmid, format, full_text), article)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self._cache.volume(),
+            "count": len(self._cache),
+        }
+
+    def clear(self):
+        self._cache.clear()
+
+    def close(self):
+        self._cache.close()
+
+
+def split_response(
+    response: Any,
+    format: Literal["biocjson", "pubtator"],
+) -> dict[str, Any]:
+    """Split an export response into `{pmid: article}`."""
+    articles = {}
+    if format == "biocjson":
+        for article in response["PubTator3"]:
+            articles[str(article["pmid"])] = article
+    elif format == "pubtator":
+        lines: dict[str, list[str]] = {}
+        for line in response.splitlines():
+            if not line.strip():
+                continue
+            pmid = PUBTATOR_LINE_PMID_PATTERN.split(line, 1)[0]
+            lines.setdefault(pmid, []).append(line)
+        for pmid, article_lines in lines.items():
+            articles[pmid] = "\n".join(article_lines) + "\n"
+
+    return articles
+
+
+def merge_articles(
+    articles: Sequence[Any],
+    format: Literal["biocjson", "pubtator"],
+) -> Any:
+    """Merge articles into a single export response. Reverse of `split_response`."""
+    if format == "biocjson":
+        return {"PubTator3": list(articles)}
+    elif format == "pubtator":
+        return "\n".join(articles)
+
+
+def concat_responses(
+    responses: Sequence[Any],
+    format: Literal["biocjson", "pubtator"],
+) -> Any:
+    """Concatenate export responses into a single export response."""
+    if format == "biocjson":
+        return merge_articles(
+            [article for response in responses for article in response["PubTator3"]], format
+        )
+    elif format == "pubtator":
+        return merge_articles([response for response in responses if response], format)
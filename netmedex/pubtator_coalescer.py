@@ -0,0 +1,112 @@
+import logging
+import threading
+from collections.abc import Hashable, Iterable, Mapping
+from concurrent.futures import Future
+from typing import Any
+
+from netmedex.exceptions import RetryableError, UnsuccessfulRequest
+
+logger = logging.getLogger(__name__)
+
+
+class PubTatorCoalescer:
+    """Coalesce concurrent export requests for the same PMIDs.
+
+    Requesters claim the PMIDs of a batch before sending it. A PMID that is
+    already being requested by another `PubTatorAPI` instance is not sent
+    again; the requester waits for the article retrieved by the first request
+    instead. PMIDs are claimed one by one, so overlapping batches of different
+    queries only send the PMIDs that are not in flight yet.
+
+    Articles are handed over through `concurrent.futures.Future`s, so the
+    coalescer can be shared across threads and event loops, e.g., by the
+    simultaneous searches of the web app (see `get_shared_coalescer`).
+    """
+
+    coalesced: int
+    """Number of PMIDs that were not requested because they were already in flight"""
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._mutex = threading.Lock()
+        self._in_flight: dict[tuple[Hashable, str], Future] = {}
+
+    def __repr__(self) -> str:
+        return f"PubTatorCoalescer(in_flight={len(self._in_flight)}, coalesced={self.coalesced})"
+
+    def claim(
+        self,
+        pmids: Iterable[str],
+        scope: Hashable,
+    ) -> tuple[list[str], dict[str, Future]]:
+        """Claim the PMIDs that are not in flight in `scope`.
+
+        Args:
+            pmids (Iterable[str]):
+                PMIDs to be requested.
+            scope (Hashable):
+                Requests that return the same articles, e.g., `(base_url, format, full_text)`.
+
+        Returns:
+            tuple[list[str], dict[str, Future]]:
+                The PMIDs to be requested by the caller, who must `release` them afterwards,
+                and the futures of the articles requested by others. A future resolves to
+                None if the article was not found, raises `UnsuccessfulRequest` if the article
+                cannot be retrieved, and raises `RetryableError` if the request failed as a whole.
+        """
+        claimed = []
+        waiting = {}
+        with self._mutex:
+            for pmid in pmids:
+                key = (scope, pmid)
+                if (future := self._in_flight.get(key)) is not None:
+                    waiting[pmid] = future
+                else:
+                    self._in_flight[key] = Future()
+                    claimed.append(pmid)
+            self.coalesced += len(waiting)
+
+        if waiting:
+            logger.debug(f"Wait for {len(waiting)} articles requested by others")
+
+        return claimed, waiting
+
+    def release(
+        self,
+        pmids: Iterable[str],
+        scope: Hashable,
+        articles: Mapping[str, Any] | None = None,
+        errors: Mapping[str, str] | None = None,
+    ):
+        """Hand over the results of the claimed `pmids` to the waiting requesters.
+
+        Args:
+            pmids (Iterable[str]):
+                PMIDs claimed by `claim`.
+            scope (Hashable):
+                The scope passed to `claim`.
+            articles (Mapping[str, Any] | None):
+                `{pmid: article}` of the retrieved articles. Defaults to None, i.e., the
+                request failed, so the waiting requesters request the PMIDs themselves.
+            errors (Mapping[str, str] | None):
+                `{pmid: error message}` of the PMIDs that cannot be retrieved. Defaults to None.
+        """
+        with self._mutex:
+            futures = {pmid: self._in_flight.pop((scope, pmid)) for pmid in pmids}
+
+        errors = errors or {}
+        for pmid, future in futures.items():
+            if articles is None:
+                future.set_exception(RetryableError("The request in flight failed."))
+            elif pmid in errors:
+                future.set_exception(UnsuccessfulRequest(errors[pmid]))
+            else:
+                future.set_result(articles.get(pmid))
+
+
+_shared_coalescer = PubTatorCoalescer()
+
+
+def get_shared_coalescer() -> PubTatorCoalescer:
+    """Return the coalescer shared by all `PubTatorAPI` instances in this process."""
+    return _shared_coalescer
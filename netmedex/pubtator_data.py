@@ -3,7 +3,7 @@ import re
 from collections.abc import Sequence
 from copy import deepcopy
 from dataclasses import asdict, dataclass, field
-from typing import Any
+from typing import Any, TextIO
 
 from netmedex.headers import USE_MESH_VOCABULARY
 from netmedex.stemmers import s_stemmer
@@ -178,9 +178,10 @@ class PubTatorCollection:
         self,
         annotation_use_identifier_name: bool = True,
         relation_use_identifier: bool = True,
+        include_headers: bool = True,
     ) -> str:
         headers = []
-        if annotation_use_identifier_name:
+        if annotation_use_identifier_name and include_headers:
             headers.append(USE_MESH_VOCABULARY)
 
         pubtator_str = ""
@@ -193,6 +194,27 @@ class PubTatorCollection:
 
         return pubtator_str
 
+    def write_pubtator(
+        self,
+        stream: TextIO,
+        annotation_use_identifier_name: bool = True,
+        relation_use_identifier: bool = True,
+        include_headers: bool = True,
+    ):
+        """Write the same text as `to_pubtator_str` to `stream` one article at a time.
+
+        The text of the whole collection is never built, e.g., when the
+        stream compresses a large output on the fly.
+        """
+        if annotation_use_identifier_name and include_headers:
+            stream.write(HEADER_SYMBOL + USE_MESH_VOCABULARY + "\n")
+        for idx, article in enumerate(self.articles):
+            if idx > 0:
+                stream.write("\n")
+            stream.write(
+                article.to_pubtator_str(annotation_use_identifier_name, relation_use_identifier)
+            )
+
     def to_json(self):
         return asdict(self)
 
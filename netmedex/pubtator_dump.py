@@ -0,0 +1,257 @@
+"""Read articles from PubTator3 bulk dump files without the API.
+
+PubTator3 provides its annotations as bulk files at
+https://ftp.ncbi.nlm.nih.gov/pub/lu/PubTator3/. Three kinds of files are supported:
+
+* `"bioconcepts"`: `bioconcepts2pubtator3.gz` and the per-type files such as
+  `gene2pubtator3.gz`, one concept per line:
+  `PMID<TAB>Type<TAB>ConceptID<TAB>Mentions<TAB>Resource`. These files contain
+  neither text nor mention offsets.
+* `"biocxml"`: BioC XML files, either plain, gzipped, or packed in the
+  `BioCXML.*.tar.gz` archives.
+* `"pubtator"`: files in PubTator format, e.g., outputs of `netmedex search`.
+
+Files are decompressed and parsed as a stream, so only one article is kept in
+memory at a time.
+"""
+
+import logging
+import tarfile
+import xml.etree.ElementTree as ET
+from collections.abc import Callable, Collection, Iterator
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import IO, Any, Literal
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.compressed_io import open_compressed
+from netmedex.pubtator_data import PubTatorAnnotation, PubTatorArticle
+from netmedex.pubtator_parser import PubTatorIO, PubTatorIterator
+
+logger = logging.getLogger(__name__)
+
+DumpFormat = Literal["bioconcepts", "biocxml", "pubtator"]
+
+# bioconcepts2pubtator3.gz, gene2pubtator3.gz, ...
+BIOCONCEPTS_SUFFIX = "2pubtator3"
+
+
+def read_pubtator_dump(
+    filepath: str | Path,
+    format: DumpFormat | None = None,
+    pmids: Collection[str] | None = None,
+    predicate: Callable[[PubTatorArticle], bool] | None = None,
+    full_text: bool = False,
+) -> Iterator[PubTatorArticle]:
+    """Iterate the articles in a PubTator3 bulk dump file.
+
+    Articles can be passed to `PubTatorGraphBuilder.add_article` directly:
+
+    ```python
+    builder = PubTatorGraphBuilder(node_type="all")
+    for article in read_pubtator_dump("bioconcepts2pubtator3.gz", pmids=pmids):
+        builder.add_article(article)
+    ```
+
+    Args:
+        filepath (str | Path):
+            Path to the dump file. Files ending with `.gz` are decompressed on the fly.
+        format (Literal["bioconcepts", "biocxml", "pubtator"] | None):
+            Format of the file. Defaults to guessing from the file name.
+        pmids (Collection[str] | None):
+            Only yield the articles with these PMIDs. Use a set for large collections.
+            Defaults to all articles.
+        predicate (Callable[[PubTatorArticle], bool] | None):
+            Only yield the articles for which `predicate` returns True. Defaults to None.
+        full_text (bool):
+            Whether to keep the annotations of full-text passages in `"biocxml"` files.
+            Defaults to False.
+
+    Returns:
+        Iterator[PubTatorArticle]:
+            The articles in the order of the file. Articles from `"bioconcepts"` files have
+            an empty title, no abstract, and mentions with `start` and `end` set to 0.
+    """
+    filepath = Path(filepath)
+    if format is None:
+        format = guess_dump_format(filepath)
+    if pmids is not None:
+        pmids = {str(pmid) for pmid in pmids}
+
+    if format == "bioconcepts":
+        articles = _read_bioconcepts(filepath, pmids)
+    elif format == "biocxml":
+        articles = _read_biocxml(filepath, pmids, full_text)
+    elif format == "pubtator":
+        articles = _read_pubtator(filepath, pmids)
+    else:
+        raise ValueError(f"Unsupported dump format: {format}")
+
+    for article in articles:
+        if predicate is None or predicate(article):
+            yield article
+
+
+def guess_dump_format(filepath: str | Path) -> DumpFormat:
+    name = Path(filepath).name.lower()
+    for suffix in (".gz", ".zst", ".tgz", ".tar"):
+        name = name.removesuffix(suffix)
+
+    if name.endswith(BIOCONCEPTS_SUFFIX):
+        return "bioconcepts"
+    elif name.endswith(".xml") or name.startswith("biocxml"):
+        return "biocxml"
+    return "pubtator"
+
+
+def _read_bioconcepts(
+    filepath: Path,
+    pmids: Collection[str] | None,
+) -> Iterator[PubTatorArticle]:
+    with open_compressed(filepath) as f:
+        rows = (line.rstrip("\n").split("\t") for line in f)
+        # The concepts of an article are on consecutive lines
+        for pmid, pmid_rows in groupby((row for row in rows if len(row) >= 4), key=itemgetter(0)):
+            if pmids is not None and pmid not in pmids:
+                continue
+
+            annotations = []
+            for _, annotation_type, concept_id, mentions, *_ in pmid_rows:
+                for mention in mentions.split("|"):
+                    annotations.append(
+                        PubTatorAnnotation(
+                            pmid=pmid,
+                            start=0,
+                            end=0,
+                            name=mention,
+                            identifier_name=None,
+                            type=annotation_type,
+                            mesh=concept_id if concept_id else "-",
+                        )
+                    )
+
+            yield PubTatorArticle(
+                pmid=pmid,
+                date=None,
+                journal=None,
+                doi=None,
+                title="",
+                abstract=None,
+                annotations=annotations,
+                relations=[],
+            )
+
+
+def _read_pubtator(
+    filepath: Path,
+    pmids: Collection[str] | None,
+) -> Iterator[PubTatorArticle]:
+    with open_compressed(filepath) as f:
+        result = PubTatorIO._parse_header(f)
+        if result.non_header_line is None:
+            return
+        for article in PubTatorIterator(f, result.non_header_line):
+            if article is None:
+                break
+            if pmids is None or article.pmid in pmids:
+                yield article
+
+
+def _read_biocxml(
+    filepath: Path,
+    pmids: Collection[str] | None,
+    full_text: bool,
+) -> Iterator[PubTatorArticle]:
+    for document in iter_biocxml_documents(filepath, pmids):
+        yield from biocjson_to_pubtator({"PubTator3": [document]}, full_text=full_text)
+
+
+def iter_biocxml_documents(
+    filepath: str | Path,
+    pmids: Collection[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Iterate the documents of a BioC XML dump in the BioC-JSON structure."""
+    if tarfile.is_tarfile(filepath):
+        # Read the archive sequentially instead of seeking to each member
+        with tarfile.open(filepath, "r|*") as tar:
+            for member in tar:
+                if not member.isfile() or not member.name.endswith(".xml"):
+                    continue
+                f = tar.extractfile(member)
+                assert f is not None
+                yield from _parse_biocxml(f, pmids)
+    else:
+        with open_compressed(filepath, "rb") as f:
+            yield from _parse_biocxml(f, pmids)
+
+
+def _parse_biocxml(
+    stream: IO[bytes],
+    pmids: Collection[str] | None,
+) -> Iterator[dict[str, Any]]:
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event != "end" or elem.tag != "document":
+            continue
+
+        document = biocxml_document_to_biocjson(elem)
+        # Free the parsed documents
+        root.clear()
+        if pmids is None or document["pmid"] in pmids:
+            yield document
+
+
+def biocxml_document_to_biocjson(document: ET.Element) -> dict[str, Any]:
+    """Convert a BioC XML `<document>` into the BioC-JSON structure of the PubTator3 API."""
+    passages = []
+    names = {}
+    for passage in document.iter("passage"):
+        annotations = []
+        for annotation in passage.iter("annotation"):
+            infons = _get_infons(annotation)
+            if "identifier" in infons and "name" in infons:
+                names[infons["identifier"]] = infons["name"]
+            annotations.append(
+                {
+                    "infons": infons,
+                    "text": annotation.findtext("text"),
+                    "locations": [
+                        {
+                            "offset": int(location.get("offset", 0)),
+                            "length": int(location.get("length", 0)),
+                        }
+                        for location in annotation.iter("location")
+                    ],
+                }
+            )
+        passages.append(
+            {
+                "infons": _get_infons(passage),
+                "offset": int(passage.findtext("offset", "0")),
+                "text": passage.findtext("text", ""),
+                "annotations": annotations,
+            }
+        )
+
+    relations = []
+    for relation in document.iter("relation"):
+        infons: dict[str, Any] = _get_infons(relation)
+        for role in ("role1", "role2"):
+            # e.g., "Chemical|MESH:D000068877"
+            identifier = infons.get(role, "").split("|", 1)[-1]
+            infons[role] = {"identifier": identifier, "name": names.get(identifier)}
+        relations.append({"infons": infons})
+
+    pmid = document.findtext("id", "")
+    if passages:
+        # Full-text documents may be identified by their PMCIDs
+        pmid = passages[0]["infons"].get("article-id_pmid", pmid)
+
+    return {"pmid": pmid, "passages": passages, "relations": relations}
+
+
+def _get_infons(elem: ET.Element) -> dict[str, str]:
+    return {infon.get("key", ""): infon.text or "" for infon in elem.findall("infon")}
@@ -0,0 +1,181 @@
+"""Index the articles of a PubTator file by PMID for random access.
+
+The index records the PMID, byte offset and length of every article and is
+saved next to the file as a sidecar, e.g., `articles.pubtator.idx`:
+
+```
+#netmedex-pubtator-index	<file size>	<file mtime in ns>
+34205807	0	5230
+34895069	5230	4118
+...
+```
+
+With the index, a subset of articles is read by seeking straight to each of
+them, so its cost depends on the size of the subset rather than the file.
+The file size and modification time guard against using the index of a file
+that has changed since. Compressed files cannot be indexed because they
+cannot be read from an arbitrary offset.
+"""
+
+import logging
+import re
+from collections.abc import Collection, Iterator
+from pathlib import Path
+
+from netmedex.compressed_io import get_compression
+from netmedex.pubtator_bytes_parser import iter_line_chunks, parse_pubtator_chunks, skip_headers
+from netmedex.pubtator_data import PubTatorArticle
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = "#netmedex-pubtator-index"
+# Title looks like: 962740|t|Dermal ulceration of mullet
+TITLE_PATTERN = re.compile(rb"^([^|\n]*)\|t\|", re.MULTILINE)
+
+
+class PubTatorIndex:
+    """Byte offsets and lengths of the articles of a PubTator file by PMID.
+
+    Build the index with `build` or load its sidecar with `load`, or use
+    `get_pubtator_index` to do either as needed.
+
+    Args:
+        filepath (str | Path):
+            Path to the indexed PubTator file.
+        entries (dict[str, tuple[int, int]]):
+            Byte offset and length of each article by PMID.
+        file_size (int):
+            Size of the file when it was indexed.
+        file_mtime_ns (int):
+            Modification time of the file when it was indexed.
+    """
+
+    def __init__(
+        self,
+        filepath: str | Path,
+        entries: dict[str, tuple[int, int]],
+        file_size: int,
+        file_mtime_ns: int,
+    ) -> None:
+        self.filepath = Path(filepath)
+        self.entries = entries
+        self.file_size = file_size
+        self.file_mtime_ns = file_mtime_ns
+
+    def __repr__(self) -> str:
+        return f"PubTatorIndex(filepath={str(self.filepath)!r}, num_articles={len(self)})"
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, pmid: object) -> bool:
+        return str(pmid) in self.entries
+
+    @property
+    def index_path(self) -> Path:
+        return get_index_path(self.filepath)
+
+    @classmethod
+    def build(cls, filepath: str | Path) -> "PubTatorIndex":
+        """Index a PubTator file by scanning it for title lines without parsing the articles.
+
+        An article spans from its title line to the next title line, and the
+        first article of a PMID appearing several times is indexed.
+        """
+        filepath = Path(filepath)
+        if get_compression(filepath) is not None:
+            raise ValueError(f"Cannot index the compressed file {filepath}")
+
+        stat = filepath.stat()
+        entries: dict[str, tuple[int, int]] = {}
+        pmid = None
+        start = 0
+        with open(filepath, "rb") as stream:
+            offset = skip_headers(stream)
+            for chunk in iter_line_chunks(stream):
+                for match in TITLE_PATTERN.finditer(chunk):
+                    title_offset = offset + match.start()
+                    if pmid is not None:
+                        entries.setdefault(pmid, (start, title_offset - start))
+                    pmid = match.group(1).decode("utf-8")
+                    start = title_offset
+                offset += len(chunk)
+        if pmid is not None:
+            entries.setdefault(pmid, (start, offset - start))
+
+        return cls(filepath, entries, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, filepath: str | Path) -> "PubTatorIndex":
+        """Load the index sidecar of a PubTator file.
+
+        Raises:
+            FileNotFoundError: If the file has no index.
+            ValueError: If the index is invalid.
+        """
+        index_path = get_index_path(filepath)
+        entries: dict[str, tuple[int, int]] = {}
+        with open(index_path) as f:
+            magic, file_size, file_mtime_ns = f.readline().rstrip("\n").split("\t")
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Invalid PubTator index: {index_path}")
+            for line in f:
+                pmid, offset, length = line.split("\t")
+                entries[pmid] = (int(offset), int(length))
+
+        return cls(filepath, entries, int(file_size), int(file_mtime_ns))
+
+    def save(self):
+        """Save the index next to the PubTator file."""
+        with open(self.index_path, "w") as f:
+            f.write(f"{INDEX_MAGIC}\t{self.file_size}\t{self.file_mtime_ns}\n")
+            for pmid, (offset, length) in self.entries.items():
+                f.write(f"{pmid}\t{offset}\t{length}\n")
+
+    def is_up_to_date(self) -> bool:
+        """Whether the file has not changed since it was indexed."""
+        try:
+            stat = self.filepath.stat()
+        except FileNotFoundError:
+            return False
+        return stat.st_size == self.file_size and stat.st_mtime_ns == self.file_mtime_ns
+
+    def read_articles(self, pmids: Collection[str | int]) -> Iterator[PubTatorArticle]:
+        """Read and parse the articles of `pmids` in the order of the file.
+
+        PMIDs not in the file are skipped.
+        """
+        requested = {str(pmid) for pmid in pmids}
+        spans = sorted(self.entries[pmid] for pmid in requested if pmid in self.entries)
+        if num_missing := len(requested) - len(spans):
+            logger.warning(f"{num_missing} PMIDs not found in {self.filepath}")
+
+        with open(self.filepath, "rb") as stream:
+            for offset, length in spans:
+                stream.seek(offset)
+                yield from parse_pubtator_chunks([stream.read(length)])
+
+
+def get_index_path(filepath: str | Path) -> Path:
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + INDEX_SUFFIX)
+
+
+def get_pubtator_index(filepath: str | Path) -> PubTatorIndex:
+    """Load the index of a PubTator file, or build and save it if it is missing or outdated."""
+    try:
+        index = PubTatorIndex.load(filepath)
+        if index.is_up_to_date():
+            return index
+        logger.info(f"Rebuild the outdated index of {filepath}")
+    except (FileNotFoundError, ValueError):
+        logger.info(f"Build the index of {filepath}")
+
+    index = PubTatorIndex.build(filepath)
+    try:
+        index.save()
+    except OSError as e:
+        logger.warning(f"Failed to save the index of {filepath}: {e}")
+
+    return index
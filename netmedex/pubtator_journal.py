@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class PubTatorJournal:
+    """Checkpoint journal of a `PubTatorAPI` request.
+
+    The PMIDs found by the search and every completed export batch are appended
+    to a JSON Lines file as soon as they are available. Running the same request
+    again loads the journal and only requests the unfinished batches. The journal
+    is removed once the request succeeds.
+
+    Args:
+        path (str | Path):
+            Path to the journal file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.pmid_list: list[str] | None = None
+        self.batches: list[tuple[list[str], Any]] = []
+        self._load()
+
+    def __repr__(self) -> str:
+        return f"PubTatorJournal(path={str(self.path)!r}, num_batches={len(self.batches)})"
+
+    @classmethod
+    def from_request(cls, directory: str | Path, **request: Any) -> "PubTatorJournal":
+        """Open the journal of a request identified by its parameters."""
+        key = hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()
+        return cls(Path(directory) / f"{key}.jsonl")
+
+    @property
+    def completed_pmids(self) -> set[str]:
+        return {pmid for pmids, _ in self.batches for pmid in pmids}
+
+    @property
+    def responses(self) -> list[Any]:
+        return [response for _, response in self.batches]
+
+    def write_pmid_list(self, pmid_list: Sequence[str]):
+        self.pmid_list = list(pmid_list)
+        self._append({"pmid_list": self.pmid_list})
+
+    def append_batch(self, pmids: Sequence[str], response: Any):
+        self.batches.append((list(pmids), response))
+        self._append({"pmids": list(pmids), "response": response})
+
+    def remove(self):
+        self.pmid_list = None
+        self.batches = []
+        self.path.unlink(missing_ok=True)
+
+    def _append(self, record: dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the process was killed
+                    logger.warning(f"Skip a corrupted record in {self.path}")
+                    break
+                valid_size += len(line)
+                if "pmid_list" in record:
+                    self.pmid_list = record["pmid_list"]
+                elif "pmids" in record:
+                    self.batches.append((record["pmids"], record["response"]))
+
+        # Drop the corrupted records so that new records can be appended
+        os.truncate(self.path, valid_size)
+
+        logger.info(f"Resume from checkpoint: {len(self.batches)} completed batches")
@@ -1,7 +1,18 @@
+import itertools
+import logging
+from collections.abc import Collection, Iterator
 from dataclasses import dataclass
 from io import TextIOBase
 from pathlib import Path
+from typing import BinaryIO, Literal
 
+from netmedex.compressed_io import get_compression, open_compressed
+from netmedex.pubtator_bytes_parser import (
+    iter_line_chunks,
+    iter_parallel_articles,
+    parse_pubtator_chunks,
+    paused_gc,
+)
 from netmedex.pubtator_data import (
     PubTatorAnnotation,
     PubTatorArticle,
@@ -9,6 +20,9 @@ from netmedex.pubtator_data import (
     PubTatorLine,
     PubTatorRelation,
 )
+from netmedex.pubtator_index import get_pubtator_index
+
+logger = logging.getLogger(__name__)
 
 # Custom metadata header
 HEADER_SYMBOL = "##"
@@ -17,21 +31,102 @@ HEADER_SYMBOL = "##"
 class PubTatorIO:
     """Parse a PubTator file.
 
-    Extra headers added by NetMedEx is also parsed.
+    Extra headers added by NetMedEx is also parsed. Files ending with `.gz` or
+    `.zst` are decompressed on the fly (see `open_compressed`).
     """
 
     @staticmethod
-    def parse(filepath: str | Path) -> PubTatorCollection:
-        articles: list[PubTatorArticle] = []
-        with open(filepath) as stream:
-            result = PubTatorIO._parse_header(stream)
-            if (non_header_line := result.non_header_line) is not None:
-                for article in PubTatorIterator(stream, non_header_line):
-                    if article is None:
-                        break
-                    articles.append(article)
-
-        return PubTatorCollection(result.headers, articles)
+    def parse(
+        filepath: str | Path,
+        engine: Literal["python", "bytes"] = "python",
+        workers: int = 1,
+        pmids: Collection[str | int] | None = None,
+    ) -> PubTatorCollection:
+        """Parse a PubTator file into a collection.
+
+        Args:
+            filepath (str | Path):
+                Path to the PubTator file.
+            engine (Literal["python", "bytes"]):
+                "python" to parse line by line with `PubTatorIterator`, or "bytes" to parse
+                large chunks of raw bytes with `parse_pubtator_chunks`, which is several
+                times faster on large files. Both return the same collection.
+                Defaults to "python".
+            workers (int):
+                Number of processes to parse the file in. If greater than 1, the file is split
+                into byte ranges at article boundaries parsed with the "bytes" engine in
+                parallel (see `iter_parallel_articles`), and the articles are merged in order.
+                Compressed files cannot be split and are parsed in one process.
+                Defaults to 1.
+            pmids (Collection[str | int] | None):
+                Only parse the articles of these PMIDs, in the order of the file. They are
+                read straight from their offsets in the index of the file, which is built
+                and saved next to it if missing or outdated (see `PubTatorIndex`).
+                Compressed files cannot be indexed and are scanned for the PMIDs instead.
+                Defaults to None (all articles).
+        """
+        stream = PubTatorIO.iter_articles(filepath, engine=engine, workers=workers, pmids=pmids)
+        if engine == "bytes" or workers > 1:
+            with paused_gc():
+                articles = list(stream)
+        else:
+            articles = list(stream)
+
+        return PubTatorCollection(stream.headers, articles)
+
+    @staticmethod
+    def iter_articles(
+        filepath: str | Path,
+        engine: Literal["python", "bytes"] = "python",
+        workers: int = 1,
+        pmids: Collection[str | int] | None = None,
+    ) -> "PubTatorArticleStream":
+        """Iterate the articles of a PubTator file without keeping them in memory.
+
+        The headers are read up front and available as `headers`. Articles are
+        parsed as they are iterated, e.g., by `PubTatorGraphBuilder.add_collection`,
+        so only the current article is held in memory. See `parse` for `engine`,
+        `workers` and `pmids`.
+
+        Example:
+            ```python
+            articles = PubTatorIO.iter_articles("articles.pubtator")
+            print(articles.headers)
+            for article in articles:
+                print(article.pmid)
+            ```
+        """
+        return PubTatorArticleStream(filepath, engine=engine, workers=workers, pmids=pmids)
+
+    @staticmethod
+    def read_pmids(filepath: str | Path) -> list[str]:
+        """Read the PMIDs of the articles in a PubTator file without parsing them."""
+        pmids: list[str] = []
+        with open_compressed(filepath) as stream:
+            for line in stream:
+                if PubTatorIterator._get_title(line) is not None:
+                    pmids.append(line.split("|", 1)[0])
+
+        return pmids
+
+    @staticmethod
+    def read_headers(filepath: str | Path) -> list[str]:
+        with open_compressed(filepath) as stream:
+            return PubTatorIO._parse_header(stream).headers
+
+    @staticmethod
+    def _parse_header_bytes(stream: BinaryIO) -> tuple[list[str], bytes]:
+        """Parse the headers and return them with the first non-header line.
+
+        Compressed streams cannot seek back, so the line is returned instead.
+        """
+        headers = []
+        symbol = HEADER_SYMBOL.encode()
+        while True:
+            line = stream.readline()
+            if not line.startswith(symbol):
+                return headers, line
+            headers.append(line.decode("utf-8").replace(HEADER_SYMBOL, "", 1).strip())
 
     @staticmethod
     def _parse_header(stream: TextIOBase) -> "PubTatorHeaderResult":
@@ -44,6 +139,65 @@ class PubTatorIO:
             return PubTatorHeaderResult(headers=headers, non_header_line=None)
 
 
+class PubTatorArticleStream:
+    """Articles of a PubTator file parsed lazily. Created by `PubTatorIO.iter_articles`.
+
+    The file is opened again every time the stream is iterated, and closed
+    when the iteration ends.
+    """
+
+    def __init__(
+        self,
+        filepath: str | Path,
+        engine: Literal["python", "bytes"] = "python",
+        workers: int = 1,
+        pmids: Collection[str | int] | None = None,
+    ):
+        self.filepath = filepath
+        self.engine = engine
+        self.workers = workers
+        self.pmids = pmids
+        self.headers = PubTatorIO.read_headers(filepath)
+
+    def __repr__(self) -> str:
+        return (
+            f"PubTatorArticleStream(filepath={str(self.filepath)!r}, "
+            f"engine={self.engine!r}, workers={self.workers})"
+        )
+
+    def __iter__(self) -> Iterator[PubTatorArticle]:
+        if self.pmids is None:
+            yield from self._iter_all()
+        elif get_compression(self.filepath) is not None:
+            # Compressed files cannot be indexed
+            pmids = {str(pmid) for pmid in self.pmids}
+            yield from (article for article in self._iter_all() if article.pmid in pmids)
+        else:
+            yield from get_pubtator_index(self.filepath).read_articles(self.pmids)
+
+    def _iter_all(self) -> Iterator[PubTatorArticle]:
+        engine, workers = self.engine, self.workers
+        if workers > 1 and get_compression(self.filepath) is not None:
+            logger.warning(f"Parse the compressed file {self.filepath} in one process")
+            engine, workers = "bytes", 1
+
+        if workers > 1:
+            yield from iter_parallel_articles(self.filepath, workers=workers)
+        elif engine == "bytes":
+            with open_compressed(self.filepath, "rb") as stream:
+                _, first_line = PubTatorIO._parse_header_bytes(stream)
+                chunks = itertools.chain([first_line], iter_line_chunks(stream))
+                yield from parse_pubtator_chunks(chunks)
+        else:
+            with open_compressed(self.filepath) as stream:
+                result = PubTatorIO._parse_header(stream)
+                if (non_header_line := result.non_header_line) is not None:
+                    for article in PubTatorIterator(stream, non_header_line):
+                        if article is None:
+                            break
+                        yield article
+
+
 class PubTatorIterator:
     """Iterate a Pubtator file or string line by line (excluded header)"""
 
@@ -52,7 +206,7 @@ class PubTatorIterator:
             # Treat it as a string
             self.stream = iter(handle.splitlines())
         elif isinstance(handle, Path):
-            self.stream = open(handle)
+            self.stream = open_compressed(handle)
         elif isinstance(handle, TextIOBase):
             self.stream = handle
 
@@ -0,0 +1,426 @@
+"""A local stand-in of the PubTator3 API for offline testing and benchmarking.
+
+Responses of the `search/` and `publications/export/` endpoints are replayed
+from a recording, optionally with injected latency, errors, and dropped
+connections. Point `PubTatorAPI(base_url=...)` at the server to exercise the
+real request path, including retries and rate limiting, without network.
+
+Record responses from the real API (or another server) with `upstream_url`:
+
+    python -m netmedex.pubtator_server recording.jsonl --record
+
+and replay them:
+
+    python -m netmedex.pubtator_server recording.jsonl --latency 0.2 --error_rate 429=0.1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any, Literal
+
+from aiohttp import ClientSession, web
+
+from netmedex.exceptions import RetryableError, UnsuccessfulRequest
+from netmedex.pubtator import (
+    PUBTATOR_API_URL,
+    PUBTATOR_EXPORT_URL,
+    PUBTATOR_SEARCH_URL,
+    create_session,
+    request_pubtator3,
+)
+from netmedex.pubtator_cache import PubTatorCache, merge_articles, split_response
+from netmedex.rate_limiter import RateLimiter
+from netmedex.utils import config_logger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+
+
+class PubTatorRecording:
+    """Recorded responses of the PubTator3 API.
+
+    Search responses are stored by their query parameters. Export responses are
+    split into articles so that any batch of recorded PMIDs can be replayed.
+    Recordings are saved as JSON Lines.
+
+    Args:
+        path (str | Path | None):
+            File to load the recording from and save it to. Defaults to None.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self.searches: dict[str, Any] = {}
+        self.articles: dict[str, Any] = {}
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __repr__(self) -> str:
+        return (
+            f"PubTatorRecording(num_searches={len(self.searches)}, "
+            f"num_articles={len(self.articles)})"
+        )
+
+    @staticmethod
+    def make_search_key(text: str, sort: str | None = None, page: int | str | None = None) -> str:
+        return json.dumps([text, sort or "", str(page or 1)])
+
+    def get_search(self, text: str, sort: str | None = None, page: int | str | None = None):
+        return self.searches.get(self.make_search_key(text, sort, page))
+
+    def add_search(
+        self,
+        response: Any,
+        text: str,
+        sort: str | None = None,
+        page: int | str | None = None,
+    ):
+        self.searches[self.make_search_key(text, sort, page)] = response
+
+    def get_articles(
+        self,
+        pmids: Iterable[str],
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ) -> dict[str, Any]:
+        """Return `{pmid: article}` for the recorded PMIDs."""
+        found = {}
+        for pmid in pmids:
+            article = self.articles.get(PubTatorCache.make_key(pmid, format, full_text))
+            if article is not None:
+                found[pmid] = article
+        return found
+
+    def add_export(
+        self,
+        response: Any,
+        format: Literal["biocjson", "pubtator"],
+        full_text: bool,
+    ):
+        for pmid, article in split_response(response, format).items():
+            self.articles[PubTatorCache.make_key(pmid, format, full_text)] = article
+
+    def save(self, path: str | Path | None = None):
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("No path to save the recording.")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for key, response in self.searches.items():
+                f.write(json.dumps({"search": json.loads(key), "response": response}) + "\n")
+            for key, article in self.articles.items():
+                f.write(json.dumps({"article": key, "response": article}) + "\n")
+
+    def _load(self):
+        assert self.path is not None
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "search" in record:
+                    self.add_search(record["response"], *record["search"])
+                elif "article" in record:
+                    self.articles[record["article"]] = record["response"]
+
+
+class PubTatorStandIn:
+    """A local aiohttp server that replays a `PubTatorRecording`.
+
+    Faults are injected before a request is served: it is delayed by `latency`
+    (plus a random `jitter`), its connection is dropped with probability
+    `drop_rate`, or it fails with a status in `error_rates` with the given
+    probability. Requested PMIDs that are not recorded are left out of export
+    responses, like the real API does for unknown PMIDs, and unrecorded searches
+    respond with 404.
+
+    Use it as an async context manager and send requests to `base_url`. Served
+    requests and injected faults are counted in `stats`.
+
+    Args:
+        recording (PubTatorRecording):
+            Responses to replay.
+        host (str):
+            Host to listen on. Defaults to "127.0.0.1".
+        port (int):
+            Port to listen on. Defaults to 0 (a free port).
+        latency (float):
+            Seconds to delay each response. Defaults to 0.
+        jitter (float):
+            Maximum random seconds added to `latency`. Defaults to 0.
+        error_rates (Mapping[int, float] | None):
+            `{status: probability}` of responding with an error, e.g., `{429: 0.1, 502: 0.05}`.
+            Defaults to None.
+        drop_rate (float):
+            Probability of closing the connection without a response. Defaults to 0.
+        retry_after (float | None):
+            `Retry-After` header (in seconds) of 429 and 503 responses. Defaults to None.
+        upstream_url (str | None):
+            Record mode. Request the responses missing from the recording from this base URL,
+            e.g., `PUBTATOR_API_URL`, and add them to the recording. Defaults to None.
+        rate_limiter (RateLimiter | None):
+            Limiter of the requests to `upstream_url`. Defaults to `get_default_rate_limiter()`.
+        seed (int | None):
+            Seed of the random faults. Defaults to None.
+    """
+
+    stats: Counter[str]
+    """Number of served requests by endpoint ("search", "export") and of injected faults
+    by status or "drop" """
+
+    def __init__(
+        self,
+        recording: PubTatorRecording,
+        host: str = DEFAULT_HOST,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rates: Mapping[int, float] | None = None,
+        drop_rate: float = 0.0,
+        retry_after: float | None = None,
+        upstream_url: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.recording = recording
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates) if error_rates is not None else {}
+        self.drop_rate = drop_rate
+        self.retry_after = retry_after
+        self.upstream_url = upstream_url
+        self.rate_limiter = rate_limiter
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self._upstream: ClientSession | None = None
+
+    def __repr__(self) -> str:
+        return f"PubTatorStandIn(base_url={self.base_url!r}, stats={dict(self.stats)})"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/" + PUBTATOR_SEARCH_URL, self._handle_search)
+        app.router.add_get(
+            "/" + PUBTATOR_EXPORT_URL.format(format="{format}"), self._handle_export
+        )
+        self._runner = web.AppRunner(app, handle_signals=False, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Resolve the free port picked by the OS
+        self.port = self._runner.addresses[0][1]
+        if self.upstream_url is not None:
+            self._upstream = create_session(self.rate_limiter, base_url=self.upstream_url)
+        logger.info(f"Serving PubTator3 stand-in at {self.base_url}")
+
+    async def close(self):
+        if self._upstream is not None:
+            await self._upstream.close()
+            self._upstream = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _inject_faults(self, request: web.Request) -> web.StreamResponse | None:
+        delay = self.latency
+        if self.jitter > 0:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Faults are mutually exclusive, so each rate is the probability of that fault
+        threshold = self._random.random()
+        if threshold < self.drop_rate:
+            self.stats["drop"] += 1
+            assert request.transport is not None
+            request.transport.abort()
+            # Nothing can be sent once the connection is closed
+            return web.Response()
+
+        threshold -= self.drop_rate
+        for status, rate in self.error_rates.items():
+            if threshold < rate:
+                self.stats[str(status)] += 1
+                headers = {}
+                if self.retry_after is not None and status in (429, 503):
+                    headers["Retry-After"] = str(self.retry_after)
+                return web.Response(status=status, headers=headers)
+            threshold -= rate
+
+        return None
+
+    async def _handle_search(self, request: web.Request) -> web.StreamResponse:
+        if (fault := await self._inject_faults(request)) is not None:
+            return fault
+        self.stats["search"] += 1
+
+        text = request.query.get("text", "")
+        sort = request.query.get("sort")
+        page = request.query.get("page")
+        response = self.recording.get_search(text, sort, page)
+        if response is None and self._upstream is not None:
+            response = await self._request_upstream(PUBTATOR_SEARCH_URL, request, is_json=True)
+            self.recording.add_search(response, text, sort, page)
+
+        if response is None:
+            return web.json_response({"detail": "Search not recorded"}, status=404)
+        return web.json_response(response)
+
+    async def _handle_export(self, request: web.Request) -> web.StreamResponse:
+        if (fault := await self._inject_faults(request)) is not None:
+            return fault
+        self.stats["export"] += 1
+
+        format: Literal["biocjson", "pubtator"]
+        if request.match_info["format"] == "biocjson":
+            format = "biocjson"
+        elif request.match_info["format"] == "pubtator":
+            format = "pubtator"
+        else:
+            return web.Response(status=404)
+
+        pmids = [pmid for pmid in request.query.get("pmids", "").split(",") if pmid]
+        full_text = request.query.get("full") == "true"
+        articles = self.recording.get_articles(pmids, format, full_text)
+
+        missing_pmids = [pmid for pmid in pmids if pmid not in articles]
+        if missing_pmids and self._upstream is not None:
+            params = {"pmids": ",".join(missing_pmids)}
+            if full_text:
+                params["full"] = "true"
+            response = await self._request_upstream(
+                PUBTATOR_EXPORT_URL.format(format=format),
+                request,
+                is_json=format == "biocjson",
+                params=params,
+            )
+            self.recording.add_export(response, format, full_text)
+            articles = self.recording.get_articles(pmids, format, full_text)
+
+        response = merge_articles(
+            [articles[pmid] for pmid in pmids if pmid in articles],
+            format,
+        )
+        if format == "biocjson":
+            return web.json_response(response)
+        return web.Response(text=response)
+
+    async def _request_upstream(
+        self,
+        url: str,
+        request: web.Request,
+        is_json: bool,
+        params: Mapping[str, str] | None = None,
+    ) -> Any:
+        assert self._upstream is not None
+        try:
+            return await request_pubtator3(
+                url,
+                params=dict(params if params is not None else request.query),
+                session=self._upstream,
+                is_json=is_json,
+            )
+        except (RetryableError, UnsuccessfulRequest) as e:
+            logger.warning(f"Failed to record {request.path_qs}: {e}")
+            raise web.HTTPBadGateway()
+
+
+def parse_error_rate(value: str) -> tuple[int, float]:
+    status, rate = value.split("=")
+    return int(status), float(rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m netmedex.pubtator_server",
+        description="Serve recorded PubTator3 API responses",
+    )
+    parser.add_argument("recording", type=str, help="JSON Lines file of the recorded responses")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Request unrecorded responses from the PubTator3 API and save them on exit",
+    )
+    parser.add_argument(
+        "--upstream_url",
+        type=str,
+        default=PUBTATOR_API_URL,
+        help="Base URL to record responses from (default: PubTator3 API)",
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay responses")
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Maximum random seconds added to the latency"
+    )
+    parser.add_argument(
+        "--error_rate",
+        type=parse_error_rate,
+        action="append",
+        default=[],
+        help="Respond with an error status at a probability, e.g., 429=0.1 (repeatable)",
+    )
+    parser.add_argument(
+        "--drop_rate", type=float, default=0.0, help="Probability of dropping a connection"
+    )
+    parser.add_argument(
+        "--retry_after", type=float, default=None, help="Retry-After of 429 and 503 responses"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the random faults")
+    parser.add_argument("--debug", action="store_true", help="Print debug information")
+    args = parser.parse_args()
+
+    config_logger(args.debug)
+
+    recording = PubTatorRecording(args.recording)
+    server = PubTatorStandIn(
+        recording,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rates=dict(args.error_rate),
+        drop_rate=args.drop_rate,
+        retry_after=args.retry_after,
+        upstream_url=args.upstream_url if args.record else None,
+        seed=args.seed,
+    )
+
+    async def serve():
+        async with server:
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Served: {dict(server.stats)}")
+        if args.record:
+            recording.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+from aiohttp import ClientSession
+
+from netmedex.pubtator import PUBTATOR_API_URL, PubTatorAPI, create_session
+from netmedex.pubtator_cache import PubTatorCache
+from netmedex.pubtator_data import PubTatorCollection
+from netmedex.pubtator_store import PubTatorStore
+from netmedex.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class PubTatorService:
+    """Run `PubTatorAPI` requests in a long-lived event loop.
+
+    The loop runs in a background thread and owns one session, so requests
+    submitted from any thread, e.g., by the callbacks of the web app, reuse
+    the same connection pool instead of starting an event loop and a session
+    for each request. Requests are paced by one rate limiter, which serves
+    concurrent requests in turn, and share the cache or store of the service.
+
+    The loop starts with the first request. Call `close` to close the session
+    and stop the loop.
+
+    Args:
+        rate_limiter (RateLimiter | None):
+            Limiter applied to every request. Defaults to `get_default_rate_limiter()`.
+        cache (PubTatorCache | PubTatorStore | None):
+            Cache or store used by requests that do not pass their own `cache`.
+            Closed with the service if it is a `PubTatorStore`. Defaults to None.
+        base_url (str):
+            Base URL of the PubTator3 API. Defaults to `PUBTATOR_API_URL`.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: RateLimiter | None = None,
+        cache: PubTatorCache | PubTatorStore | None = None,
+        base_url: str = PUBTATOR_API_URL,
+    ) -> None:
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._session: ClientSession | None = None
+
+    def __repr__(self) -> str:
+        return f"PubTatorService(base_url={self.base_url!r}, running={self.running})"
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the event loop and open the session if they are not running yet."""
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=self._run_loop, args=(loop,), name="pubtator-service", daemon=True
+            )
+            thread.start()
+            self._session = asyncio.run_coroutine_threadsafe(self._open_session(), loop).result()
+            self._loop = loop
+            self._thread = thread
+            logger.debug("Started the PubTator3 request service")
+
+    def submit(self, **kwargs: Any) -> "Future[PubTatorCollection]":
+        """Run `PubTatorAPI(**kwargs)` in the event loop of the service.
+
+        `session` and `rate_limiter` are provided by the service. Progress
+        callbacks are called in the thread of the event loop.
+
+        Returns:
+            Future[PubTatorCollection]:
+                The result of `PubTatorAPI.arun`. Cancel it to cancel the request.
+        """
+        self.start()
+        assert self._loop is not None
+
+        if self.cache is not None:
+            kwargs.setdefault("cache", self.cache)
+        api = PubTatorAPI(session=self._session, **kwargs)
+
+        return asyncio.run_coroutine_threadsafe(api.arun(), self._loop)
+
+    def run(self, **kwargs: Any) -> PubTatorCollection:
+        """Synchronous version of `submit` that waits for the result."""
+        return self.submit(**kwargs).result()
+
+    def close(self):
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = None
+            if loop is None:
+                return
+
+            asyncio.run_coroutine_threadsafe(self._shutdown(session), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join()
+            loop.close()
+
+            if isinstance(self.cache, PubTatorStore):
+                self.cache.close()
+            logger.debug("Stopped the PubTator3 request service")
+
+    async def _open_session(self) -> ClientSession:
+        return create_session(self.rate_limiter, base_url=self.base_url)
+
+    @staticmethod
+    async def _shutdown(session: ClientSession | None):
+        # Cancel the requests still running
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if session is not None:
+            await session.close()
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
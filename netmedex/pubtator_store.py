@@ -0,0 +1,255 @@
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from collections.abc import Collection, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Literal
+
+from netmedex.biocjson_parser import pubtator_to_biocjson
+from netmedex.pubtator_dump import (
+    DumpFormat,
+    guess_dump_format,
+    iter_biocxml_documents,
+    read_pubtator_dump,
+)
+
+logger = logging.getLogger(__name__)
+
+# Format of the records of bioconcepts dumps, which have no title, abstract, or offsets.
+# `PubTatorAPI` never looks it up, so such articles are still requested in full.
+BIOCONCEPTS_FORMAT = "bioconcepts"
+StoreFormat = Literal["biocjson", "pubtator", "bioconcepts"]
+# Number of records inserted in one transaction
+DEFAULT_BATCH_SIZE = 10000
+# Number of PMIDs looked up in one query (SQLite allows up to 32766 parameters)
+LOOKUP_SIZE = 500
+# Seconds to wait for the lock held by another writer
+BUSY_TIMEOUT = 60
+
+
+class PubTatorStore:
+    """Persistent PMID-to-annotation store in a SQLite database.
+
+    Articles are stored one per row in the structure of the PubTator3 export
+    responses, compressed with zlib and indexed by PMID, response format, and
+    the `full_text` flag. The store implements the interface of `PubTatorCache`,
+    so it can be passed to `PubTatorAPI(cache=...)`: stored PMIDs are resolved
+    locally and only the missing ones are requested.
+
+    Unlike `PubTatorCache`, the store is never evicted. Fill it in bulk with
+    `add_dump` or `add_records`; records are inserted in transactions of
+    `batch_size` rows. The database runs in WAL mode, so the CLI and the web
+    app can read it while it is being written.
+
+    Args:
+        path (str | Path):
+            Path to the SQLite database. Created if it does not exist.
+        batch_size (int):
+            Number of records inserted in one transaction. Defaults to 10000.
+    """
+
+    hits: int
+    """Number of PMIDs found in the store"""
+    misses: int
+    """Number of PMIDs not found in the store"""
+
+    def __init__(self, path: str | Path, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        # sqlite3 connections cannot be shared across threads
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                "pmid TEXT NOT NULL, "
+                "format TEXT NOT NULL, "
+                "full_text INTEGER NOT NULL, "
+                "record BLOB NOT NULL, "
+                "PRIMARY KEY (pmid, format, full_text)"
+                ") WITHOUT ROWID"
+            )
+
+    def __repr__(self) -> str:
+        return f"PubTatorStore(path={str(self.path)!r}, hits={self.hits}, misses={self.misses})"
+
+    def get_many(
+        self,
+        pmids: Iterable[str],
+        format: StoreFormat,
+        full_text: bool,
+    ) -> dict[str, Any]:
+        """Return `{pmid: article}` for the PMIDs found in the store."""
+        conn = self._connect()
+        found = {}
+        pmid_iter = iter(pmids)
+        while batch := list(islice(pmid_iter, LOOKUP_SIZE)):
+            rows = conn.execute(
+                "SELECT pmid, record FROM articles "
+                f"WHERE format = ? AND full_text = ? AND pmid IN ({','.join('?' * len(batch))})",
+                (format, int(full_text), *batch),
+            )
+            n_found = len(found)
+            for pmid, record in rows:
+                found[pmid] = decode_record(record)
+            self.hits += len(found) - n_found
+            self.misses += len(batch) - (len(found) - n_found)
+
+        return found
+
+    def find_pmids(
+        self,
+        pmids: Iterable[str],
+        format: StoreFormat,
+        full_text: bool,
+    ) -> set[str]:
+        """Return the PMIDs found in the store without reading their records."""
+        conn = self._connect()
+        found = set()
+        pmid_iter = iter(pmids)
+        while batch := list(islice(pmid_iter, LOOKUP_SIZE)):
+            rows = conn.execute(
+                "SELECT pmid FROM articles "
+                f"WHERE format = ? AND full_text = ? AND pmid IN ({','.join('?' * len(batch))})",
+                (format, int(full_text), *batch),
+            )
+            found.update(pmid for (pmid,) in rows)
+
+        return found
+
+    def set_many(
+        self,
+        articles: Mapping[str, Any],
+        format: StoreFormat,
+        full_text: bool,
+    ):
+        self.add_records(articles.items(), format, full_text)
+
+    def add_records(
+        self,
+        records: Iterable[tuple[str, Any]],
+        format: StoreFormat,
+        full_text: bool,
+    ) -> int:
+        """Insert or replace `(pmid, article)` records and return the number of records."""
+        n_records = 0
+        record_iter = iter(records)
+        while batch := list(islice(record_iter, self.batch_size)):
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO articles (pmid, format, full_text, record) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (str(pmid), format, int(full_text), encode_record(article))
+                        for pmid, article in batch
+                    ],
+                )
+            n_records += len(batch)
+            logger.debug(f"Stored {n_records} articles in {self.path}")
+
+        return n_records
+
+    def add_dump(
+        self,
+        filepath: str | Path,
+        format: DumpFormat | None = None,
+        pmids: Collection[str] | None = None,
+        full_text: bool = False,
+    ) -> int:
+        """Store the articles of a PubTator3 bulk dump file (see `read_pubtator_dump`).
+
+        Articles are stored as "biocjson" records, the format requested by `netmedex search`.
+        Set `full_text` to store BioC XML documents as full-text records instead. Bioconcepts
+        dumps only list the concepts of each article, so they are stored as "bioconcepts"
+        records, which are not returned to `PubTatorAPI`.
+
+        Returns:
+            int:
+                The number of stored articles.
+        """
+        if format is None:
+            format = guess_dump_format(filepath)
+        if pmids is not None:
+            pmids = {str(pmid) for pmid in pmids}
+
+        records: Iterator[tuple[str, Any]]
+        if format == "biocxml":
+            records = (
+                (document["pmid"], document)
+                for document in iter_biocxml_documents(filepath, pmids)
+            )
+        else:
+            records = (
+                (article.pmid, pubtator_to_biocjson(article))
+                for article in read_pubtator_dump(filepath, format=format, pmids=pmids)
+            )
+
+        n_records = self.add_records(
+            records, BIOCONCEPTS_FORMAT if format == "bioconcepts" else "biocjson", full_text
+        )
+        logger.info(f"Stored {n_records} articles from {filepath}")
+
+        return n_records
+
+    def stats(self) -> dict[str, int]:
+        conn = self._connect()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self.path.stat().st_size,
+            "count": conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+        }
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM articles")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            # Autocommit mode, transactions are opened explicitly
+            conn = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+            )
+            # Readers do not block the writer and vice versa
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def encode_record(article: Any) -> bytes:
+    return zlib.compress(json.dumps(article, separators=(",", ":")).encode())
+
+
+def decode_record(record: bytes) -> Any:
+    return json.loads(zlib.decompress(record))
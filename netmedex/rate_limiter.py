@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import IO
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Status codes indicating that requests are sent too fast
+RATE_LIMITED_STATUS = {429, 503}
+
+# Job sending requests in the current context, for sessions shared by several jobs
+current_job: ContextVar[Hashable | None] = ContextVar("current_job", default=None)
+
+
+class RateLimiter:
+    """Limit the number of concurrent requests and how often a request may start.
+
+    Requests are paced by a token bucket refilled at `max_per_second` tokens per
+    second. Share one instance between jobs that should count against the same
+    rate limit (e.g., searching and exporting in the same run). Requests are
+    served in the order they wait for a slot.
+
+    Attach the limiter to an `aiohttp.ClientSession` with `trace_config` so that
+    every request sent by the session, including retries, is limited. The
+    `Retry-After` header of a response pauses all subsequent requests.
+
+    Args:
+        max_at_once (int):
+            Maximum number of requests in flight.
+        max_per_second (float):
+            Maximum number of requests started per second.
+        burst (int):
+            Maximum number of requests that may start at once after being idle. Defaults to 1.
+    """
+
+    def __init__(self, max_at_once: int, max_per_second: float, burst: int = 1) -> None:
+        self.max_at_once = max_at_once
+        self.max_per_second = max_per_second
+        self.burst = burst
+        self.rate = max_per_second
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore
+        self._lock: asyncio.Lock
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(max_at_once={self.max_at_once}, "
+            f"max_per_second={self.max_per_second}, effective_rate={self.effective_rate:.2f})"
+        )
+
+    @property
+    def effective_rate(self) -> float:
+        """Current number of requests allowed per second"""
+        return self.rate
+
+    async def acquire(self, job: Hashable | None = None):
+        """Wait for a request slot. `job` identifies who sends the request."""
+        self._bind_loop()
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                await self._wait_for_token()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def release(self):
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args):
+        self.release()
+
+    def record_response(self, status: int, retry_after: float | None = None):
+        """Update the limiter with the status and `Retry-After` of a response."""
+        if retry_after is not None:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.debug(f"Pause requests for {retry_after} seconds (status: {status})")
+
+    def trace_config(self, job: Hashable | None = None) -> aiohttp.TraceConfig:
+        """Create a trace config to limit every request of a `ClientSession`.
+
+        Requests are attributed to `job`, or to `current_job` if `job` is None.
+        """
+
+        async def on_request_start(session, trace_config_ctx: SimpleNamespace, params):
+            await self.acquire(job if job is not None else current_job.get())
+            trace_config_ctx.rate_limited = True
+
+        async def on_request_end(session, trace_config_ctx: SimpleNamespace, params):
+            self.release()
+            self.record_response(
+                params.response.status,
+                parse_retry_after(params.response.headers.get("Retry-After")),
+            )
+
+        async def on_request_exception(session, trace_config_ctx: SimpleNamespace, params):
+            if getattr(trace_config_ctx, "rate_limited", False):
+                self.release()
+
+        trace_config = RateLimiterTraceConfig(self)
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+
+        return trace_config
+
+    def _bind_loop(self):
+        # asyncio primitives are bound to the event loop they are first used in
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_at_once)
+            self._lock = asyncio.Lock()
+
+    async def _wait_for_token(self):
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            await asyncio.sleep(wait)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+
+class RateLimiterTraceConfig(aiohttp.TraceConfig):
+    """Trace config limiting the requests of a session by `rate_limiter`"""
+
+    def __init__(self, rate_limiter: RateLimiter) -> None:
+        super().__init__()
+        self.rate_limiter = rate_limiter
+
+
+def is_rate_limited(session: aiohttp.ClientSession) -> bool:
+    """Whether the requests of `session` are limited by the trace config of a `RateLimiter`"""
+    return any(isinstance(config, RateLimiterTraceConfig) for config in session.trace_configs)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """A `RateLimiter` that adapts its rate to the responses of the server.
+
+    The rate is multiplied by `decrease_factor` whenever the server responds
+    with 429 or 503, and is increased by `increase_step` after each successful
+    response until it is back at `max_per_second`.
+
+    Args:
+        max_at_once (int):
+            Maximum number of requests in flight.
+        max_per_second (float):
+            Maximum number of requests started per second, e.g., the published rate limit.
+        min_per_second (float):
+            Lower bound of the rate. Defaults to 0.1.
+        increase_step (float):
+            Rate added after each successful response. Defaults to 0.05.
+        decrease_factor (float):
+            Factor applied to the rate after a rate-limited response. Defaults to 0.5.
+        burst (int):
+            Maximum number of requests that may start at once after being idle. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        max_at_once: int,
+        max_per_second: float,
+        min_per_second: float = 0.1,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        burst: int = 1,
+    ) -> None:
+        super().__init__(max_at_once, max_per_second, burst=burst)
+        self.min_per_second = min_per_second
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+    def record_response(self, status: int, retry_after: float | None = None):
+        super().record_response(status, retry_after)
+        self._refill(time.monotonic())
+        if status in RATE_LIMITED_STATUS:
+            self.rate = max(self.min_per_second, self.rate * self.decrease_factor)
+            logger.debug(f"Rate limited (status: {status}). Slow down to {self.rate:.2f} req/s")
+        elif status < 400:
+            self.rate = min(self.max_per_second, self.rate + self.increase_step)
+
+
+class SharedRateLimiter(AdaptiveRateLimiter):
+    """An `AdaptiveRateLimiter` that can be shared across threads, event loops, and processes.
+
+    Use one instance for every job in a process (see `get_shared_rate_limiter`)
+    so that concurrent jobs, e.g., simultaneous searches in the web app, do not
+    multiply the request rate. Jobs waiting for a slot are served round-robin so
+    that a large job does not starve the others.
+
+    If `state_file` is given, the start time of the next request and the pause
+    requested by `Retry-After` are stored in this file under a file lock, so all
+    processes using the same file share the request rate. The number of requests
+    in flight is limited per process.
+
+    Args:
+        max_at_once (int):
+            Maximum number of requests in flight (per process).
+        max_per_second (float):
+            Maximum number of requests started per second.
+        state_file (str | Path | None):
+            File to share the request rate with other processes. Defaults to None.
+        **kwargs:
+            Other arguments passed to `AdaptiveRateLimiter`.
+    """
+
+    def __init__(
+        self,
+        max_at_once: int,
+        max_per_second: float,
+        state_file: str | Path | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(max_at_once, max_per_second, **kwargs)
+        self.state_file = Path(state_file) if state_file is not None else None
+        self._mutex = threading.Lock()
+        self._in_flight = 0
+        # Jobs with waiting requests, in the order they are served
+        self._waiting_jobs: deque[Hashable | None] = deque()
+        self._waiters: dict[
+            Hashable | None, deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]]
+        ] = {}
+        self._next_start = 0.0
+        self._shared_paused_until = 0.0
+
+    async def acquire(self, job: Hashable | None = None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._mutex:
+            if job not in self._waiters:
+                self._waiters[job] = deque()
+                self._waiting_jobs.append(job)
+            self._waiters[job].append(waiter)
+            self._dispatch()
+
+        try:
+            start = await future
+        except BaseException:
+            with self._mutex:
+                if (waiters := self._waiters.get(job)) is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[job]
+                        self._waiting_jobs.remove(job)
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+        try:
+            await asyncio.sleep(start - time.time())
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        with self._mutex:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def record_response(self, status: int, retry_after: float | None = None):
+        with self._mutex:
+            super().record_response(status)
+            if retry_after is not None:
+                logger.debug(f"Pause requests for {retry_after} seconds (status: {status})")
+                with self._shared_state() as state:
+                    state["paused_until"] = max(state["paused_until"], time.time() + retry_after)
+
+    def _dispatch(self):
+        # Called with `self._mutex` held
+        while self._in_flight < self.max_at_once and self._waiting_jobs:
+            job = self._waiting_jobs.popleft()
+            waiters = self._waiters[job]
+            loop, future = waiters.popleft()
+            if waiters:
+                # Serve other jobs before the next request of this job
+                self._waiting_jobs.append(job)
+            else:
+                del self._waiters[job]
+
+            self._in_flight += 1
+            with self._shared_state() as state:
+                start = max(time.time(), state["next_start"], state["paused_until"])
+                state["next_start"] = start + 1 / self.rate
+            loop.call_soon_threadsafe(self._grant, future, start)
+
+    def _grant(self, future: asyncio.Future, start: float):
+        if future.done():
+            # The waiting request has been cancelled
+            self.release()
+        else:
+            future.set_result(start)
+
+    @contextmanager
+    def _shared_state(self) -> Iterator[dict[str, float]]:
+        if self.state_file is None:
+            state = {"next_start": self._next_start, "paused_until": self._shared_paused_until}
+            yield state
+            self._next_start = state["next_start"]
+            self._shared_paused_until = state["paused_until"]
+            return
+
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, "a+b") as f, _file_lock(f):
+            f.seek(0)
+            try:
+                next_start, paused_until = (float(v) for v in f.read().split())
+            except ValueError:
+                next_start, paused_until = 0.0, 0.0
+            state = {"next_start": next_start, "paused_until": paused_until}
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(f"{state['next_start']} {state['paused_until']}".encode())
+            f.flush()
+
+
+@contextmanager
+def _file_lock(f: IO[bytes]):
+    if sys.platform == "win32":
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+_shared_rate_limiters: dict[str | None, SharedRateLimiter] = {}
+_shared_rate_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(
+    max_at_once: int,
+    max_per_second: float,
+    state_file: str | Path | None = None,
+) -> SharedRateLimiter:
+    """Return the process-wide `SharedRateLimiter` for `state_file`.
+
+    The limiter is created by the first call. Later calls with the same
+    `state_file` return the same instance.
+    """
+    key = os.fspath(state_file) if state_file is not None else None
+    with _shared_rate_limiters_lock:
+        if (limiter := _shared_rate_limiters.get(key)) is None:
+            limiter = SharedRateLimiter(max_at_once, max_per_second, state_file=state_file)
+            _shared_rate_limiters[key] = limiter
+    return limiter
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse the `Retry-After` header (either seconds or an HTTP date) into seconds."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
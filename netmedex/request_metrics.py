@@ -0,0 +1,206 @@
+import json
+import math
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Literal
+
+import aiohttp
+
+from netmedex.types import T
+
+Endpoint = Literal["search", "cite", "export"]
+
+# Upper bounds (seconds) of the histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class Histogram:
+    """Count observations in buckets of increasing upper bounds.
+
+    Observations above the last bound are counted in an extra overflow bucket.
+    """
+
+    bounds: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float):
+        idx = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the `q`-quantile by the upper bound of the bucket containing it."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        n_observations = 0
+        for bound, n in zip(self.bounds, self.counts, strict=False):
+            n_observations += n
+            if n_observations >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts, strict=False)),
+        }
+
+
+@dataclass
+class EndpointMetrics:
+    """Requests sent to one endpoint of the PubTator3 API."""
+
+    requests: int = 0
+    """Number of requests sent, including retries"""
+    latency: Histogram = field(default_factory=Histogram)
+    """Seconds from sending a request to receiving the whole response"""
+    queue_time: Histogram = field(default_factory=Histogram)
+    """Seconds a request waited for the rate limiter before being sent"""
+    retries: dict[str, int] = field(default_factory=dict)
+    """Number of retries by status code (or error name if there is no response)"""
+    bytes_received: int = 0
+    """Size of the (decompressed) response bodies"""
+    decode_time: float = 0.0
+    """Seconds spent decoding the response bodies"""
+
+    def add_retry(self, reason: str):
+        self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def record(self, timing: Mapping[str, float], bytes_received: int):
+        """Record a request from its `time.perf_counter()` timestamps.
+
+        Args:
+            timing (Mapping[str, float]):
+                "start" when the request was issued, and if available, "sent" when it
+                left the rate limiter (see `timing_trace_config`), "received" when the
+                body was read, and "decoded" when the body was decoded.
+            bytes_received (int):
+                Size of the response body.
+        """
+        sent = timing.get("sent", timing["start"])
+        received = timing.get("received", time.perf_counter())
+        self.requests += 1
+        self.queue_time.observe(sent - timing["start"])
+        self.latency.observe(received - sent)
+        self.bytes_received += bytes_received
+        if "decoded" in timing:
+            self.decode_time += timing["decoded"] - received
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "latency": self.latency.to_dict(),
+            "queue_time": self.queue_time.to_dict(),
+            "retries": dict(self.retries),
+            "bytes_received": self.bytes_received,
+            "decode_time": self.decode_time,
+        }
+
+
+@dataclass
+class RequestMetrics:
+    """Telemetry of the requests sent by a `PubTatorAPI` run.
+
+    Available as `PubTatorAPI.metrics` and `metadata["metrics"]` of the result.
+    """
+
+    endpoints: dict[str, EndpointMetrics] = field(default_factory=dict)
+    """Metrics of each endpoint ("search", "cite", and "export")"""
+    batch_wait: Histogram = field(default_factory=Histogram)
+    """Seconds a job of `batch_request` or `stream_request` waited for a free slot before starting"""
+
+    def endpoint(self, name: Endpoint) -> EndpointMetrics:
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointMetrics()
+        return self.endpoints[name]
+
+    def time_jobs(
+        self,
+        jobs: Iterable[Callable[[], Awaitable[T]]],
+    ) -> list[Callable[[], Awaitable[T]]]:
+        """Wrap jobs submitted now to record how long each one waits before starting."""
+        submitted = time.perf_counter()
+        return [self.time_job(job, submitted) for job in jobs]
+
+    def time_job(
+        self,
+        job: Callable[[], Awaitable[T]],
+        submitted: float | None = None,
+    ) -> Callable[[], Awaitable[T]]:
+        """Wrap a job submitted at `submitted` (defaults to now) to record how long it waits."""
+        if submitted is None:
+            submitted = time.perf_counter()
+
+        async def run() -> T:
+            self.batch_wait.observe(time.perf_counter() - submitted)
+            return await job()
+
+        return run
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "endpoints": {name: metrics.to_dict() for name, metrics in self.endpoints.items()},
+            "batch_wait": self.batch_wait.to_dict(),
+        }
+
+    def save(self, savepath: str | Path):
+        with open(savepath, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# Metrics of the `PubTatorAPI` run sending requests in the current task
+current_metrics: ContextVar[RequestMetrics | None] = ContextVar("current_metrics", default=None)
+
+
+@contextmanager
+def record_metrics(metrics: RequestMetrics) -> Iterator[RequestMetrics]:
+    """Record the requests sent in this block in `metrics`."""
+    token = current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        current_metrics.reset(token)
+
+
+def timing_trace_config() -> aiohttp.TraceConfig:
+    """Create a trace config to record when requests are sent.
+
+    The time is stored as "sent" in the `trace_request_ctx` dict of a request.
+    Add it after the trace config of the rate limiter so that the time spent
+    waiting for the rate limiter is not counted as latency.
+    """
+
+    async def on_request_start(session, trace_config_ctx: SimpleNamespace, params):
+        if isinstance(timing := trace_config_ctx.trace_request_ctx, dict):
+            timing["sent"] = time.perf_counter()
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+
+    return trace_config
@@ -1,14 +1,30 @@
 import asyncio
+import copy
 import json
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from queue import Queue
 from typing import Any
 
 import pytest
 
+import netmedex.pubtator
 from netmedex.cli_utils import load_pmids
-from netmedex.exceptions import EmptyInput
-from netmedex.pubtator import PubTatorAPI
+from netmedex.exceptions import EmptyInput, NoArticles, RetryableError, UnsuccessfulRequest
+from netmedex.progress import ProgressEvent, ProgressStream
+from netmedex.pubtator import (
+    MAX_CONCURRENT_REQUESTS,
+    PubTatorAPI,
+    create_session,
+    merge_shard_results,
+)
+from netmedex.pubtator_archive import read_pubtator_archive
+from netmedex.pubtator_cache import PubTatorCache
+from netmedex.pubtator_coalescer import get_shared_coalescer
+from netmedex.pubtator_store import PubTatorStore
+from netmedex.rate_limiter import current_job
 
 
 @pytest.fixture(scope="module")
@@ -64,6 +80,37 @@ def stub_network(monkeypatch: pytest.MonkeyPatch, paths: dict[str, Path]):
     yield
 
 
+@pytest.fixture()
+def stub_export(monkeypatch: pytest.MonkeyPatch, paths: dict[str, Path]):
+    """Return one article per requested PMID and record the requested PMIDs."""
+    template = json.load(paths["json_abstract"].open())["PubTator3"][0]
+    requested: list[list[str]] = []
+
+    async def _fake_send_publication_request(
+        pmid_string: str,
+        article_id_type: str,
+        format: str,
+        full_text: bool,
+        session: Any,
+    ):
+        pmids = pmid_string.split(",")
+        requested.append(pmids)
+        articles = []
+        for pmid in pmids:
+            article = copy.deepcopy(template)
+            article["pmid"] = int(pmid)
+            articles.append(article)
+        return {"PubTator3": articles}
+
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_publication_request",
+        _fake_send_publication_request,
+        raising=True,
+    )
+
+    yield requested
+
+
 def test_empty_input():
     with pytest.raises(EmptyInput):
         PubTatorAPI(query="  ", return_pmid_only=True).run()
@@ -115,6 +162,561 @@ def test_batch_publication_queue(stub_network):
     assert progress == ["get/100/101", "get/101/101", "get/101/101", None]
 
 
+def test_progress_events(stub_export):
+    pmids = [str(i) for i in range(1, 102)]
+    events: list[ProgressEvent] = []
+
+    PubTatorAPI(pmid_list=pmids, progress=events.append).run()
+
+    assert [(e.stage, e.completed, e.total, e.done) for e in events] == [
+        ("get", 100, 101, False),
+        ("get", 101, 101, False),
+        ("get", 101, 101, True),
+    ]
+    assert events[-1].eta == 0
+
+
+def test_progress_stream(stub_export):
+    async def run():
+        stream = ProgressStream()
+        api = PubTatorAPI(pmid_list=[str(i) for i in range(1, 102)], progress=stream)
+        task = asyncio.create_task(api.arun())
+        events = [event async for event in stream.follow(task)]
+        return events, await task
+
+    events, collection = asyncio.run(run())
+
+    assert len(collection.articles) == 101
+    assert [event.completed for event in events] == [100, 101, 101]
+
+
+def test_cache_only_requests_missing_pmids(stub_export, tmp_path):
+    cache = PubTatorCache(tmp_path / "cache")
+
+    first = PubTatorAPI(pmid_list=["1", "2", "3"], cache=cache).run()
+    assert [article.pmid for article in first.articles] == [1, 2, 3]
+    assert stub_export == [["1", "2", "3"]]
+
+    second = PubTatorAPI(pmid_list=["2", "4", "3"], cache=cache).run()
+    assert [article.pmid for article in second.articles] == [2, 4, 3]
+    assert stub_export[-1] == ["4"]
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_store_only_requests_missing_pmids(stub_export, tmp_path):
+    store = PubTatorStore(tmp_path / "store.sqlite")
+    PubTatorAPI(pmid_list=["1", "2"], cache=store).run()
+
+    collection = PubTatorAPI(pmid_list=["3", "2", "1"], cache=store).run()
+    assert [article.pmid for article in collection.articles] == [3, 2, 1]
+    assert stub_export == [["1", "2"], ["3"]]
+    store.close()
+
+
+@pytest.fixture()
+def slow_export(monkeypatch: pytest.MonkeyPatch, stub_export: list[list[str]]):
+    """Keep export requests in flight for a while."""
+    send_publication_request = netmedex.pubtator.send_publication_request
+
+    async def _slow_send_publication_request(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return await send_publication_request(*args, **kwargs)
+
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_publication_request", _slow_send_publication_request
+    )
+
+    yield stub_export
+
+
+def test_coalesce_overlapping_requests(slow_export):
+    pmid_lists = [[str(i) for i in range(1, 151)], [str(i) for i in range(101, 251)]]
+    collections: dict[int, Any] = {}
+    n_coalesced = get_shared_coalescer().coalesced
+
+    def run(idx: int):
+        collections[idx] = PubTatorAPI(pmid_list=pmid_lists[idx]).run()
+
+    # Each thread runs its own event loop, like simultaneous searches in the web app
+    threads = [threading.Thread(target=run, args=(idx,)) for idx in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every PMID is requested once
+    assert get_shared_coalescer().coalesced - n_coalesced == 50
+    requested = [pmid for batch in slow_export for pmid in batch]
+    assert sorted(requested, key=int) == [str(i) for i in range(1, 251)]
+    for idx, pmid_list in enumerate(pmid_lists):
+        assert [str(article.pmid) for article in collections[idx].articles] == pmid_list
+
+
+def test_coalesce_after_failed_request(monkeypatch: pytest.MonkeyPatch, stub_export):
+    send_publication_request = netmedex.pubtator.send_publication_request
+    n_calls = 0
+
+    async def _fail_first_request(*args, **kwargs):
+        nonlocal n_calls
+        n_calls += 1
+        await asyncio.sleep(0.1)
+        if n_calls == 1:
+            raise UnsuccessfulRequest
+        return await send_publication_request(*args, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _fail_first_request)
+
+    async def run():
+        failing = PubTatorAPI(pmid_list=["1", "2"], split_failed_batches=False)
+        waiting = PubTatorAPI(pmid_list=["1", "2"])
+        return await asyncio.gather(failing.arun(), waiting.arun(), return_exceptions=True)
+
+    failed, collection = asyncio.run(run())
+
+    # The waiting request requests the PMIDs itself
+    assert isinstance(failed, UnsuccessfulRequest)
+    assert [article.pmid for article in collection.articles] == [1, 2]
+
+
+def test_archive_raw_articles(stub_export, tmp_path):
+    cache = PubTatorCache(tmp_path / "cache")
+    PubTatorAPI(pmid_list=["1"], cache=cache).run()
+
+    archive_path = tmp_path / "articles.jsonl.gz"
+    collection = PubTatorAPI(pmid_list=["2", "1", "3"], cache=cache, archive=archive_path).run()
+    archived = sorted(read_pubtator_archive(archive_path), key=lambda article: article.pmid)
+    assert archived == sorted(collection.articles, key=lambda article: article.pmid)
+
+    pmids = [str(i) for i in range(1, 150)]
+    streamed = list(PubTatorAPI(pmid_list=pmids, archive=archive_path).stream())
+    assert sorted(article.pmid for article in read_pubtator_archive(archive_path)) == sorted(
+        article.pmid for article in streamed
+    )
+
+
+def test_archive_keeps_full_documents(stub_export, monkeypatch: pytest.MonkeyPatch, tmp_path):
+    """Full-text articles are not pruned while decoding when they are archived."""
+    kept = []
+    send_publication_request = netmedex.pubtator.send_publication_request
+
+    async def _record_kept(**kwargs):
+        kept.append(netmedex.pubtator.full_documents_kept.get())
+        return await send_publication_request(**kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _record_kept)
+
+    PubTatorAPI(pmid_list=["1"], full_text=True, coalesce_requests=False).run()
+    PubTatorAPI(
+        pmid_list=["1"], full_text=True, archive=tmp_path / "a.jsonl.gz", coalesce_requests=False
+    ).run()
+    assert kept == [False, True]
+
+
+def test_archive_skips_cached_full_documents(stub_export, tmp_path):
+    """Cached full-text articles may be pruned, so they are requested again to be archived."""
+    cache = PubTatorCache(tmp_path / "cache")
+    PubTatorAPI(pmid_list=["1"], full_text=True, cache=cache).run()
+
+    archive_path = tmp_path / "articles.jsonl.gz"
+    PubTatorAPI(pmid_list=["1", "2"], full_text=True, cache=cache, archive=archive_path).run()
+    assert stub_export == [["1"], ["1", "2"]]
+    assert sorted(article.pmid for article in read_pubtator_archive(archive_path)) == [1, 2]
+
+    # Abstracts are never pruned
+    PubTatorAPI(pmid_list=["1"], cache=cache).run()
+    PubTatorAPI(pmid_list=["1", "2"], cache=cache, archive=archive_path).run()
+    assert stub_export[2:] == [["1"], ["2"]]
+
+
+def test_stream_yields_every_article(stub_export):
+    pmids = [str(i) for i in range(1, 252)]
+    articles = list(PubTatorAPI(pmid_list=pmids).stream())
+
+    assert sorted(article.pmid for article in articles) == list(range(1, 252))
+    assert len(stub_export) == 3
+
+
+def test_astream_with_cache(stub_export, tmp_path):
+    cache = PubTatorCache(tmp_path / "cache")
+    PubTatorAPI(pmid_list=["1", "2"], cache=cache).run()
+
+    async def collect():
+        api = PubTatorAPI(pmid_list=["1", "2", "3"], cache=cache)
+        return [article.pmid async for article in api.astream()]
+
+    assert asyncio.run(collect()) == [1, 2, 3]
+    assert stub_export[-1] == ["3"]
+
+
+def test_astream_rejects_return_pmid_only_before_requesting(monkeypatch: pytest.MonkeyPatch):
+    async def _unexpected_request(*args, **kwargs):
+        raise AssertionError("No request should be sent")
+
+    monkeypatch.setattr("netmedex.pubtator.send_search_query", _unexpected_request)
+    monkeypatch.setattr("netmedex.pubtator.send_cite_query", _unexpected_request)
+
+    async def collect():
+        api = PubTatorAPI(query="foo", return_pmid_only=True)
+        return [article async for article in api.astream()]
+
+    with pytest.raises(ValueError, match="return_pmid_only"):
+        asyncio.run(collect())
+
+
+def test_astream_sets_current_job(stub_export, monkeypatch: pytest.MonkeyPatch):
+    send_publication_request = netmedex.pubtator.send_publication_request
+    jobs = []
+
+    async def _record_job(*args, **kwargs):
+        jobs.append(current_job.get())
+        return await send_publication_request(*args, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _record_job)
+    api = PubTatorAPI(pmid_list=["1", "2"], coalesce_requests=False)
+
+    async def collect():
+        articles = [article async for article in api.astream()]
+        return articles, current_job.get()
+
+    articles, job_after_stream = asyncio.run(collect())
+    assert len(articles) == 2
+    assert jobs == [api._job_id]
+    assert job_after_stream is None
+
+
+def test_stream_keeps_one_context(stub_export, monkeypatch: pytest.MonkeyPatch):
+    send_publication_request = netmedex.pubtator.send_publication_request
+    jobs = []
+
+    async def _record_job(*args, **kwargs):
+        jobs.append(current_job.get())
+        return await send_publication_request(*args, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _record_job)
+    api = PubTatorAPI(pmid_list=[str(i) for i in range(1, 502)], coalesce_requests=False)
+
+    # Later batches are requested in later steps of the stream
+    articles = list(api.stream())
+    assert len(articles) == 501
+    assert jobs == [api._job_id] * 6
+    assert current_job.get() is None
+
+    # Closing the stream early resets the job in the same context
+    stream = api.stream()
+    next(stream)
+    stream.close()
+
+
+@pytest.fixture()
+def stub_search(monkeypatch: pytest.MonkeyPatch):
+    """Search results of 250 PMIDs ("1" to "250") with 10 PMIDs per page."""
+    page_size = 10
+
+    def _page(page: int):
+        start = (page - 1) * page_size + 1
+        pmids = range(start, min(start + page_size, 251))
+        return {
+            "count": 250,
+            "page_size": page_size,
+            "results": [{"pmid": pmid} for pmid in pmids],
+        }
+
+    async def _fake_send_search_query(query: str, session: Any):
+        return _page(1)
+
+    async def _fake_send_search_query_with_page(query: str, page: int, sort: str, session: Any):
+        return _page(page)
+
+    monkeypatch.setattr("netmedex.pubtator.send_search_query", _fake_send_search_query)
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_search_query_with_page", _fake_send_search_query_with_page
+    )
+
+
+def test_resume_from_checkpoint(stub_export, monkeypatch: pytest.MonkeyPatch, tmp_path):
+    pmids = [str(i) for i in range(1, 251)]
+    send_publication_request = netmedex.pubtator.send_publication_request
+
+    async def _fail_last_batch(pmid_string: str, **kwargs):
+        if pmid_string.startswith("201,"):
+            raise UnsuccessfulRequest
+        return await send_publication_request(pmid_string=pmid_string, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _fail_last_batch)
+    with pytest.raises(UnsuccessfulRequest):
+        PubTatorAPI(pmid_list=pmids, checkpoint_dir=tmp_path, split_failed_batches=False).run()
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", send_publication_request)
+    collection = PubTatorAPI(pmid_list=pmids, checkpoint_dir=tmp_path).run()
+
+    assert [str(article.pmid) for article in collection.articles] == pmids
+    assert stub_export[-1] == pmids[200:]
+    # Completed batches are not requested again
+    assert sum(len(batch) for batch in stub_export) == 250
+    # The journal is removed after success
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_split_failed_batches(stub_export, monkeypatch: pytest.MonkeyPatch):
+    pmids = [str(i) for i in range(1, 101)]
+    send_publication_request = netmedex.pubtator.send_publication_request
+
+    async def _fail_pmid_13(pmid_string: str, **kwargs):
+        if "13" in pmid_string.split(","):
+            raise RetryableError("Possibly too many articles.")
+        return await send_publication_request(pmid_string=pmid_string, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _fail_pmid_13)
+    collection = PubTatorAPI(pmid_list=pmids).run()
+
+    assert [str(article.pmid) for article in collection.articles] == pmids[:12] + pmids[13:]
+    assert collection.metadata["failed_pmids"] == {"13": "Possibly too many articles."}
+
+    with pytest.raises(RetryableError):
+        PubTatorAPI(pmid_list=pmids, split_failed_batches=False).run()
+
+
+@pytest.fixture()
+def stub_date_search(monkeypatch: pytest.MonkeyPatch):
+    """Search results of 300 PMIDs published from 1990 to 2019 with 10 PMIDs per page.
+
+    PMID `i` is published in `1990 + i % 30` with score `i`. Record the searched queries.
+    """
+    page_size = 10
+    searched: list[str] = []
+    articles = [
+        {"pmid": pmid, "year": 1990 + pmid % 30, "score": float(pmid)} for pmid in range(1, 301)
+    ]
+
+    def _page(query: str, page: int, sort: str = "score"):
+        searched.append(query)
+        results = articles
+        if (match := re.fullmatch(r"\((.*)\) AND (\d+):(\d+)\[dp\]", query)) is not None:
+            start, end = int(match.group(2)), int(match.group(3))
+            results = [article for article in articles if start <= article["year"] <= end]
+        key = "score" if sort == "score" else "year"
+        results = sorted(
+            results, key=lambda article: (article[key], article["pmid"]), reverse=True
+        )
+        return {
+            "count": len(results),
+            "page_size": page_size,
+            "results": results[(page - 1) * page_size : page * page_size],
+        }
+
+    async def _fake_send_search_query(query: str, session: Any):
+        return _page(query, 1)
+
+    async def _fake_send_search_query_with_page(query: str, page: int, sort: str, session: Any):
+        return _page(query, page, sort)
+
+    monkeypatch.setattr("netmedex.pubtator.send_search_query", _fake_send_search_query)
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_search_query_with_page", _fake_send_search_query_with_page
+    )
+    monkeypatch.setattr("netmedex.pubtator.MAX_SHARD_ARTICLES", 40)
+
+    yield searched, articles
+
+
+@pytest.mark.parametrize("sort", ["date", "score"])
+def test_shard_query_by_date(stub_date_search, sort):
+    searched, articles = stub_date_search
+    key = "score" if sort == "score" else "year"
+    ranked = sorted(articles, key=lambda article: (article[key], article["pmid"]), reverse=True)
+
+    collection = PubTatorAPI(
+        query="foo", sort=sort, max_articles=100, return_pmid_only=True, shard_by_date=True
+    ).run()
+
+    assert collection.metadata["pmid_list"] == [str(article["pmid"]) for article in ranked[:100]]
+    if sort == "date":
+        # Older shards beyond the requested articles are not paged through
+        assert not any("1990:" in query for query in searched[-10:])
+
+
+def test_shard_small_query(stub_date_search, monkeypatch: pytest.MonkeyPatch):
+    searched, _ = stub_date_search
+    monkeypatch.setattr("netmedex.pubtator.MAX_SHARD_ARTICLES", 300)
+
+    collection = PubTatorAPI(
+        query="foo", max_articles=20, return_pmid_only=True, shard_by_date=True
+    ).run()
+
+    assert collection.metadata["pmid_list"] == [
+        "300",
+        "299",
+        *[str(i) for i in range(298, 280, -1)],
+    ]
+    assert searched == ["foo", "foo"]
+
+
+def test_merge_shard_results():
+    newer = [{"pmid": 3, "score": 1.0}, {"pmid": 1, "score": 0.5}]
+    older = [{"pmid": 2, "score": 2.0}, {"pmid": 1, "score": 0.5}]
+
+    assert merge_shard_results([newer, older], "date") == ["3", "1", "2"]
+    assert merge_shard_results([newer, older], "score") == ["2", "3", "1"]
+
+
+def test_refresh_stops_at_known_pmid(stub_search, stub_export):
+    collection = PubTatorAPI(
+        query="foo", sort="score", refresh=True, known_pmids=[25, 26, 27]
+    ).run()
+
+    # Paging stops at the third page, which contains the known PMIDs
+    new_pmids = [str(i) for i in [*range(1, 25), 28, 29, 30]]
+    assert collection.metadata["pmid_list"] == new_pmids
+    assert [pmid for batch in stub_export for pmid in batch] == new_pmids
+
+
+def test_refresh_progress_counts_new_pmids(stub_search, stub_export):
+    events: list[ProgressEvent] = []
+    PubTatorAPI(
+        query="foo", sort="score", refresh=True, known_pmids=[25, 26, 27], progress=events.append
+    ).run()
+
+    search_events = [event for event in events if event.stage == "search"]
+    assert [event.completed for event in search_events if not event.done] == [10, 20, 27]
+    assert (search_events[-1].completed, search_events[-1].total) == (27, 27)
+
+
+def test_refresh_with_store(stub_search, stub_export, tmp_path):
+    store = PubTatorStore(tmp_path / "store.sqlite")
+    PubTatorAPI(pmid_list=[str(i) for i in range(11, 21)], cache=store).run()
+
+    collection = PubTatorAPI(query="foo", refresh=True, cache=store).run()
+    assert collection.metadata["pmid_list"] == [str(i) for i in range(1, 11)]
+    # New articles are added to the store, so nothing is new in the next refresh
+    with pytest.raises(NoArticles):
+        PubTatorAPI(query="foo", refresh=True, cache=store).run()
+    store.close()
+
+
+def test_one_session_per_run(stub_search, monkeypatch: pytest.MonkeyPatch):
+    sessions = []
+
+    async def _fake_send_publication_request(pmid_string: str, session: Any, **kwargs):
+        sessions.append(session)
+        return {"PubTator3": []}
+
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_publication_request", _fake_send_publication_request
+    )
+    PubTatorAPI(query="foo", max_articles=250).run()
+
+    assert len(sessions) == 3
+    assert len(set(sessions)) == 1
+    assert sessions[0].closed
+
+
+def test_inject_session(monkeypatch: pytest.MonkeyPatch):
+    sessions = []
+
+    async def _fake_send_publication_request(pmid_string: str, session: Any, **kwargs):
+        sessions.append(session)
+        return {"PubTator3": []}
+
+    monkeypatch.setattr(
+        "netmedex.pubtator.send_publication_request", _fake_send_publication_request
+    )
+
+    async def run():
+        async with create_session() as session:
+            for pmid in ("1", "2"):
+                await PubTatorAPI(pmid_list=[pmid], session=session).arun()
+            assert not session.closed
+            return session
+
+    session = asyncio.run(run())
+    assert sessions == [session, session]
+
+
+def test_pipelined_search(stub_search, stub_export):
+    collection = PubTatorAPI(query="foo", max_articles=205, pipeline=True).run()
+
+    expected = [str(i) for i in range(1, 206)]
+    assert collection.metadata["pmid_list"] == expected
+    assert [str(article.pmid) for article in collection.articles] == expected
+    assert sorted(len(batch) for batch in stub_export) == [5, 100, 100]
+    # Export batches are sent through `stream_request` and timed
+    assert collection.metadata["metrics"].batch_wait.count == 3
+
+
+def test_pipelined_search_leaves_a_slot_for_exports(
+    stub_search, stub_export, monkeypatch: pytest.MonkeyPatch
+):
+    send_search_query_with_page = netmedex.pubtator.send_search_query_with_page
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _slow_search(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await send_search_query_with_page(*args, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_search_query_with_page", _slow_search)
+    PubTatorAPI(query="foo", max_articles=205, pipeline=True).run()
+
+    assert max_in_flight == MAX_CONCURRENT_REQUESTS - 1
+
+
+def test_resume_pipelined_search(
+    stub_search, stub_export, monkeypatch: pytest.MonkeyPatch, tmp_path
+):
+    send_publication_request = netmedex.pubtator.send_publication_request
+
+    async def _fail_last_batch(pmid_string: str, **kwargs):
+        if pmid_string.startswith("201,"):
+            raise UnsuccessfulRequest
+        return await send_publication_request(pmid_string=pmid_string, **kwargs)
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", _fail_last_batch)
+    with pytest.raises(UnsuccessfulRequest):
+        PubTatorAPI(
+            query="foo",
+            max_articles=205,
+            pipeline=True,
+            checkpoint_dir=tmp_path,
+            split_failed_batches=False,
+        ).run()
+
+    async def _no_search(*args, **kwargs):
+        raise AssertionError("Searched again")
+
+    monkeypatch.setattr("netmedex.pubtator.send_publication_request", send_publication_request)
+    monkeypatch.setattr("netmedex.pubtator.send_search_query", _no_search)
+    monkeypatch.setattr("netmedex.pubtator.send_search_query_with_page", _no_search)
+    collection = PubTatorAPI(
+        query="foo", max_articles=205, pipeline=True, checkpoint_dir=tmp_path
+    ).run()
+
+    expected = [str(i) for i in range(1, 206)]
+    assert collection.metadata["pmid_list"] == expected
+    assert [str(article.pmid) for article in collection.articles] == expected
+    # Only the failed batch is requested again
+    assert stub_export[-1] == expected[200:]
+    assert sum(len(batch) for batch in stub_export) == 205
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("executor_cls", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_parse_in_executor(stub_export, executor_cls):
+    pmids = [str(i) for i in range(251, 0, -1)]
+    expected = PubTatorAPI(pmid_list=pmids).run()
+
+    with executor_cls(max_workers=2) as executor:
+        collection = PubTatorAPI(pmid_list=pmids, parse_executor=executor).run()
+        streamed = list(PubTatorAPI(pmid_list=pmids, parse_executor=executor).stream())
+
+    assert [article.pmid for article in collection.articles] == list(range(251, 0, -1))
+    assert collection.articles == expected.articles
+    assert sorted(article.pmid for article in streamed) == list(range(1, 252))
+
+
 def test_load_pmids_file(paths):
     assert load_pmids(paths["pmids"], load_from="file") == [
         "34205807",
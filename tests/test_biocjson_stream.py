@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.biocjson_stream import BioCJSONStreamDecoder
+
+
+def decode(body: bytes, chunk_size: int):
+    decoder = BioCJSONStreamDecoder()
+    for start in range(0, len(body), chunk_size):
+        decoder.feed(body[start : start + chunk_size])
+    return decoder.close()
+
+
+@pytest.mark.parametrize(
+    "filename", ["22439397_abstract_240916.json", "22429397_full_240916.json"]
+)
+@pytest.mark.parametrize("chunk_size", [7, 65536])
+def test_same_articles(data_dir, filename, chunk_size):
+    data = json.load(open(data_dir / filename))
+    # Several documents with non-ASCII characters split across chunks
+    data["PubTator3"] = data["PubTator3"] * 3
+    data["PubTator3"][1]["passages"][0]["text"] += " α-β"
+    body = json.dumps(data, ensure_ascii=False).encode()
+
+    res_json = decode(body, chunk_size)
+
+    assert len(res_json["PubTator3"]) == 3
+    for full_text in (False, True):
+        assert biocjson_to_pubtator(res_json, full_text) == biocjson_to_pubtator(data, full_text)
+
+
+def test_prune_body_passages(data_dir):
+    data = json.load(open(data_dir / "22429397_full_240916.json"))
+
+    (document,) = decode(json.dumps(data).encode(), 65536)["PubTator3"]
+
+    for passage in document["passages"]:
+        if passage["infons"]["section_type"] in ("TITLE", "ABSTRACT"):
+            assert passage["text"]
+        else:
+            assert passage["text"] == ""
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"",
+        b"<html>Service Unavailable</html>",
+        b'{"PubTator3": [{"pmid": 1}',
+        b'{"PubTator3": [1]}',
+        b'{"PubTator3": []} {}',
+    ],
+)
+def test_invalid_response(body):
+    with pytest.raises(ValueError):
+        decode(body, 4)
+
+
+def test_other_keys():
+    body = b'{"foo": {"PubTator3": [{"pmid": 1}], "bar": "]"}, "PubTator3": []}'
+    assert decode(body, 3) == {"PubTator3": []}
@@ -1,12 +1,18 @@
+import copy
 import logging
+import subprocess
+import sys
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest import mock
 
 import pytest
 
-from netmedex.cli import main
-from netmedex.graph import PubTatorGraphBuilder
+from netmedex.cli import main, parse_args
+from netmedex.compressed_io import open_compressed
+from netmedex.config import DEFAULT_CHECKPOINT_DIR
+from netmedex.graph import PubTatorGraphBuilder, load_graph
+from netmedex.pubtator_data import PubTatorCollection
 from netmedex.pubtator_parser import PubTatorIO
 
 logging.basicConfig(level=logging.DEBUG)
@@ -204,7 +210,7 @@ def test_pubtator_api_main(args, expected, monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr("sys.argv", args)
     with (
         mock.patch("netmedex.pubtator.PubTatorAPI") as mock_pipeline,
-        mock.patch("netmedex.cli.open", mock.mock_open()) as mocked_open,
+        mock.patch("netmedex.compressed_io.open_compressed", mock.mock_open()) as mocked_open,
     ):
         main()
         mock_pipeline.assert_called_once_with(
@@ -215,10 +221,59 @@ def test_pubtator_api_main(args, expected, monkeypatch: pytest.MonkeyPatch):
             max_articles=expected["max_articles"],
             full_text=expected["full_text"],
             queue=expected["queue"],
+            checkpoint_dir=None,
+            cache=None,
+            progress=mock.ANY,
+            archive=None,
+            shard_by_date=False,
+            refresh=False,
+            known_pmids=None,
         )
         mocked_open.assert_called_once_with(expected["savepath"], "w")
 
 
+@pytest.mark.parametrize(
+    "args,expected",
+    [
+        ([], None),
+        (["--checkpoint_dir"], str(DEFAULT_CHECKPOINT_DIR)),
+        (["--checkpoint_dir", "foo"], "foo"),
+    ],
+)
+def test_search_checkpoint_dir(args, expected):
+    assert parse_args(["search", "-q", "foo", *args]).checkpoint_dir == expected
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+def test_search_refresh_appends_new_articles(
+    suffix, paths, tmp_path, monkeypatch: pytest.MonkeyPatch
+):
+    savepath = tmp_path / f"query_foo.pubtator{suffix}"
+    with open_compressed(savepath, "w") as f:
+        f.write(paths["simple"].read_text())
+    previous = PubTatorIO.parse(savepath)
+    new_article = copy.deepcopy(previous.articles[0])
+    new_article.pmid = "99999999"
+
+    monkeypatch.setattr(
+        "sys.argv", ["netmedex", "search", "-q", "foo", "-o", str(savepath), "--refresh"]
+    )
+    with mock.patch("netmedex.pubtator.PubTatorAPI") as mock_api:
+        mock_api.return_value.run.return_value = PubTatorCollection([], [new_article])
+        main()
+
+    assert mock_api.call_args.kwargs["refresh"] is True
+    assert mock_api.call_args.kwargs["known_pmids"] == [
+        article.pmid for article in previous.articles
+    ]
+    refreshed = PubTatorIO.parse(savepath)
+    assert refreshed.headers == previous.headers
+    assert [article.pmid for article in refreshed.articles] == [
+        *(article.pmid for article in previous.articles),
+        "99999999",
+    ]
+
+
 @pytest.mark.parametrize(
     "args",
     [
@@ -248,6 +303,34 @@ def test_pubtator3_api_exit(args, monkeypatch: pytest.MonkeyPatch):
             mock_logger.info.assert_called_once()
 
 
+def test_network_of_pmids(paths, tmp_path, monkeypatch: pytest.MonkeyPatch):
+    input_path = tmp_path / "articles.pubtator"
+    input_path.write_text(paths["simple"].read_text())
+    savepath = tmp_path / "network.pickle"
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "netmedex",
+            "network",
+            "-i",
+            str(input_path),
+            "-o",
+            str(savepath),
+            "-f",
+            "pickle",
+            "-w",
+            "0",
+            "--pmids",
+            "34205807",
+        ],
+    )
+    main()
+
+    G = load_graph(savepath)
+    assert list(G.graph["pmid_title"]) == ["34205807"]
+    assert (tmp_path / "articles.pubtator.idx").exists()
+
+
 @pytest.mark.parametrize(
     "args",
     [
@@ -272,3 +355,10 @@ def test_network_cli(args, paths, tempdir, network_cli_args):
         community=input_args["community"],
         max_edges=input_args["max_edges"],
     )
+
+
+def test_cli_imports_lazily():
+    # Shell completion imports the CLI module on every key press
+    code = "import sys, netmedex.cli; print('netmedex.pubtator_store' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+from netmedex.compressed_io import decompress, detect_compression, get_compression, open_compressed
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        ("articles.pubtator", None),
+        ("articles.pubtator.gz", "gzip"),
+        ("articles.pubtator.GZ", "gzip"),
+        ("articles.pubtator.zst", "zstd"),
+    ],
+)
+def test_get_compression(filename, expected):
+    assert get_compression(filename) == expected
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".zst"])
+def test_write_append_and_read(suffix, tmp_path):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    filepath = tmp_path / f"articles.pubtator{suffix}"
+
+    with open_compressed(filepath, "w") as f:
+        f.write("1|t|Título\n")
+    # Appended data is a new gzip member or zstd frame
+    with open_compressed(filepath, "a") as f:
+        f.write("2|t|Title\n")
+
+    with open_compressed(filepath) as f:
+        assert f.readlines() == ["1|t|Título\n", "2|t|Title\n"]
+    with open_compressed(filepath, "rb") as f:
+        assert f.readline() == "1|t|Título\n".encode()
+        assert f.read() == b"2|t|Title\n"
+
+
+def test_zstd_not_installed(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="zstandard"):
+        open_compressed(tmp_path / "articles.pubtator.zst", "w")
+
+
+@pytest.mark.parametrize("suffix,expected", [("", None), (".gz", "gzip"), (".zst", "zstd")])
+def test_decompress(suffix, expected, tmp_path):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    filepath = tmp_path / f"articles.pubtator{suffix}"
+    with open_compressed(filepath, "w") as f:
+        f.write("1|t|Título\n")
+    with open_compressed(filepath, "a") as f:
+        f.write("2|t|Title\n")
+
+    data = filepath.read_bytes()
+    assert detect_compression(data) == expected
+    assert decompress(data) == "1|t|Título\n2|t|Title\n".encode()
@@ -100,3 +100,15 @@ def test_edge_pmid_list(paths):
     expected = {"34205807", "34895069", "35883435"}
 
     assert pmid_set == expected
+
+
+@pytest.mark.parametrize("filename", ["simple", "mesh_collision"])
+def test_add_streamed_articles(paths, filename):
+    builder = PubTatorGraphBuilder(node_type="all")
+    builder.add_collection(PubTatorIO.iter_articles(paths[filename]))
+    G = builder.build(edge_weight_cutoff=0, community=False)
+    expected = _build_graph(paths[filename])
+
+    assert builder.num_articles == len(_load_collection(paths[filename]).articles)
+    assert dict(G.nodes(data="pmids")) == dict(expected.nodes(data="pmids"))
+    assert set(G.edges) == set(expected.edges)
@@ -1,8 +1,17 @@
 import io
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from netmedex.pubtator_parser import HEADER_SYMBOL, PubTatorIO
+from netmedex import pubtator_bytes_parser
+from netmedex.compressed_io import open_compressed
+from netmedex.pubtator_bytes_parser import (
+    find_article_boundaries,
+    is_title_line,
+    iter_line_chunks,
+    iter_parallel_articles,
+)
+from netmedex.pubtator_parser import HEADER_SYMBOL, PubTatorIO, PubTatorIterator
 
 
 @pytest.mark.parametrize(
@@ -26,3 +35,143 @@ def test_parse_header(data, expected):
 def test_parse_header_invalid(data, non_expected):
     header_result = PubTatorIO._parse_header(io.StringIO(data))
     assert non_expected not in header_result.headers
+
+
+def test_read_pmids(tmp_path):
+    filepath = tmp_path / "articles.pubtator"
+    filepath.write_text(
+        f"{HEADER_SYMBOL}USE-MESH-VOCABULARY\n"
+        "1|t|Title A\n1|a|Abstract A\n1\t0\t5\tTitle\tGene\t123\n\n"
+        "2|t|Title B\n2|a|Abstract B\n"
+    )
+
+    assert PubTatorIO.read_pmids(filepath) == ["1", "2"]
+    assert PubTatorIO.read_headers(filepath) == ["USE-MESH-VOCABULARY"]
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        "22429397_full_240916.pubtator",
+        "6_nodes_3_clusters_mesh.pubtator",
+        "mesh_collision.pubtator",
+        "variant_relation_extraction.pubtator",
+    ],
+)
+def test_bytes_engine_matches_python_engine(data_dir, filename):
+    filepath = data_dir / filename
+    assert PubTatorIO.parse(filepath, engine="bytes") == PubTatorIO.parse(filepath)
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_bytes_engine_edge_cases(tmp_path, newline):
+    lines = [
+        f"{HEADER_SYMBOL}USE-MESH-VOCABULARY",
+        "not an article",
+        "1|t|Title without abstract",
+        "1\t0\t5\tTitle\tGene\t123",
+        "1\tAssociation\tMESH:D1\t123;456",
+        "",
+        "2|t|Title|with|pipes",
+        "",
+        "2|a|Abstract after a blank line",
+        "2\t0\t5\tTitle\tGene\ttmVar:p|SUB|V|158|M",
+        "3|t|Last article",
+    ]
+    filepath = tmp_path / "articles.pubtator"
+    filepath.write_bytes(newline.join(lines).encode())
+
+    collection = PubTatorIO.parse(filepath, engine="bytes")
+    assert collection.headers == ["USE-MESH-VOCABULARY"]
+    assert [article.pmid for article in collection.articles] == ["1", "2", "3"]
+    assert collection.articles[0].abstract is None
+    assert collection.articles[0].relations[0].mesh2 == "123"
+    assert collection.articles[1].title == "Title|with|pipes"
+    assert collection.articles[1].abstract == "Abstract after a blank line"
+    assert collection.articles[1].annotations[0].mesh == "tmVar:p|SUB|V|158|M"
+
+
+@pytest.mark.parametrize("engine", ["python", "bytes"])
+def test_iter_articles(data_dir, engine):
+    filepath = data_dir / "6_nodes_3_clusters_mesh.pubtator"
+    expected = PubTatorIO.parse(filepath)
+
+    articles = PubTatorIO.iter_articles(filepath, engine=engine)
+    assert articles.headers == expected.headers
+    assert next(iter(articles)) == expected.articles[0]
+    # Every iteration starts from the first article
+    assert list(articles) == expected.articles
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_parse_compressed_file(data_dir, tmp_path, suffix):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    source = data_dir / "6_nodes_3_clusters_mesh.pubtator"
+    expected = PubTatorIO.parse(source)
+    filepath = tmp_path / f"articles.pubtator{suffix}"
+    with open_compressed(filepath, "w") as f:
+        f.write(source.read_text())
+
+    assert PubTatorIO.parse(filepath) == expected
+    assert PubTatorIO.parse(filepath, engine="bytes") == expected
+    assert PubTatorIO.parse(filepath, workers=2) == expected
+    assert PubTatorIO.read_pmids(filepath) == [article.pmid for article in expected.articles]
+    assert list(PubTatorIterator(filepath)) == expected.articles
+
+
+def test_iter_line_chunks(tmp_path):
+    filepath = tmp_path / "lines.txt"
+    filepath.write_bytes(b"a\nbb\nccc\nlast")
+
+    with open(filepath, "rb") as stream:
+        chunks = list(iter_line_chunks(stream, chunk_size=3))
+    assert b"".join(chunks) == b"a\nbb\nccc\nlast"
+    assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+
+    with open(filepath, "rb") as stream:
+        stream.seek(2)
+        assert b"".join(iter_line_chunks(stream, chunk_size=3, end=9)) == b"bb\nccc\n"
+
+
+@pytest.fixture
+def large_file(data_dir, tmp_path, monkeypatch: pytest.MonkeyPatch):
+    # Split small files into several ranges
+    monkeypatch.setattr(pubtator_bytes_parser, "MIN_PART_SIZE", 2**10)
+    filepath = tmp_path / "large.pubtator"
+    filepath.write_text((data_dir / "6_nodes_3_clusters_mesh.pubtator").read_text() * 20)
+    return filepath
+
+
+def test_find_article_boundaries(large_file):
+    size = large_file.stat().st_size
+    with open(large_file, "rb") as stream:
+        start = pubtator_bytes_parser.skip_headers(stream)
+        boundaries = find_article_boundaries(stream, start, size, 8)
+        assert boundaries[0] == start
+        assert boundaries[-1] == size
+        assert boundaries == sorted(set(boundaries))
+        assert len(boundaries) > 2
+        for offset in boundaries[1:-1]:
+            stream.seek(offset)
+            assert is_title_line(stream.readline())
+
+
+def test_parallel_parse_matches_python_engine(large_file):
+    expected = PubTatorIO.parse(large_file)
+    assert PubTatorIO.parse(large_file, workers=2) == expected
+    assert list(PubTatorIO.iter_articles(large_file, workers=2)) == expected.articles
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        articles = list(iter_parallel_articles(large_file, workers=3, executor=executor))
+    assert articles == expected.articles
+
+
+def test_write_pubtator(data_dir):
+    collection = PubTatorIO.parse(data_dir / "6_nodes_3_clusters_mesh.pubtator")
+    for use_mesh in (True, False):
+        stream = io.StringIO()
+        collection.write_pubtator(stream, annotation_use_identifier_name=use_mesh)
+        assert stream.getvalue() == collection.to_pubtator_str(
+            annotation_use_identifier_name=use_mesh
+        )
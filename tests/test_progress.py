@@ -0,0 +1,45 @@
+from netmedex.progress import ProgressEvent, ProgressTracker, TqdmProgress
+
+
+def test_tracker():
+    events: list[ProgressEvent] = []
+    tracker = ProgressTracker("get", total=10, callback=events.append)
+
+    tracker.update(4)
+    tracker.add_bytes(100)
+    tracker.add_retry()
+    tracker.update(20)
+    tracker.finish()
+
+    assert [(e.completed, e.retries, e.done) for e in events] == [
+        (4, 0, False),
+        (4, 1, False),
+        (10, 1, False),
+        (10, 1, True),
+    ]
+    assert events[-1].bytes_received == 100
+    assert events[-1].eta == 0
+
+
+def test_event_eta():
+    event = ProgressEvent(
+        stage="get", completed=25, total=100, elapsed=5.0, bytes_received=0, retries=0
+    )
+    assert event.throughput == 5.0
+    assert event.eta == 15.0
+
+    not_started = ProgressEvent(
+        stage="search", completed=0, total=100, elapsed=0.0, bytes_received=0, retries=0
+    )
+    assert not_started.eta is None
+
+
+def test_tqdm_progress(capsys):
+    progress = TqdmProgress()
+    tracker = ProgressTracker("get", total=3, callback=progress)
+    tracker.update(1)
+    assert "get" in progress._pbars
+    tracker.finish()
+
+    assert progress._pbars == {}
+    assert "3/3" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+import json
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.pubtator_archive import (
+    PubTatorArchive,
+    iter_archive_records,
+    read_pubtator_archive,
+)
+from netmedex.pubtator_parser import PubTatorIO
+
+
+def test_round_trip_biocjson(data_dir, tmp_path):
+    res_json = json.load((data_dir / "22429397_full_240916.json").open())
+    archive = PubTatorArchive(tmp_path / "articles.jsonl.gz")
+    with archive:
+        archive.write({"22429397": res_json["PubTator3"][0]}, "biocjson", True)
+    assert archive.num_articles == 1
+
+    records = list(iter_archive_records(archive.path))
+    assert records[0]["pmid"] == "22429397"
+    assert records[0]["article"] == res_json["PubTator3"][0]
+
+    for full_text in (True, False):
+        expected = biocjson_to_pubtator(res_json, full_text=full_text)
+        articles = list(read_pubtator_archive(archive.path, full_text=full_text))
+        assert articles == expected
+
+
+def test_round_trip_pubtator(data_dir, tmp_path):
+    pubtator_path = data_dir / "22429397_abstract_240916.pubtator"
+    expected = PubTatorIO.parse(pubtator_path).articles
+    with PubTatorArchive(tmp_path / "articles.jsonl.gz") as archive:
+        archive.write({"22429397": pubtator_path.read_text()}, "pubtator", False)
+
+    articles = list(read_pubtator_archive(tmp_path / "articles.jsonl.gz"))
+    assert articles == expected
+
+
+def test_filter_pmids(data_dir, tmp_path):
+    document = json.load((data_dir / "22439397_abstract_240916.json").open())["PubTator3"][0]
+    with PubTatorArchive(tmp_path / "articles.jsonl.gz") as archive:
+        for pmid in ("1", "2", "3"):
+            archive.write({pmid: {**document, "pmid": int(pmid)}}, "biocjson", False)
+
+    articles = read_pubtator_archive(tmp_path / "articles.jsonl.gz", pmids=[3, "1"])
+    assert [article.pmid for article in articles] == [1, 3]
@@ -0,0 +1,156 @@
+import gzip
+import json
+import tarfile
+import xml.etree.ElementTree as ET
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.graph import PubTatorGraphBuilder
+from netmedex.pubtator_dump import guess_dump_format, read_pubtator_dump
+
+BIOCONCEPTS = (
+    "100\tGene\t7431\tvimentin|VIM\tGNorm2\n"
+    "100\tDisease\tMESH:D001943\tbreast cancer\tTaggerOne\n"
+    "200\tChemical\t\tD609\tTaggerOne\n"
+    "300\tGene\t6611\tSMS\tGNorm2\n"
+    "300\tChemical\tMESH:C046498\tD609\tTaggerOne\n"
+)
+
+
+@pytest.fixture(scope="module")
+def biocjson(data_dir: Path):
+    return json.load((data_dir / "22439397_abstract_240916.json").open())
+
+
+def biocjson_to_biocxml(biocjson) -> bytes:
+    """Write the documents of a BioC-JSON response in BioC XML like the PubTator3 dumps."""
+
+    def add_infons(parent, infons):
+        for key, value in infons.items():
+            if isinstance(value, str):
+                ET.SubElement(parent, "infon", key=key).text = value
+
+    collection = ET.Element("collection")
+    for document in biocjson["PubTator3"]:
+        doc = ET.SubElement(collection, "document")
+        ET.SubElement(doc, "id").text = str(document["pmid"])
+        for passage in document["passages"]:
+            psg = ET.SubElement(doc, "passage")
+            add_infons(psg, passage["infons"])
+            ET.SubElement(psg, "offset").text = str(passage["offset"])
+            ET.SubElement(psg, "text").text = passage["text"]
+            for annotation in passage["annotations"]:
+                ann = ET.SubElement(psg, "annotation", id=annotation["id"])
+                add_infons(ann, annotation["infons"])
+                for location in annotation["locations"]:
+                    ET.SubElement(
+                        ann,
+                        "location",
+                        offset=str(location["offset"]),
+                        length=str(location["length"]),
+                    )
+                ET.SubElement(ann, "text").text = annotation["text"]
+        for relation in document["relations"]:
+            rel = ET.SubElement(doc, "relation", id=relation["id"])
+            ET.SubElement(rel, "infon", key="type").text = relation["infons"]["type"]
+            for role in ("role1", "role2"):
+                entity = relation["infons"][role]
+                ET.SubElement(
+                    rel, "infon", key=role
+                ).text = f"{entity['type']}|{entity['identifier']}"
+
+    return ET.tostring(collection, encoding="utf-8", xml_declaration=True)
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        ("bioconcepts2pubtator3.gz", "bioconcepts"),
+        ("gene2pubtator3", "bioconcepts"),
+        ("BioCXML.0.tar.gz", "biocxml"),
+        ("output.xml.gz", "biocxml"),
+        ("output.pubtator", "pubtator"),
+    ],
+)
+def test_guess_dump_format(filename, expected):
+    assert guess_dump_format(filename) == expected
+
+
+def test_read_bioconcepts(tmp_path):
+    filepath = tmp_path / "bioconcepts2pubtator3.gz"
+    with gzip.open(filepath, "wt") as f:
+        f.write(BIOCONCEPTS)
+
+    articles = list(read_pubtator_dump(filepath))
+    assert [article.pmid for article in articles] == ["100", "200", "300"]
+    assert [(a.name, a.type, a.mesh) for a in articles[0].annotations] == [
+        ("vimentin", "Gene", "7431"),
+        ("VIM", "Gene", "7431"),
+        ("breast cancer", "Disease", "MESH:D001943"),
+    ]
+    assert articles[1].annotations[0].mesh == "-"
+
+    filtered = read_pubtator_dump(
+        filepath,
+        pmids={"100", "300"},
+        predicate=lambda article: len(article.annotations) == 2,
+    )
+    assert [article.pmid for article in filtered] == ["300"]
+
+
+def test_read_pubtator(tmp_path, data_dir: Path):
+    filepath = tmp_path / "dump.pubtator.gz"
+    text = (data_dir / "22429397_abstract_240916.pubtator").read_text()
+    with gzip.open(filepath, "wt") as f:
+        f.write("##USE-MESH-VOCABULARY\n" + text)
+
+    articles = list(read_pubtator_dump(filepath))
+    assert [article.pmid for article in articles] == ["22429397"]
+    assert len(articles[0].annotations) == 37
+    assert list(read_pubtator_dump(filepath, pmids=["1"])) == []
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_read_biocxml(archive, biocjson, tmp_path):
+    xml = biocjson_to_biocxml(biocjson)
+    if archive:
+        xml_path = tmp_path / "0.xml"
+        xml_path.write_bytes(xml)
+        filepath = tmp_path / "BioCXML.0.tar.gz"
+        with tarfile.open(filepath, "w:gz") as tar:
+            tar.add(xml_path, arcname="BioCXML/0.xml")
+    else:
+        filepath = tmp_path / "dump.xml.gz"
+        with gzip.open(filepath, "wb") as f:
+            f.write(xml)
+
+    (expected,) = biocjson_to_pubtator(biocjson)
+    (article,) = read_pubtator_dump(filepath)
+
+    assert article.pmid == str(expected.pmid)
+    assert article.title == expected.title
+    assert article.abstract == expected.abstract
+    # PMIDs of the API responses are integers
+    assert article.annotations == [
+        replace(annotation, pmid=str(annotation.pmid)) for annotation in expected.annotations
+    ]
+    assert [(r.relation_type, r.mesh1, r.mesh2) for r in article.relations] == [
+        (r.relation_type, r.mesh1, r.mesh2) for r in expected.relations
+    ]
+    assert list(read_pubtator_dump(filepath, pmids={"1"})) == []
+
+
+def test_build_graph_from_dump(tmp_path):
+    filepath = tmp_path / "bioconcepts2pubtator3"
+    filepath.write_text(BIOCONCEPTS)
+
+    builder = PubTatorGraphBuilder(node_type="mesh")
+    for article in read_pubtator_dump(filepath):
+        builder.add_article(article)
+    graph = builder.build(weighting_method="freq", edge_weight_cutoff=0)
+
+    assert builder.num_articles == 3
+    assert graph.number_of_edges() == 2
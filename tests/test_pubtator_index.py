@@ -0,0 +1,75 @@
+import itertools
+import os
+
+import pytest
+
+from netmedex.compressed_io import open_compressed
+from netmedex.pubtator_index import PubTatorIndex, get_index_path, get_pubtator_index
+from netmedex.pubtator_parser import HEADER_SYMBOL, PubTatorIO
+
+
+@pytest.fixture
+def pubtator_file(data_dir, tmp_path):
+    filepath = tmp_path / "articles.pubtator"
+    filepath.write_text(
+        f"{HEADER_SYMBOL}USE-MESH-VOCABULARY\n"
+        + (data_dir / "6_nodes_3_clusters_mesh.pubtator").read_text()
+        + "\n"
+        + (data_dir / "mesh_collision.pubtator").read_text()
+    )
+    return filepath
+
+
+def test_build_index(pubtator_file):
+    collection = PubTatorIO.parse(pubtator_file)
+    index = PubTatorIndex.build(pubtator_file)
+
+    assert list(index.entries) == [article.pmid for article in collection.articles]
+    content = pubtator_file.read_bytes()
+    for pmid, (offset, _) in index.entries.items():
+        assert content[offset:].startswith(f"{pmid}|t|".encode())
+    # The articles cover the file after the headers
+    offsets = sorted(index.entries.values())
+    assert all(o1 + l1 == o2 for (o1, l1), (o2, _) in itertools.pairwise(offsets))
+    assert offsets[-1][0] + offsets[-1][1] == len(content)
+
+
+def test_read_articles(pubtator_file):
+    collection = PubTatorIO.parse(pubtator_file)
+    pmids = [collection.articles[3].pmid, collection.articles[0].pmid, "404"]
+
+    index = PubTatorIndex.build(pubtator_file)
+    assert list(index.read_articles(pmids)) == [collection.articles[0], collection.articles[3]]
+
+    subset = PubTatorIO.parse(pubtator_file, pmids=pmids)
+    assert subset.headers == collection.headers
+    assert subset.articles == [collection.articles[0], collection.articles[3]]
+    assert get_index_path(pubtator_file).exists()
+
+
+def test_get_pubtator_index(pubtator_file):
+    index = get_pubtator_index(pubtator_file)
+    loaded = PubTatorIndex.load(pubtator_file)
+    assert loaded.entries == index.entries
+    assert loaded.is_up_to_date()
+
+    # Outdated after appending an article
+    with open(pubtator_file, "a") as f:
+        f.write("\n99999999|t|New article\n99999999|a|Abstract\n")
+    stat = pubtator_file.stat()
+    os.utime(pubtator_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not PubTatorIndex.load(pubtator_file).is_up_to_date()
+    assert "99999999" in get_pubtator_index(pubtator_file)
+    assert "99999999" in PubTatorIndex.load(pubtator_file)
+
+
+def test_compressed_file(pubtator_file, tmp_path):
+    filepath = tmp_path / "articles.pubtator.gz"
+    with open_compressed(filepath, "w") as f:
+        f.write(pubtator_file.read_text())
+    expected = PubTatorIO.parse(pubtator_file)
+
+    with pytest.raises(ValueError):
+        PubTatorIndex.build(filepath)
+    subset = PubTatorIO.parse(filepath, pmids=[expected.articles[1].pmid])
+    assert subset.articles == [expected.articles[1]]
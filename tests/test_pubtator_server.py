@@ -0,0 +1,330 @@
+import asyncio
+import copy
+import json
+import threading
+from pathlib import Path
+
+import aiohttp
+import pytest
+from tenacity import stop_after_attempt, wait_none
+
+import netmedex.pubtator
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.exceptions import RetryableError
+from netmedex.progress import ProgressEvent
+from netmedex.pubtator import PubTatorAPI
+from netmedex.pubtator_data import PubTatorCollection
+from netmedex.pubtator_server import PubTatorRecording, PubTatorStandIn
+from netmedex.pubtator_service import PubTatorService
+from netmedex.rate_limiter import RateLimiter, is_rate_limited
+
+N_ARTICLES = 250
+PAGE_SIZE = 10
+
+
+@pytest.fixture()
+def recording(data_dir: Path) -> PubTatorRecording:
+    """Search results of 250 PMIDs ("1" to "250") and their abstracts."""
+    template = json.load((data_dir / "22439397_abstract_240916.json").open())["PubTator3"][0]
+    recording = PubTatorRecording()
+    for page in range(1, N_ARTICLES // PAGE_SIZE + 1):
+        start = (page - 1) * PAGE_SIZE + 1
+        response = {
+            "count": N_ARTICLES,
+            "page_size": PAGE_SIZE,
+            "results": [{"pmid": pmid} for pmid in range(start, start + PAGE_SIZE)],
+        }
+        recording.add_search(response, "foo", "score desc", page)
+        if page == 1:
+            recording.add_search(response, "foo")
+
+    articles = []
+    for pmid in range(1, N_ARTICLES + 1):
+        article = copy.deepcopy(template)
+        article["pmid"] = pmid
+        articles.append(article)
+    recording.add_export({"PubTator3": articles}, "biocjson", full_text=False)
+
+    return recording
+
+
+@pytest.fixture()
+def fast_retry(monkeypatch: pytest.MonkeyPatch):
+    request_pubtator3 = netmedex.pubtator.request_pubtator3
+    monkeypatch.setattr(
+        "netmedex.pubtator.request_pubtator3", request_pubtator3.retry_with(wait=wait_none())
+    )
+
+
+def fast_rate_limiter():
+    return RateLimiter(max_at_once=10, max_per_second=1000, burst=10)
+
+
+def test_replay(recording):
+    server = PubTatorStandIn(recording, latency=0.01)
+
+    async def run():
+        async with server:
+            return await PubTatorAPI(
+                query="foo",
+                max_articles=205,
+                base_url=server.base_url,
+                rate_limiter=fast_rate_limiter(),
+            ).arun()
+
+    collection = asyncio.run(run())
+
+    expected = [str(pmid) for pmid in range(1, 206)]
+    assert collection.metadata["pmid_list"] == expected
+    assert [str(article.pmid) for article in collection.articles] == expected
+    assert server.stats["search"] == 21
+    assert server.stats["export"] == 3
+
+    metrics = collection.metadata["metrics"]
+    assert metrics.endpoints["search"].requests == 21
+    assert metrics.endpoints["export"].requests == 3
+    # Latency of the stand-in server
+    assert metrics.endpoints["export"].latency.quantile(0.5) >= 0.01
+    assert metrics.endpoints["export"].bytes_received > 0
+    assert metrics.batch_wait.count == 20 + 3
+
+
+def test_foreign_session_is_rate_limited(recording):
+    server = PubTatorStandIn(recording)
+    limiter = fast_rate_limiter()
+    acquired = []
+    acquire = limiter.acquire
+
+    async def counting_acquire(job=None):
+        acquired.append(job)
+        await acquire(job)
+
+    limiter.acquire = counting_acquire
+
+    async def run():
+        async with server, aiohttp.ClientSession() as session:
+            assert not is_rate_limited(session)
+            api = PubTatorAPI(
+                query="foo",
+                max_articles=20,
+                base_url=server.base_url,
+                rate_limiter=limiter,
+                session=session,
+            )
+            collection = await api.arun()
+            # The injected session is left open
+            assert not session.closed
+            return api, collection
+
+    api, collection = asyncio.run(run())
+
+    assert len(collection.articles) == 20
+    assert len(acquired) == server.stats["search"] + server.stats["export"]
+    assert set(acquired) == {api._job_id}
+
+
+def test_concurrent_runs_of_one_instance(recording, monkeypatch: pytest.MonkeyPatch):
+    server = PubTatorStandIn(recording, latency=0.01)
+    create_session = netmedex.pubtator.create_session
+    sessions: list[aiohttp.ClientSession] = []
+
+    def recording_create_session(*args, **kwargs):
+        sessions.append(create_session(*args, **kwargs))
+        return sessions[-1]
+
+    monkeypatch.setattr("netmedex.pubtator.create_session", recording_create_session)
+
+    async def run():
+        async with server:
+            api = PubTatorAPI(
+                query="foo",
+                max_articles=30,
+                base_url=server.base_url,
+                rate_limiter=fast_rate_limiter(),
+            )
+            # Each run opens and closes its own session
+            return await asyncio.gather(api.arun(), api.arun())
+
+    for collection in asyncio.run(run()):
+        assert len(collection.articles) == 30
+    assert len(sessions) == 2
+    assert all(session.closed for session in sessions)
+
+
+def test_inject_errors(recording, monkeypatch: pytest.MonkeyPatch):
+    # Rate-limited batches are retried rather than split, so allow enough attempts
+    request_pubtator3 = netmedex.pubtator.request_pubtator3
+    monkeypatch.setattr(
+        "netmedex.pubtator.request_pubtator3",
+        request_pubtator3.retry_with(wait=wait_none(), stop=stop_after_attempt(20)),
+    )
+    pmids = [str(pmid) for pmid in range(1, N_ARTICLES + 1)]
+    server = PubTatorStandIn(recording, error_rates={429: 0.5, 502: 0.2}, seed=1)
+    events: list[ProgressEvent] = []
+    api = PubTatorAPI(pmid_list=pmids, rate_limiter=fast_rate_limiter(), progress=events.append)
+
+    async def run():
+        async with server:
+            api.base_url = server.base_url
+            return await api.arun()
+
+    collection = asyncio.run(run())
+
+    assert server.stats["429"] > 0
+    retrieved = {str(article.pmid) for article in collection.articles}
+    assert retrieved | set(api.failed_pmids) == set(pmids)
+    # Retries and received bytes are reported
+    assert events[-1].done
+    assert events[-1].retries > 0
+    assert events[-1].bytes_received > 0
+    export = api.metrics.endpoints["export"]
+    assert export.retries["429"] > 0
+    assert export.requests == server.stats["export"] + sum(
+        server.stats[str(status)] for status in (429, 502)
+    )
+
+
+def test_rate_limited_batch_is_not_split(recording, fast_retry):
+    server = PubTatorStandIn(recording, error_rates={429: 1.0})
+    api = PubTatorAPI(
+        pmid_list=[str(pmid) for pmid in range(1, 101)], rate_limiter=fast_rate_limiter()
+    )
+
+    async def run():
+        async with server:
+            api.base_url = server.base_url
+            return await api.arun()
+
+    with pytest.raises(RetryableError):
+        asyncio.run(run())
+
+    # One batch of 100 PMIDs retried until the last attempt, without splitting it
+    assert server.stats["429"] == 3
+    assert api.failed_pmids == {}
+
+
+def test_failed_batch_is_split(recording, fast_retry):
+    server = PubTatorStandIn(recording, error_rates={502: 1.0})
+    api = PubTatorAPI(pmid_list=["1", "2", "3", "4"], rate_limiter=fast_rate_limiter())
+
+    async def run():
+        async with server:
+            api.base_url = server.base_url
+            return await api.arun()
+
+    collection = asyncio.run(run())
+
+    assert collection.articles == []
+    assert set(api.failed_pmids) == {"1", "2", "3", "4"}
+    # 1 batch, 2 halves and 4 PMIDs
+    assert server.stats["502"] == 3 * 7
+
+
+def test_drop_connections(recording, fast_retry):
+    server = PubTatorStandIn(recording, drop_rate=1.0)
+
+    async def run():
+        async with server:
+            await PubTatorAPI(
+                pmid_list=["1"], base_url=server.base_url, rate_limiter=fast_rate_limiter()
+            ).arun()
+
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        asyncio.run(run())
+
+    # Retried until the last attempt (aiohttp may also resend a request once)
+    assert server.stats["drop"] >= 3
+    assert server.stats["export"] == 0
+
+
+def test_record(recording, tmp_path):
+    path = tmp_path / "recording.jsonl"
+
+    async def run():
+        async with PubTatorStandIn(recording) as upstream:
+            async with PubTatorStandIn(
+                PubTatorRecording(path),
+                upstream_url=upstream.base_url,
+                rate_limiter=fast_rate_limiter(),
+            ) as recorder:
+                await PubTatorAPI(
+                    pmid_list=["3", "1"],
+                    base_url=recorder.base_url,
+                    rate_limiter=fast_rate_limiter(),
+                ).arun()
+            recorder.recording.save()
+
+    asyncio.run(run())
+
+    replayed = PubTatorRecording(path)
+    assert set(replayed.get_articles(["1", "2", "3"], "biocjson", False)) == {"1", "3"}
+
+
+def test_full_text_decoded_incrementally(data_dir: Path):
+    res_json = json.load((data_dir / "22429397_full_240916.json").open())
+    recording = PubTatorRecording()
+    recording.add_export(res_json, "biocjson", full_text=True)
+
+    async def run():
+        async with PubTatorStandIn(recording) as server:
+            return await PubTatorAPI(
+                pmid_list=["22429397"],
+                full_text=True,
+                base_url=server.base_url,
+                rate_limiter=fast_rate_limiter(),
+            ).arun()
+
+    collection = asyncio.run(run())
+
+    assert collection.articles == biocjson_to_pubtator(res_json, full_text=True)
+    assert collection.metadata["metrics"].endpoints["export"].decode_time > 0
+
+
+@pytest.fixture()
+def background_server(recording):
+    """Serve `recording` from an event loop in another thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = PubTatorStandIn(recording, latency=0.01)
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_service_shares_one_loop(background_server):
+    service = PubTatorService(
+        rate_limiter=fast_rate_limiter(), base_url=background_server.base_url
+    )
+    results: dict[int, PubTatorCollection] = {}
+    events: list[ProgressEvent] = []
+
+    def search(max_articles: int):
+        results[max_articles] = service.run(
+            query="foo", max_articles=max_articles, progress=events.append
+        )
+
+    threads = [threading.Thread(target=search, args=(n,)) for n in (30, 120)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert service.running
+    for n in (30, 120):
+        assert [str(article.pmid) for article in results[n].articles] == [
+            str(pmid) for pmid in range(1, n + 1)
+        ]
+    assert events[-1].done
+
+    service.close()
+    assert not service.running
+    # The service is started again by the next request
+    collection = service.run(pmid_list=["1", "2"])
+    assert [str(article.pmid) for article in collection.articles] == ["1", "2"]
+    service.close()
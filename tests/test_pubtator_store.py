@@ -0,0 +1,87 @@
+import json
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+
+import pytest
+
+from netmedex.biocjson_parser import biocjson_to_pubtator
+from netmedex.pubtator_store import PubTatorStore
+
+
+@pytest.fixture(scope="module")
+def biocjson(data_dir: Path):
+    return json.load((data_dir / "22439397_abstract_240916.json").open())
+
+
+@pytest.fixture()
+def store(tmp_path):
+    store = PubTatorStore(tmp_path / "store.sqlite", batch_size=2)
+    yield store
+    store.close()
+
+
+def test_get_and_set(store, biocjson):
+    article = biocjson["PubTator3"][0]
+    store.set_many({"1": article, "2": article, "3": article}, "biocjson", full_text=False)
+
+    found = store.get_many(["3", "4", "1"], "biocjson", full_text=False)
+    assert set(found) == {"1", "3"}
+    assert found["1"] == article
+    assert (store.hits, store.misses) == (2, 1)
+    # Records of another format or text type are stored separately
+    assert store.get_many(["1"], "biocjson", full_text=True) == {}
+    assert store.stats()["count"] == 3
+
+    # Records are compressed
+    with sqlite3.connect(store.path) as conn:
+        (record,) = conn.execute("SELECT record FROM articles WHERE pmid = '1'").fetchone()
+    assert json.loads(zlib.decompress(record)) == article
+
+    store.clear()
+    assert store.stats()["count"] == 0
+
+
+def test_add_dump(store, tmp_path):
+    filepath = tmp_path / "bioconcepts2pubtator3"
+    filepath.write_text(
+        "100\tGene\t7431\tvimentin|VIM\tGNorm2\n"
+        "200\tChemical\tMESH:C046498\tD609\tTaggerOne\n"
+        "300\tGene\t6611\tSMS\tGNorm2\n"
+    )
+
+    assert store.add_dump(filepath, pmids=["100", "300"]) == 2
+
+    # Concepts without the title and abstract are not served as API responses
+    assert store.get_many(["100", "300"], "biocjson", full_text=False) == {}
+    found = store.get_many(["100", "200", "300"], "bioconcepts", full_text=False)
+    assert set(found) == {"100", "300"}
+    (article,) = biocjson_to_pubtator({"PubTator3": [found["100"]]})
+    assert [(a.name, a.mesh) for a in article.annotations] == [
+        ("vimentin", "7431"),
+        ("VIM", "7431"),
+    ]
+
+
+def test_concurrent_readers(store, biocjson):
+    article = biocjson["PubTator3"][0]
+    pmids = [str(pmid) for pmid in range(100)]
+    store.set_many({pmid: article for pmid in pmids}, "biocjson", full_text=False)
+
+    # Another process would open its own store
+    reader = PubTatorStore(store.path)
+    results = []
+
+    def read():
+        results.append(len(reader.get_many(pmids, "biocjson", full_text=False)))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    store.set_many({"100": article}, "biocjson", full_text=False)
+    for thread in threads:
+        thread.join()
+    reader.close()
+
+    assert results == [100] * 4
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+import pytest
+
+from netmedex.pubtator import create_session, limit_session
+from netmedex.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimiter,
+    SharedRateLimiter,
+    is_rate_limited,
+    parse_retry_after,
+)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("3", 3.0),
+        ("-1", 0.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("foo", None),
+        (None, None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_rate_limiter_pacing():
+    limiter = RateLimiter(max_at_once=10, max_per_second=20)
+
+    async def run():
+        start = time.monotonic()
+
+        async def each_request():
+            async with limiter:
+                return time.monotonic() - start
+
+        return await asyncio.gather(*(each_request() for _ in range(5)))
+
+    elapsed = asyncio.run(run())
+    # The first request starts immediately and the others start every 0.05 seconds
+    assert elapsed[-1] == pytest.approx(0.2, abs=0.05)
+
+
+def test_rate_limiter_retry_after():
+    limiter = RateLimiter(max_at_once=1, max_per_second=100)
+    start = time.monotonic()
+    limiter.record_response(429, retry_after=0.2)
+
+    async def run():
+        async with limiter:
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_adaptive_rate_limiter():
+    limiter = AdaptiveRateLimiter(max_at_once=3, max_per_second=2, increase_step=0.5)
+
+    limiter.record_response(429)
+    assert limiter.effective_rate == 1
+    limiter.record_response(503)
+    assert limiter.effective_rate == 0.5
+
+    for _ in range(5):
+        limiter.record_response(200)
+    assert limiter.effective_rate == 2
+
+
+def test_shared_rate_limiter_round_robin():
+    limiter = SharedRateLimiter(max_at_once=1, max_per_second=1000)
+    served: list[str] = []
+
+    async def each_request(job: str):
+        await limiter.acquire(job)
+        served.append(job)
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    async def run():
+        big_job = [each_request("big") for _ in range(4)]
+        small_job = [each_request("small") for _ in range(2)]
+        await asyncio.gather(*big_job, *small_job)
+
+    asyncio.run(run())
+    # The first request of "big" is served before "small" arrives
+    assert served == ["big", "big", "small", "big", "small", "big"]
+
+
+@pytest.mark.parametrize("share_by_file", [False, True])
+def test_shared_rate_limiter_across_threads(share_by_file, tmp_path):
+    if share_by_file:
+        # Limiters using the same file behave like one
+        limiters = [
+            SharedRateLimiter(max_at_once=3, max_per_second=20, state_file=tmp_path / "rate")
+            for _ in range(2)
+        ]
+    else:
+        limiters = [SharedRateLimiter(max_at_once=3, max_per_second=20)] * 2
+    starts: list[float] = []
+
+    def run(limiter: SharedRateLimiter):
+        async def each_request():
+            async with limiter:
+                starts.append(time.time())
+
+        async def run_all():
+            await asyncio.gather(*(each_request() for _ in range(3)))
+
+        asyncio.run(run_all())
+
+    threads = [threading.Thread(target=run, args=(limiter,)) for limiter in limiters]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Six requests start every 0.05 seconds
+    assert len(starts) == 6
+    assert max(starts) - min(starts) == pytest.approx(0.25, abs=0.04)
+
+
+def test_is_rate_limited():
+    limiter = RateLimiter(max_at_once=1, max_per_second=100)
+
+    async def run():
+        async with create_session(limiter) as limited, aiohttp.ClientSession() as plain:
+            async with limit_session(plain, limiter) as wrapped:
+                assert wrapped.connector is plain.connector
+                return is_rate_limited(limited), is_rate_limited(plain), is_rate_limited(wrapped)
+
+    assert asyncio.run(run()) == (True, False, True)
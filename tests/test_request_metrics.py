@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from netmedex.pubtator_data import PubTatorCollection
+from netmedex.request_metrics import EndpointMetrics, Histogram, RequestMetrics
+
+
+def test_histogram():
+    histogram = Histogram(bounds=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.6, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1]
+    assert histogram.mean == pytest.approx(0.7875)
+    assert histogram.quantile(0.5) == 1.0
+    # Observations above the last bound are estimated by the maximum
+    assert histogram.quantile(0.99) == 2.0
+    assert histogram.to_dict()["buckets"] == {"<=0.1": 1, "<=1": 2, ">1": 1}
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_record_request():
+    metrics = EndpointMetrics()
+    metrics.record({"start": 0.0, "sent": 1.0, "received": 3.0, "decoded": 3.5}, 100)
+    # Not sent by a session created by `create_session`
+    metrics.record({"start": 0.0, "received": 1.0}, 10)
+
+    assert metrics.requests == 2
+    assert metrics.queue_time.total == 1.0
+    assert metrics.latency.total == 3.0
+    assert metrics.bytes_received == 110
+    assert metrics.decode_time == 0.5
+
+
+def test_save(tmp_path):
+    metrics = RequestMetrics()
+    metrics.endpoint("export").add_retry("429")
+    # Metrics are kept in the metadata of collections
+    json.dumps(
+        PubTatorCollection(headers=[], articles=[], metadata={"metrics": metrics}).to_json()
+    )
+
+    metrics.save(tmp_path / "metrics.json")
+
+    saved = json.loads((tmp_path / "metrics.json").read_text())
+    assert saved["endpoints"]["export"]["retries"] == {"429": 1}
+    assert saved["batch_wait"]["count"] == 0
@@ -0,0 +1,51 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import diskcache
+import pytest
+
+from webapp.background import ThreadDiskcacheManager, job_terminated, track_future
+
+
+@pytest.fixture
+def manager(tmp_path):
+    with diskcache.Cache(str(tmp_path / "cache")) as cache:
+        yield ThreadDiskcacheManager(cache)
+
+
+def test_terminate_job_cancels_tracked_futures(manager):
+    future: Future = Future()
+    tracked = threading.Event()
+    release = threading.Event()
+    finished = threading.Event()
+    terminated = []
+
+    def job_fn(key, progress_key, args, context):
+        track_future(future)
+        terminated.append(job_terminated())
+        tracked.set()
+        release.wait(5)
+        terminated.append(job_terminated())
+        finished.set()
+
+    job = manager.call_job_fn("key", job_fn, (), {})
+    assert tracked.wait(5)
+    assert manager.job_running(job)
+
+    manager.terminate_job(job)
+    assert future.cancelled()
+    assert not manager.job_running(job)
+    release.set()
+    assert finished.wait(5)
+    assert terminated == [False, True]
+
+
+def test_finished_jobs_are_forgotten(manager):
+    jobs = [manager.call_job_fn(f"key{i}", lambda *_: None, (), {}) for i in range(3)]
+    assert len(set(jobs)) == 3
+    for job in jobs:
+        while manager.job_running(job):
+            time.sleep(0.01)
+
+    assert manager._jobs == {}
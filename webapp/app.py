@@ -7,9 +7,9 @@ import os
 import dash_bootstrap_components as dbc
 import diskcache
 from dash import ClientsideFunction, Dash, Input, Output, dcc, html
-from dash.long_callback import DiskcacheLongCallbackManager
 
 from netmedex.utils import config_logger
+from webapp.background import ThreadDiskcacheManager, close_pubtator_service
 from webapp.callbacks import collect_callbacks
 from webapp.utils import cleanup_tempdir
 
@@ -17,7 +17,9 @@ config_logger(is_debug=(os.getenv("LOGGING_DEBUG") == "true"))
 
 
 cache = diskcache.Cache("./cache")
-long_callback_manager = DiskcacheLongCallbackManager(cache)
+# Searches run in threads sharing one event loop and connection pool (see `PubTatorService`),
+# so the app must be served by a single process
+long_callback_manager = ThreadDiskcacheManager(cache)
 
 app = Dash(
     __name__,
@@ -51,6 +53,7 @@ def main():
         )
         app.run(host=os.getenv("HOST", "127.0.0.1"), port=os.getenv("PORT", "8050"))
     finally:
+        close_pubtator_service()
         cleanup_tempdir()
 
 
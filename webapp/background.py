@@ -0,0 +1,131 @@
+import os
+import threading
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from dash import DiskcacheManager
+
+from netmedex.config import STORE_ENV
+from netmedex.pubtator_service import PubTatorService
+from netmedex.pubtator_store import PubTatorStore
+
+_pubtator_service: PubTatorService | None = None
+_pubtator_service_lock = threading.Lock()
+
+
+def get_pubtator_service() -> PubTatorService:
+    """Return the `PubTatorService` shared by every search of the web app.
+
+    Stored articles are resolved locally if `NETMEDEX_PUBTATOR_STORE` is set.
+    """
+    global _pubtator_service
+    with _pubtator_service_lock:
+        if _pubtator_service is None:
+            store_path = os.getenv(STORE_ENV)
+            _pubtator_service = PubTatorService(
+                cache=PubTatorStore(store_path) if store_path else None
+            )
+    return _pubtator_service
+
+
+def close_pubtator_service():
+    global _pubtator_service
+    with _pubtator_service_lock:
+        if _pubtator_service is not None:
+            _pubtator_service.close()
+            _pubtator_service = None
+
+
+@dataclass
+class _ThreadJob:
+    thread: threading.Thread
+    futures: list[Future] = field(default_factory=list)
+    terminated: bool = False
+
+
+# The job run by the current thread, if any
+_current_job = threading.local()
+
+
+def track_future(future: Future):
+    """Cancel `future` if the long callback running in this thread is terminated.
+
+    Call it with the futures returned by `PubTatorService.submit`, so that a
+    cancelled search stops sending requests.
+    """
+    job: _ThreadJob | None = getattr(_current_job, "job", None)
+    if job is not None:
+        job.futures.append(future)
+        if job.terminated:
+            future.cancel()
+
+
+def job_terminated() -> bool:
+    """Whether the long callback running in this thread has been terminated.
+
+    A thread cannot be killed, so check it between the steps of a long callback
+    and return early to discard the work of a cancelled job.
+    """
+    job: _ThreadJob | None = getattr(_current_job, "job", None)
+    return job is not None and job.terminated
+
+
+class ThreadDiskcacheManager(DiskcacheManager):
+    """Run long callbacks in threads of the server process instead of subprocesses.
+
+    Searches then submit their requests to the event loop of the process-wide
+    `PubTatorService`, sharing its connection pool, rate limiter and store.
+    A thread cannot be killed, so terminating a job cancels the requests it
+    tracked with `track_future`, and the job stops at its next `job_terminated`
+    check. Its result is discarded.
+
+    Jobs only exist in the process that started them, so the app must be
+    served by a single process (the default of `app.run`). Job IDs are
+    random, so they never match jobs of a previous run of the server.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._jobs: dict[str, _ThreadJob] = {}
+        self._jobs_lock = threading.Lock()
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job_id = uuid.uuid4().hex
+        thread = threading.Thread(
+            target=self._run_job,
+            args=(job_id, job_fn, (key, self._make_progress_key(key), args, context)),
+            daemon=True,
+        )
+        with self._jobs_lock:
+            self._jobs[job_id] = _ThreadJob(thread)
+        thread.start()
+        return job_id
+
+    def job_running(self, job):
+        with self._jobs_lock:
+            # Forget the jobs that have finished
+            for job_id in [job_id for job_id, j in self._jobs.items() if not j.thread.is_alive()]:
+                del self._jobs[job_id]
+            return job is not None and str(job) in self._jobs
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self._jobs_lock:
+            thread_job = self._jobs.pop(str(job), None)
+        if thread_job is not None:
+            thread_job.terminated = True
+            for future in thread_job.futures:
+                future.cancel()
+
+    def terminate_unhealthy_job(self, job):
+        return False
+
+    def _run_job(self, job_id: str, job_fn, args):
+        with self._jobs_lock:
+            _current_job.job = self._jobs.get(job_id)
+        try:
+            job_fn(*args)
+        finally:
+            _current_job.job = None
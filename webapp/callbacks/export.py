@@ -16,7 +16,7 @@ def callbacks(app):
         if savepath is None:
             return
 
-        return dcc.send_file(savepath["pubtator"], filename="output.pubtator")
+        return dcc.send_file(savepath["pubtator"], filename="output.pubtator.gz")
 
     @app.callback(
         Output("export-html", "data"),
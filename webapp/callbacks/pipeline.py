@@ -1,16 +1,20 @@
 import base64
-import threading
+import logging
+from concurrent.futures import CancelledError
 from queue import Queue
 
 from dash import Input, Output, State, no_update
 
 from netmedex.cli_utils import load_pmids
+from netmedex.compressed_io import decompress, open_compressed
 from netmedex.exceptions import EmptyInput, NoArticles, UnsuccessfulRequest
 from netmedex.graph import PubTatorGraphBuilder, save_graph
-from netmedex.pubtator import PubTatorAPI
+from netmedex.progress import ProgressEvent
 from netmedex.pubtator_parser import PubTatorIO
-from netmedex.utils_threading import run_thread_with_error_notification
-from webapp.utils import generate_session_id, get_data_savepath, visibility
+from webapp.background import get_pubtator_service, job_terminated, track_future
+from webapp.utils import generate_session_id, get_data_savepath, remove_savedir, visibility
+
+logger = logging.getLogger(__name__)
 
 
 def callbacks(app):
@@ -62,19 +66,19 @@ def callbacks(app):
         weighting_method,
         node_type,
     ):
-        _exception_msg = None
-        _exception_type = None
-
-        def custom_hook(args):
-            nonlocal _exception_msg
-            nonlocal _exception_type
-            _exception_msg = args.exc_value
-            _exception_type = args.exc_type
-
         use_mesh = "use_mesh" in pubtator_params
         full_text = "full_text" in pubtator_params
         community = "community" in cy_params
-        savepath = get_data_savepath(generate_session_id())
+        # Each job writes to its own directory, so a terminated job still running
+        # never overwrites the output of a resubmitted one
+        session_id = generate_session_id()
+        savepath = get_data_savepath(session_id)
+
+        def terminated():
+            if job_terminated():
+                remove_savedir(session_id)
+                return True
+            return False
 
         query = None
         pmid_list = None
@@ -90,64 +94,71 @@ def callbacks(app):
                 pmid_list = load_pmids(decoded_content, load_from="string")
 
             queue = Queue()
-            threading.excepthook = custom_hook
-
-            def run_pubtator_and_save():
-                result = PubTatorAPI(
-                    query=query,
-                    pmid_list=pmid_list,
-                    sort=sort_by,
-                    max_articles=max_articles,
-                    full_text=full_text,
-                    queue=queue,
-                ).run()
-                with open(savepath["pubtator"], "w") as f:
-                    f.write(result.to_pubtator_str(annotation_use_identifier_name=use_mesh))
-
-            job = threading.Thread(
-                target=run_thread_with_error_notification(run_pubtator_and_save, queue),
-            )
             set_progress((0, 1, "", "(Step 1/2) Finding articles..."))
 
-            job.start()
+            # Requests run in the event loop shared by all searches
+            job = get_pubtator_service().submit(
+                query=query,
+                pmid_list=pmid_list,
+                sort=sort_by,
+                max_articles=max_articles,
+                full_text=full_text,
+                progress=queue.put,
+            )
+            # Stop requesting if the search is cancelled
+            track_future(job)
+            # End progress display
+            job.add_done_callback(lambda _: queue.put(None))
             while True:
-                progress = queue.get()
-                if progress is None:
+                event: ProgressEvent | None = queue.get()
+                if event is None:
                     break
-                status, n, total = progress.split("/")
-                if status.startswith("search"):
+                if event.stage == "search":
                     status_msg = "(Step 1/2) Finding articles..."
-                elif status == "get":
-                    status_msg = "(Step 2/2) Retrieving articles..."
                 else:
-                    status_msg = ""
-                progress_bar_msg = f"{n}/{total}"
-                set_progress((int(n), int(total), progress_bar_msg, status_msg))
-
-            if _exception_type is not None:
+                    status_msg = "(Step 2/2) Retrieving articles..."
+                progress_bar_msg = f"{event.completed}/{event.total}"
+                if event.eta is not None and not event.done:
+                    progress_bar_msg += f" ({event.eta:.0f}s left)"
+                set_progress((event.completed, event.total, progress_bar_msg, status_msg))
+
+            try:
+                result = job.result()
+            except CancelledError:
+                remove_savedir(session_id)
+                return (no_update, weight, False, no_update, no_update)
+            except Exception as e:
                 known_exceptions = (
                     EmptyInput,
                     NoArticles,
                     UnsuccessfulRequest,
                 )
-                if issubclass(_exception_type, known_exceptions):
-                    exception_msg = str(_exception_msg)
+                if isinstance(e, known_exceptions):
+                    exception_msg = str(e)
                 else:
+                    logger.exception("Failed to retrieve articles")
                     exception_msg = "An unexpected error occurred."
                 set_progress((1, 1, "", exception_msg))
                 return (no_update, weight, False, no_update, no_update)
 
-            job.join()
+            with open_compressed(savepath["pubtator"], "w") as f:
+                result.write_pubtator(f, annotation_use_identifier_name=use_mesh)
         elif source == "file":
-            with open(savepath["pubtator"], "w") as f:
-                content_type, content_string = pubtator_file_data.split(",")
-                decoded_content = base64.b64decode(content_string).decode("utf-8")
+            content_type, content_string = pubtator_file_data.split(",")
+            try:
+                # Files saved by NetMedEx, e.g., output.pubtator.gz, may be compressed
+                decoded_content = decompress(base64.b64decode(content_string)).decode("utf-8")
+            except ImportError as e:
+                set_progress((1, 1, "", str(e)))
+                return (no_update, weight, False, no_update, no_update)
+            with open_compressed(savepath["pubtator"], "w") as f:
                 f.write(decoded_content)
 
+        if terminated():
+            return (no_update, weight, False, no_update, no_update)
         set_progress((0, 1, "0/1", "Generating network..."))
         graph_builder = PubTatorGraphBuilder(node_type=node_type)
-        collection = PubTatorIO.parse(savepath["pubtator"])
-        graph_builder.add_collection(collection)
+        graph_builder.add_collection(PubTatorIO.iter_articles(savepath["pubtator"]))
         G = graph_builder.build(
             pmid_weights=None,
             weighting_method=weighting_method,
@@ -155,6 +166,8 @@ def callbacks(app):
             community=False,
             max_edges=0,
         )
+        if terminated():
+            return (no_update, weight, False, no_update, no_update)
 
         # Keeping track of the graph's metadata
         G.graph["is_community"] = True if community else False
@@ -18,7 +18,8 @@ DATA_FILENAME = {
     "graph": "G.pkl",
     "xgmml": "output.xgmml",
     "html": "output.html",
-    "pubtator": "output.pubtator",
+    # Gzipped to keep large search results small on disk and to download
+    "pubtator": "output.pubtator.gz",
     "edge_info": "output.csv",
 }
 visibility = SimpleNamespace(visible={"visibility": "visible"}, hidden={"visibility": "hidden"})
@@ -38,6 +39,10 @@ def get_data_savepath(session_id: str):
     return savepath
 
 
+def remove_savedir(session_id: str):
+    shutil.rmtree(BASE_SAVEDIR / session_id, ignore_errors=True)
+
+
 def cleanup_tempdir():
     if os.getenv("SAVEDIR") is None:
         shutil.rmtree(BASE_SAVEDIR, ignore_errors=True)